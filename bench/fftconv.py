@@ -5,11 +5,50 @@ import argparse
 
 import torch as th
 from torch.nn import functional as F
+from torch.profiler import profile, ProfilerActivity
 
-from julius import fft_conv1d
+from julius import fft_conv1d, fftconv, LowLatencyFFTConv1d, StreamingFFTConv1d
+from julius.core import next_fast_len, pad_to, unfold
 from julius.utils import Chrono, MarkdownTable
 
 
+def peak_memory(fn, device=None):
+    """
+    Call `fn` and return its output along with the peak memory allocated
+    during the call, in bytes.
+    """
+    if device is not None and th.device(device).type == "cuda":
+        th.cuda.synchronize()
+        th.cuda.reset_peak_memory_stats()
+        base = th.cuda.memory_allocated()
+        out = fn()
+        return out, th.cuda.max_memory_allocated() - base
+    with profile(activities=[ProfilerActivity.CPU], profile_memory=True) as prof:
+        out = fn()
+    current = 0
+    peak = 0
+    for event in sorted(prof.events(), key=lambda event: event.time_range.start):
+        current += event.self_cpu_memory_usage
+        peak = max(peak, current)
+    return out, peak
+
+
+def einsum_fft_conv1d(x, w, block_ratio=5):
+    """
+    Reference FFT convolution using the real valued einsum contraction,
+    as used for PyTorch versions without complex autograd.
+    """
+    kernel_size = w.shape[-1]
+    block_size = min(int(kernel_size * block_ratio), x.shape[-1])
+    weight_z = fftconv._einsum_weight_layout(fftconv._new_rfft(pad_to(w, block_size)), 1)
+    frames = unfold(x, block_size, block_size - kernel_size + 1)
+    frames_z = fftconv._new_rfft(frames)[:, None]
+    out_z = fftconv._compl_mul_conjugate(frames_z, weight_z)[:, 0]
+    out = fftconv._new_irfft(out_z, block_size)[..., :-kernel_size + 1]
+    out = out.reshape(x.shape[0], w.shape[0], -1)
+    return out[..., :x.shape[-1] - kernel_size + 1]
+
+
 def test(table, kernel_size, block_ratio=5, device=None):
     x = th.randn(32, 32, 1024 * 10).to(device)
     w = th.randn(64, 32, kernel_size).to(device)
@@ -25,6 +64,182 @@ def test(table, kernel_size, block_ratio=5, device=None):
         [kernel_size,  int(1000 * chrono_fft.duration), int(1000 * chrono_ref.duration), delta])
 
 
+def test_depthwise(table, kernel_size, block_ratio=5, device=None):
+    x = th.randn(32, 32, 1024 * 10).to(device)
+    w = th.randn(32, 1, kernel_size).to(device)
+
+    with Chrono() as chrono_ref:
+        y_ref = F.conv1d(x, w, groups=32)
+
+    with Chrono() as chrono_fft:
+        y_fft = fft_conv1d(x, w, block_ratio=block_ratio, groups=32)
+
+    delta = format((y_ref - y_fft).abs().mean(), ".1e")
+    table.line(
+        [kernel_size,  int(1000 * chrono_fft.duration), int(1000 * chrono_ref.duration), delta])
+
+
+def test_stride(table, stride, kernel_size=1024, block_ratio=5, device=None):
+    # Similar to a decimating bank of 8 lowpass filters.
+    x = th.randn(32, 1, 1024 * 100).to(device)
+    w = th.randn(8, 1, kernel_size).to(device)
+
+    with Chrono() as chrono_full:
+        y_full = fft_conv1d(x, w, block_ratio=block_ratio)[..., ::stride]
+
+    with Chrono() as chrono_fft:
+        y_fft = fft_conv1d(x, w, stride=stride, block_ratio=block_ratio)
+
+    delta = format((y_full - y_fft).abs().mean(), ".1e")
+    table.line(
+        [stride,  int(1000 * chrono_fft.duration), int(1000 * chrono_full.duration), delta])
+
+
+def test_partitioned(table, kernel_size, partition_size, device=None):
+    # Similar to a stereo reverb with a long impulse response, on 10 seconds at 48kHz.
+    x = th.randn(4, 2, 48_000 * 10).to(device)
+    w = th.randn(2, 2, kernel_size).to(device)
+
+    with Chrono() as chrono_ref:
+        y_ref, mem_ref = peak_memory(lambda: fft_conv1d(x, w), device)
+
+    with Chrono() as chrono_part:
+        y_part, mem_part = peak_memory(
+            lambda: fft_conv1d(x, w, partition_size=partition_size), device)
+
+    delta = format((y_ref - y_part).abs().mean(), ".1e")
+    table.line([
+        kernel_size, partition_size,
+        int(1000 * chrono_ref.duration), int(1000 * chrono_part.duration),
+        mem_ref // 2**20, mem_part // 2**20, delta])
+
+
+def stream_durations(feed, x, chunk_size):
+    """
+    Feed `x` chunk by chunk to `feed`, and return the output along with the duration
+    of each call, in seconds.
+    """
+    outs = []
+    durations = []
+    for chunk in x.split(chunk_size, dim=-1):
+        with Chrono() as chrono:
+            outs.append(feed(chunk))
+        durations.append(chrono.duration)
+    return th.cat(outs, dim=-1), durations
+
+
+def test_low_latency(table, kernel_size, latency, device=None):
+    # Similar to a real-time stereo FIR at 48kHz, on 2 seconds.
+    x = th.randn(1, 2, 48_000 * 2).to(device)
+    low_latency = LowLatencyFFTConv1d(2, 2, kernel_size, latency).to(device)
+    streaming = StreamingFFTConv1d(2, 2, kernel_size, padding=kernel_size - 1).to(device)
+    streaming.weight = low_latency.weight
+    streaming.bias = low_latency.bias
+
+    with th.no_grad():
+        y_ref = low_latency(x)
+        y_stream, durations_stream = stream_durations(streaming.feed, x, latency)
+        y_low, durations_low = stream_durations(low_latency.feed, x, latency)
+
+    delta = format((y_ref[..., :y_low.shape[-1]] - y_low).abs().mean(), ".1e")
+    delta_stream = format((y_ref - y_stream).abs().mean(), ".1e")
+    table.line([
+        kernel_size, latency,
+        format(1000 * sum(durations_stream) / len(durations_stream), ".2f"),
+        format(1000 * max(durations_stream[1:]), ".2f"),
+        format(1000 * sum(durations_low) / len(durations_low), ".2f"),
+        format(1000 * max(durations_low[1:]), ".2f"),
+        delta_stream, delta])
+
+
+def test_backend(table, kernel_size, block_ratio=5, device=None):
+    x = th.randn(32, 32, 1024 * 10).to(device)
+    w = th.randn(64, 32, kernel_size).to(device)
+
+    with Chrono() as chrono_einsum:
+        y_einsum, mem_einsum = peak_memory(
+            lambda: einsum_fft_conv1d(x, w, block_ratio=block_ratio), device)
+
+    with Chrono() as chrono_matmul:
+        y_matmul, mem_matmul = peak_memory(
+            lambda: fft_conv1d(x, w, block_ratio=block_ratio), device)
+
+    delta = format((y_einsum - y_matmul).abs().mean(), ".1e")
+    table.line([
+        kernel_size,
+        int(1000 * chrono_einsum.duration), int(1000 * chrono_matmul.duration),
+        mem_einsum // 2**20, mem_matmul // 2**20, delta])
+
+
+def block_fft_conv1d(x, w, block_size):
+    """
+    FFT convolution with the given `block_size`, without rounding it to a fast FFT size.
+    """
+    kernel_size = w.shape[-1]
+    weight_z = fftconv._weight_spectrum(w, block_size, 1)
+    out = fftconv._fft_conv1d_blocks(x, weight_z, kernel_size, block_size)
+    return out[..., :x.shape[-1] - kernel_size + 1]
+
+
+def test_fast_len(table, kernel_size, block_ratio=5, device=None):
+    x = th.randn(32, 32, 1024 * 10).to(device)
+    w = th.randn(64, 32, kernel_size).to(device)
+    block_size = min(int(kernel_size * block_ratio), x.shape[-1])
+
+    with Chrono() as chrono_exact:
+        y_exact = block_fft_conv1d(x, w, block_size)
+
+    with Chrono() as chrono_fast:
+        y_fast = fft_conv1d(x, w, block_ratio=block_ratio)
+
+    delta = format((y_exact - y_fast).abs().mean(), ".1e")
+    table.line([
+        kernel_size, block_size, next_fast_len(block_size),
+        int(1000 * chrono_exact.duration), int(1000 * chrono_fast.duration), delta])
+
+
+def test_padding(table, padding_mode, kernel_size=1024, device=None):
+    # Similar to a lowpass filter on 1 minute of stereo audio at 44.1kHz.
+    x = th.randn(2, 1, 44_100 * 60).to(device)
+    w = th.randn(1, 1, kernel_size).to(device)
+    padding = kernel_size // 2
+    mode = 'constant' if padding_mode == 'zeros' else padding_mode
+
+    with Chrono() as chrono_ref:
+        y_ref, mem_ref = peak_memory(
+            lambda: fft_conv1d(F.pad(x, (padding, padding), mode=mode), w), device)
+
+    with Chrono() as chrono_fused:
+        y_fused, mem_fused = peak_memory(
+            lambda: fft_conv1d(x, w, padding=padding, padding_mode=padding_mode), device)
+
+    delta = format((y_ref - y_fused).abs().mean(), ".1e")
+    table.line([
+        padding_mode, int(1000 * chrono_ref.duration), int(1000 * chrono_fused.duration),
+        mem_ref // 2**20, mem_fused // 2**20, delta])
+
+
+def test_precision(table, kernel_size, dtype, block_ratio=5, device=None):
+    x = th.randn(32, 32, 1024 * 10).to(device)
+    w = th.randn(64, 32, kernel_size).to(device)
+    y_ref = F.conv1d(x, w)
+    x = x.to(dtype)
+    w = w.to(dtype)
+
+    with Chrono() as chrono_ref:
+        y_direct = F.conv1d(x, w)
+
+    with Chrono() as chrono_fft:
+        y_fft = fft_conv1d(x, w, block_ratio=block_ratio)
+
+    delta_direct = format((y_ref - y_direct.float()).abs().mean() / y_ref.abs().mean(), ".1e")
+    delta_fft = format((y_ref - y_fft.float()).abs().mean() / y_ref.abs().mean(), ".1e")
+    table.line([
+        kernel_size, str(dtype).split(".")[-1],
+        int(1000 * chrono_fft.duration), int(1000 * chrono_ref.duration),
+        delta_fft, delta_direct])
+
+
 def main():
     parser = argparse.ArgumentParser("fftconv.py")
     parser.add_argument("-d", "--device", default="cpu")
@@ -38,6 +253,83 @@ def main():
     for kernel_size in [8, 32, 64, 128, 256, 1024, 2048]:
         test(table, kernel_size, block_ratio=args.block_ratio, device=args.device)
 
+    print()
+    print("Depthwise (groups=32):")
+    print()
+    table = MarkdownTable(
+        ["Kernel size", "FFT (ms)", "No FFT (ms)", "  Delta"])
+    table.header()
+    for kernel_size in [64, 256, 1024, 2048, 4096]:
+        test_depthwise(table, kernel_size, block_ratio=args.block_ratio, device=args.device)
+
+    print()
+    print("Strided (8 filters, kernel size of 1024, 1 input channel):")
+    print()
+    table = MarkdownTable(["Stride", "FFT (ms)", "Full FFT + slicing (ms)", "  Delta"])
+    table.header()
+    for stride in [1, 2, 4, 8]:
+        test_stride(table, stride, block_ratio=args.block_ratio, device=args.device)
+
+    print()
+    print("Uniformly partitioned convolution, for long kernels:")
+    print()
+    table = MarkdownTable(
+        ["Kernel size", "Partition", "FFT (ms)", "Partitioned (ms)",
+         "FFT (MB)", "Partitioned (MB)", "  Delta"])
+    table.header()
+    for kernel_size in [24_000, 96_000]:
+        for partition_size in [1024, 4096]:
+            test_partitioned(table, kernel_size, partition_size, device=args.device)
+
+    print()
+    print("Real-time FIR, time per chunk of `latency` samples (worst case excludes the first):")
+    print()
+    table = MarkdownTable(
+        ["Kernel size", "Latency", "Streaming mean (ms)", "Streaming worst (ms)",
+         "Low latency mean (ms)", "Low latency worst (ms)", "Streaming delta", "  Delta"])
+    table.header()
+    for kernel_size in [4096, 16384]:
+        for latency in [64, 256]:
+            test_low_latency(table, kernel_size, latency, device=args.device)
+
+    print()
+    print("Frequency domain contraction, einsum vs. complex matmul:")
+    print()
+    table = MarkdownTable(
+        ["Kernel size", "Einsum (ms)", "Matmul (ms)", "Einsum (MB)", "Matmul (MB)", "  Delta"])
+    table.header()
+    for kernel_size in [64, 256, 1024]:
+        test_backend(table, kernel_size, block_ratio=args.block_ratio, device=args.device)
+
+    print()
+    print("Block size rounded to a fast FFT size, for awkward kernel sizes:")
+    print()
+    table = MarkdownTable(
+        ["Kernel size", "Block", "Fast block", "Block (ms)", "Fast block (ms)", "  Delta"])
+    table.header()
+    for kernel_size in [199, 211, 401, 1000, 1021, 2003]:
+        test_fast_len(table, kernel_size, block_ratio=args.block_ratio, device=args.device)
+
+    print()
+    print("Padding applied with `F.pad` vs. inside `fft_conv1d` (input of 20 MB):")
+    print()
+    table = MarkdownTable(
+        ["Mode", "F.pad (ms)", "Fused (ms)", "F.pad (MB)", "Fused (MB)", "  Delta"])
+    table.header()
+    for padding_mode in ['zeros', 'replicate', 'reflect']:
+        test_padding(table, padding_mode, device=args.device)
+
+    print()
+    print("Reduced precision, relative delta with the float32 `F.conv1d`:")
+    print()
+    table = MarkdownTable(
+        ["Kernel size", "Dtype", "FFT (ms)", "No FFT (ms)", "FFT delta", "No FFT delta"])
+    table.header()
+    for kernel_size in [64, 256, 1024]:
+        for dtype in [th.float32, th.float16, th.bfloat16]:
+            test_precision(table, kernel_size, dtype, block_ratio=args.block_ratio,
+                           device=args.device)
+
 
 if __name__ == "__main__":
     main()
@@ -25,6 +25,17 @@ i.e. a batch of size 16 of 8 second of audio at 44.1kHz.
 We use the same number of zero crossing as `resampy` for this benchmark.
 The small delta is probably
 due to the different window function used.
+We then compare the direct and FFT convolutions (`fft` argument) for the polyphase filters,
+along with the number of taps of the filters for each of the `old_sr` input phases,
+and the method chosen by default (FFT when there are more than 24 taps per phase).
+We compare `Downsample2` and `Upsample2` with chaining `ResampleFrac(2, 1)` or `ResampleFrac(1, 2)`,
+for factors of 2, 4 and 8.
+We also compare the dense polyphase filters with the trimmed ones (`trim` argument),
+which skip the near zero taps when `old_sr` is large compared with the filter width.
+We measure the time to get a crop of 4 seconds from a stereo signal of 10 minutes,
+either from the full output, or with `ResampleFrac.forward_window`.
+Finally, we compare a single `ResampleFrac` with the `ResampleChain` chosen
+by `plan_resample`, along with the relative delta between the two outputs.
 
 
 On CPU we have:
@@ -39,6 +50,23 @@ On GPU we have:
 
 We compare to `pytorch.nn.functional.conv1d`, on a input of size [32, 32, 10240],
 for a convolution with 32 input channels, 64 output channels and various kernel sizes.
+We also compare depthwise convolutions (`groups=32`, one filter per channel)
+to `torch.nn.functional.conv1d` with the same `groups`.
+For strided convolutions, we compare to computing the full output
+and then decimating it, which was the approach before polyphase decomposition was implemented.
+For very long kernels, like reverberation impulse responses, we compare the
+default FFT convolution to the uniformly partitioned one (`partition_size` argument).
+For real-time filtering, we report the mean and worst case time for each chunk of `latency`
+samples, for `StreamingFFTConv1d` and the non-uniformly partitioned `LowLatencyFFTConv1d`.
+We compare the block size `int(block_ratio * kernel_size)` to the one used by default,
+rounded up to the next size with only 2, 3 and 5 as prime factors, which is faster for FFT.
+We compare the peak memory when padding the input with `F.pad`, or with the `padding_mode`
+argument of `fft_conv1d`, which only pads the frames at the edges of the input.
+We compare the time and peak memory of the frequency domain contraction,
+using either real valued `torch.einsum` (used for PyTorch < 1.8), or batched complex
+matrix multiplications (default).
+Finally, we report the time and relative error of `float16` and `bfloat16` inputs,
+for which the FFTs are computed in `float32`, compared with the `float32` direct convolution.
 
 On CPU we have:
 
@@ -53,6 +81,10 @@ On GPU we have:
 We do not compare to anything, but measure the attenuation in dB of a pure tone
 at `0.9 * cutoff`, at the `cutoff`, and at `1.1 * cutoff`.
 Note that our implementation automatically choses to use FFTConv1d or not when appropriate.
+The second table compares the default filters, with `zeros` zero crossings and a Hann window,
+to the filters designed from a `FilterSpec` with a Kaiser window, in number of taps,
+attenuation at the edge of the stop band `cutoff + transition / 2`, and time taken
+to filter 16 signals of 4 seconds at 44.1kHz.
 
 On CPU we have:
 
@@ -62,6 +94,21 @@ On GPU we have:
 
 {run_bench('lowpass', device='cuda')}
 
+### XCorr
+
+We compare `julius.correlate` with `max_lag` to `torch.nn.functional.conv1d`, using the whole
+signal as the kernel, on 2 signals of 10 seconds at 48kHz. We also report the time taken by
+`julius.time_delay` (GCC-PHAT), and whether both found the delay between the signals,
+in presence of noise.
+
+On CPU we have:
+
+{run_bench('xcorr')}
+
+On GPU we have:
+
+{run_bench('xcorr', device='cuda')}
+
 """
     print(template)
 
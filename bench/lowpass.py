@@ -3,8 +3,11 @@
 
 import argparse
 
-from julius import lowpass_filter
+import torch
+
+from julius import FilterSpec, LowPassFilter, lowpass_filter
 from julius.core import pure_tone, volume
+from julius.design import stopband_attenuation
 from julius.utils import Chrono, MarkdownTable
 
 
@@ -21,6 +24,23 @@ def test(table, freq, zeros, fft=None, device="cpu"):
     table.line([freq] + attns + [int(1000 * chrono.duration)])
 
 
+def test_spec(table, freq, transition, attenuation, zeros, device="cpu"):
+    sr = 44_100
+    x = torch.randn(16, 4 * sr, device=device)
+    stopband = freq + transition / 2
+    line = []
+    durations = []
+    for spec in [None, FilterSpec(transition, attenuation)]:
+        filt = LowPassFilter(freq, zeros=zeros, spec=spec).to(device)
+        filter_ = filt._lowpasses.filters[0, 0]
+        line += [len(filter_), format(stopband_attenuation(filter_.cpu(), stopband), ".1f")]
+        filt(x)
+        with Chrono() as chrono:
+            filt(x)
+        durations.append(int(1000 * chrono.duration))
+    table.line([freq, transition, attenuation] + line + durations)
+
+
 def main():
     parser = argparse.ArgumentParser("lowpass.py")
     parser.add_argument("-d", "--device", default="cpu")
@@ -35,6 +55,16 @@ def main():
     for freq in [0.005, 0.01, 0.1, 0.2, 0.4]:
         test(table, freq, zeros=args.zeros, fft=args.fft, device=args.device)
 
+    print()
+    table = MarkdownTable(
+        ["Freq.", "Transition", "Spec (dB)", "Taps zeros", "Attn. zeros (dB)",
+         "Taps spec", "Attn. spec (dB)", "Zeros (ms)", "Spec (ms)"])
+    table.header()
+    for freq, transition, attenuation in [
+            (0.1, 0.05, 40), (0.1, 0.05, 60), (0.1, 0.02, 60), (0.1, 0.02, 80),
+            (0.01, 0.005, 60), (0.01, 0.002, 100)]:
+        test_spec(table, freq, transition, attenuation, zeros=args.zeros, device=args.device)
+
 
 if __name__ == "__main__":
     main()
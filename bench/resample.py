@@ -7,7 +7,7 @@ import math
 import resampy
 import torch as th
 
-from julius import resample_frac
+from julius import resample_frac, Downsample2, ResampleChain, ResampleFrac, Upsample2
 from julius.utils import Chrono, MarkdownTable
 
 
@@ -29,6 +29,84 @@ def test(table, old_sr, new_sr, device="cpu"):
         table.line([old_sr, new_sr, dur_julius])
 
 
+def test_fft(table, old_sr, new_sr, zeros, device="cpu"):
+    x = th.randn(16, 8 * 44_100, device=device)
+    resample = ResampleFrac(old_sr, new_sr, zeros=zeros).to(device)
+    taps = resample.kernel.shape[-1] // resample.old_sr
+    durations = []
+    for fft in [False, True]:
+        resample.fft = fft
+        resample(x)  # warmup, and computes the spectrum of the filters.
+        with Chrono() as chrono:
+            resample(x)
+        durations.append(int(1000 * chrono.duration))
+    auto = ResampleFrac(old_sr, new_sr, zeros=zeros).fft
+    table.line([old_sr, new_sr, zeros, taps] + durations + ["FFT" if auto else "Direct"])
+
+
+def test_half(table, stages, device="cpu"):
+    x = th.randn(16, 8 * 44_100, device=device)
+    for name, resample, reference in [
+            ("Down", Downsample2(stages=stages), ResampleFrac(2, 1)),
+            ("Up", Upsample2(stages=stages), ResampleFrac(1, 2))]:
+        resample.to(device)
+        reference.to(device)
+        durations = []
+        for mod, repeat in [(reference, stages), (resample, 1)]:
+            for warmup in [True, False]:
+                y = x
+                with Chrono() as chrono:
+                    for _ in range(repeat):
+                        y = mod(y)
+            durations.append(int(1000 * chrono.duration))
+        table.line([name, 2 ** stages] + durations)
+
+
+def test_trim(table, old_sr, new_sr, device="cpu"):
+    x = th.randn(16, 8 * 44_100, device=device)
+    durations = []
+    sizes = []
+    for trim in [False, True]:
+        resample = ResampleFrac(old_sr, new_sr, trim=trim).to(device)
+        resample(x)  # warmup
+        with Chrono() as chrono:
+            resample(x)
+        durations.append(int(1000 * chrono.duration))
+        sizes.append(resample.kernel.numel())
+    table.line([old_sr, new_sr] + sizes + durations)
+
+
+def test_window(table, old_sr, new_sr, minutes, device="cpu"):
+    # Crop of 4 seconds of the output.
+    x = th.randn(2, 60 * minutes * old_sr, device=device)
+    resample = ResampleFrac(old_sr, new_sr).to(device)
+    start = 30 * new_sr
+    with Chrono() as chrono:
+        resample(x)[..., start:start + 4 * new_sr]
+    dur_full = 1000 * chrono.duration
+    with Chrono() as chrono:
+        resample.forward_window(x, start, 4 * new_sr)
+    dur_window = 1000 * chrono.duration
+    table.line([old_sr, new_sr, minutes, int(dur_full), format(dur_window, ".1f")])
+
+
+def test_chain(table, old_sr, new_sr, device="cpu"):
+    x = th.randn(16, 8 * old_sr, device=device)
+    direct = ResampleFrac(old_sr, new_sr).to(device)
+    chain = ResampleChain(old_sr, new_sr).to(device)
+    durations = []
+    outputs = []
+    for resample in [direct, chain]:
+        resample(x)  # warmup
+        with Chrono() as chrono:
+            outputs.append(resample(x))
+        durations.append(int(1000 * chrono.duration))
+    y_direct, y_chain = outputs
+    delta = (y_direct - y_chain).norm() / y_direct.norm()
+    plan = " -> ".join(str(sr) for sr in chain.sample_rates)
+    table.line([old_sr, new_sr] + durations + [format(delta, ".1%"), plan])
+
+
 def main():
     parser = argparse.ArgumentParser("resample.py")
     parser.add_argument("-d", "--device", default="cpu")
@@ -44,6 +122,42 @@ def main():
     for old_sr, new_sr in rates:
         test(table, old_sr, new_sr, device=args.device)
 
+    print()
+    table = MarkdownTable(
+        ["Old sr", "New sr", "Zeros", "Taps/phase", "Direct (ms)", "FFT (ms)", "Auto"])
+    table.header()
+    for zeros in [8, 24, 56]:
+        for old_sr, new_sr in [(2, 1), (1, 2), (4, 5), (5, 4), (4, 1)]:
+            test_fft(table, old_sr, new_sr, zeros, device=args.device)
+
+    print()
+    table = MarkdownTable(["Direction", "Factor", "ResampleFrac (ms)", "Up/Downsample2 (ms)"])
+    table.header()
+    for stages in [1, 2, 3]:
+        test_half(table, stages, device=args.device)
+
+    print()
+    table = MarkdownTable(
+        ["Old sr", "New sr", "Dense size", "Trimmed size", "Dense (ms)", "Trimmed (ms)"])
+    table.header()
+    for old_sr, new_sr in [(1000, 999), (999, 1000), (500, 501), (320, 441)]:
+        test_trim(table, old_sr, new_sr, device=args.device)
+
+    print()
+    table = MarkdownTable(["Old sr", "New sr", "Minutes", "Full (ms)", "Window (ms)"])
+    table.header()
+    for old_sr, new_sr in [(44100, 16000), (16000, 44100)]:
+        test_window(table, old_sr, new_sr, 10, device=args.device)
+
+    print()
+    table = MarkdownTable(
+        ["Old sr", "New sr", "Direct (ms)", "Chain (ms)", "Delta (%)", "Plan"])
+    table.header()
+    rates = [(44100, 16000), (48000, 44100), (48000, 8000), (8000, 48000), (96000, 16000),
+             (96000, 22050), (22050, 16000), (32000, 44100)]
+    for old_sr, new_sr in rates:
+        test_chain(table, old_sr, new_sr, device=args.device)
+
 
 if __name__ == "__main__":
     main()
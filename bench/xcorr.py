@@ -0,0 +1,50 @@
+# File under the MIT license, see https://github.com/adefossez/julius/LICENSE for details.
+# Author: adefossez, 2020
+
+import argparse
+
+import torch as th
+from torch.nn import functional as F
+
+from julius import correlate, time_delay
+from julius.utils import Chrono, MarkdownTable
+
+
+def test(table, max_lag, device=None):
+    sr = 48_000
+    y = th.randn(2, 10 * sr, device=device)
+    delay = max_lag // 3
+    x = F.pad(y, (delay, 0))[:, :y.shape[-1]] + 0.5 * th.randn_like(y)
+
+    with Chrono() as chrono_ref:
+        out_ref = F.conv1d(F.pad(x, (max_lag, max_lag))[None], y[:, None], groups=2)[0]
+
+    with Chrono() as chrono_xcorr:
+        out = correlate(x, y, max_lag=max_lag)
+
+    with Chrono() as chrono_delay:
+        delays = time_delay(x, y, max_lag=max_lag)
+
+    delta = format(((out - out_ref).norm() / out_ref.norm()).item(), ".1e")
+    found = (out.argmax(-1) - max_lag).tolist() == [delay] * 2
+    found_phat = delays.tolist() == [delay] * 2
+    table.line([
+        max_lag, int(1000 * chrono_xcorr.duration), int(1000 * chrono_ref.duration),
+        delta, int(1000 * chrono_delay.duration), str(found and found_phat)])
+
+
+def main():
+    parser = argparse.ArgumentParser("xcorr.py")
+    parser.add_argument("-d", "--device", default="cpu")
+    args = parser.parse_args()
+
+    table = MarkdownTable(
+        ["Max lag", "Julius (ms)", "Torch (ms)", "Rel. delta",
+         "GCC-PHAT (ms)", "Found delay"])
+    table.header()
+    for max_lag in [10, 100, 1000, 4000]:
+        test(table, max_lag, device=args.device)
+
+
+if __name__ == "__main__":
+    main()
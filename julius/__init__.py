@@ -16,11 +16,15 @@ For now, I have implemented:
 - `julius.lowpass`: FIR low pass filter banks.
 - `julius.filters`: FIR high pass and band pass filters.
 - `julius.bands`: Decomposition of a waveform signal over mel-scale frequency bands.
+- `julius.xcorr`: FFT based cross-correlation and time delay estimation.
+- `julius.design`: Design of the filters from a specification of the transition band and attenuation.
 
 Along that, you might found useful utilities in:
 
 - `julius.core`: DSP related functions.
 - `julius.utils`: Generic utilities.
+- `julius.autotune`: Opt-in autotuning of the convolution methods.
+- `julius.cache`: Process-wide cache of the filters used by the functional APIs.
 
 
 Please checkout [the Github repository](https://github.com/adefossez/julius) for other informations.
@@ -34,8 +38,15 @@ to learn more about DSP.
 """
 
 from .bands import SplitBands, split_bands
-from .fftconv import fft_conv1d, FFTConv1d
+from .design import design_lowpass, FilterSpec
+from .fftconv import fft_conv1d, FFTConv1d, StreamingFFTConv1d, LowLatencyFFTConv1d
 from .filters import bandpass_filter, BandPassFilter
 from .filters import highpass_filter, highpass_filters, HighPassFilter, HighPassFilters
 from .lowpass import lowpass_filter, lowpass_filters, LowPassFilters, LowPassFilter
-from .resample import resample_frac, ResampleFrac
+from .resample import (
+    downsample2, plan_resample, resample_bank, resample_batch, resample_chain, resample_frac,
+    upsample2)
+from .resample import (
+    Downsample2, ResampleBank, ResampleBatch, ResampleChain, ResampleFrac, StreamingResampleFrac,
+    Upsample2)
+from .xcorr import autocorr, correlate, gcc_phat, time_delay
@@ -0,0 +1,203 @@
+# File under the MIT license, see https://github.com/adefossez/julius/LICENSE for details.
+# Author: adefossez, 2020
+"""
+Opt-in autotuning of the convolutions used in Julius.
+
+Whether FFT convolutions are faster than direct ones, and which block size is the
+fastest for them, depends a lot on the machine (see the benchmarks in `bench`).
+When autotuning is enabled, the modules that accept `fft=None`
+(e.g. `julius.lowpass.LowPassFilters`, and all the filters built on it) will benchmark
+the direct `torch.nn.functional.conv1d` and `julius.fftconv.fft_conv1d` with different
+block ratios the first time they see a given configuration, and then always use the fastest.
+`julius.fftconv.FFTConv1d` will only tune its block ratio.
+
+The configuration is given by the shape of the input and weight, the stride, groups, device,
+dtype and number of threads. The results are stored in a JSON file, so that they
+are reused in later processes. By default, this is `~/.cache/julius/autotune.json`,
+which can be overriden with the `JULIUS_AUTOTUNE_CACHE` environment variable.
+Autotuning can be enabled either with `enable`, or by setting the environment
+variable `JULIUS_AUTOTUNE=1`.
+
+>>> import tempfile
+>>> from julius import LowPassFilters
+>>> tmp = tempfile.TemporaryDirectory()
+>>> enable(tmp.name + '/autotune.json')
+>>> lowpass = LowPassFilters([0.1, 0.2])
+>>> x = torch.randn(4, 1024)
+>>> list(lowpass(x).shape)  # First call will benchmark the different methods.
+[2, 4, 1024]
+>>> len(get_tuner())
+1
+>>> disable()
+>>> tmp.cleanup()
+"""
+
+import json
+import os
+from pathlib import Path
+import typing as tp
+
+import torch
+from torch.nn import functional as F
+
+from .utils import Chrono
+
+# Candidate block ratios for `julius.fftconv.fft_conv1d`.
+BLOCK_RATIOS = [2., 3., 5., 8., 12., 20.]
+DEFAULT_BLOCK_RATIO = 5.
+
+
+def default_path():
+    """
+    Return the default path for the autotuning cache.
+    """
+    path = os.environ.get("JULIUS_AUTOTUNE_CACHE")
+    if path is None:
+        return Path.home() / ".cache" / "julius" / "autotune.json"
+    return Path(path)
+
+
+class Autotuner:
+    """
+    Benchmarks the different ways of computing a convolution, and remembers the fastest one
+    in a JSON file.
+
+    Args:
+        path (str or Path): path of the JSON file used to store the results.
+        repeat (int): number of timed runs for each candidate, the best one is kept.
+    """
+    def __init__(self, path: tp.Union[str, Path], repeat: int = 3):
+        self.path = Path(path)
+        self.repeat = repeat
+        self._choices: tp.Dict[str, tp.Tuple[bool, float]] = self._read()
+
+    def __len__(self):
+        return len(self._choices)
+
+    def _read(self):
+        choices: tp.Dict[str, tp.Tuple[bool, float]] = {}
+        try:
+            with open(self.path) as f:
+                content = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return choices
+        for key, choice in content.get("choices", {}).items():
+            choices[key] = (bool(choice["fft"]), float(choice["block_ratio"]))
+        return choices
+
+    def _save(self):
+        # Another process might have tuned other configurations in the meantime.
+        choices = self._read()
+        choices.update(self._choices)
+        self._choices = choices
+        content = {
+            "choices": {
+                key: {"fft": fft, "block_ratio": block_ratio}
+                for key, (fft, block_ratio) in choices.items()}
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.parent / f".{self.path.name}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(content, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def _key(self, input: torch.Tensor, weight: torch.Tensor, stride: int, padding: int,
+             dilation: int, groups: int, fft_only: bool):
+        device = str(input.device)
+        if input.device.type == "cuda":
+            device += f"({torch.cuda.get_device_name(input.device)})"
+        parts = [
+            "x".join(str(dim) for dim in input.shape),
+            "x".join(str(dim) for dim in weight.shape),
+            f"stride={stride}", f"padding={padding}", f"dilation={dilation}",
+            f"groups={groups}", device, str(input.dtype),
+            f"threads={torch.get_num_threads()}", "fft" if fft_only else "any"]
+        return ",".join(parts)
+
+    def _time(self, fn: tp.Callable[[], tp.Any]):
+        fn()  # warmup
+        durations = []
+        for _ in range(self.repeat):
+            with Chrono() as chrono:
+                fn()
+            durations.append(chrono.duration)
+        return min(durations)
+
+    def _benchmark(self, input: torch.Tensor, weight: torch.Tensor, stride: int, padding: int,
+                   dilation: int, groups: int, fft_only: bool):
+        # Lazy import, as `julius.fftconv` depends on this module.
+        from .fftconv import fft_conv1d
+
+        timings: tp.List[tp.Tuple[float, tp.Tuple[bool, float]]] = []
+        with torch.no_grad():
+            if not fft_only:
+                duration = self._time(lambda: F.conv1d(
+                    input, weight.to(input.dtype), stride=stride, padding=padding,
+                    dilation=dilation, groups=groups))
+                timings.append((duration, (False, DEFAULT_BLOCK_RATIO)))
+            for block_ratio in BLOCK_RATIOS:
+                duration = self._time(lambda: fft_conv1d(
+                    input, weight, stride=stride, padding=padding, dilation=dilation,
+                    groups=groups, block_ratio=block_ratio))
+                timings.append((duration, (True, block_ratio)))
+        return min(timings)[1]
+
+    def choose(self, input: torch.Tensor, weight: torch.Tensor, stride: int = 1,
+               padding: int = 0, dilation: int = 1, groups: int = 1, fft_only: bool = False):
+        """
+        Return a tuple `(fft, block_ratio)`, with `fft` True if `fft_conv1d` should be used
+        rather than `F.conv1d`, and `block_ratio` the block ratio to use for `fft_conv1d`.
+        If `fft_only` is True, only the block ratio is tuned.
+        The arguments are the same as for `julius.fftconv.fft_conv1d`.
+        """
+        key = self._key(input, weight, stride, padding, dilation, groups, fft_only)
+        if key not in self._choices:
+            self._choices.update(self._read())
+        if key not in self._choices:
+            self._choices[key] = self._benchmark(
+                input, weight, stride, padding, dilation, groups, fft_only)
+            self._save()
+        return self._choices[key]
+
+    def clear(self):
+        """
+        Forget all the tuned configurations, and remove the JSON file.
+        """
+        self._choices.clear()
+        if self.path.exists():
+            self.path.unlink()
+
+
+_tuner: tp.Optional[Autotuner] = None
+
+
+def enable(path: tp.Optional[tp.Union[str, Path]] = None):
+    """
+    Enable autotuning, storing the results in the JSON file `path`.
+    If `path` is None, uses `default_path()`.
+    """
+    global _tuner
+    _tuner = Autotuner(default_path() if path is None else path)
+
+
+def disable():
+    """
+    Disable autotuning.
+    """
+    global _tuner
+    _tuner = None
+
+
+def is_enabled():
+    return _tuner is not None
+
+
+def get_tuner():
+    """
+    Return the current `Autotuner`, or None if autotuning is disabled.
+    """
+    return _tuner
+
+
+if os.environ.get("JULIUS_AUTOTUNE", "0") not in ["", "0"]:
+    enable()
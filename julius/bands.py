@@ -6,6 +6,7 @@ Decomposition of a signal over frequency bands in the waveform domain.
 from typing import Optional, Sequence
 import torch
 
+from .cache import cached
 from .core import mel_frequencies
 from .lowpass import LowPassFilters
 from .utils import simple_repr
@@ -116,4 +117,4 @@ def split_bands(signal: torch.Tensor, sample_rate: float, n_bands: Optional[int]
     >>> list(split_bands(x, sample_rate=64, cutoffs=[12, 24]).shape)
     [3, 6, 4, 1024]
     """
-    return SplitBands(sample_rate, n_bands, cutoffs, pad, zeros, fft).to(signal)(signal)
+    return cached(SplitBands, (sample_rate, n_bands, cutoffs, pad, zeros, fft), signal)(signal)
@@ -0,0 +1,165 @@
+# File under the MIT license, see https://github.com/adefossez/julius/LICENSE for details.
+# Author: adefossez, 2020
+"""
+Process-wide cache of the modules used by the functional APIs.
+
+Functions like `julius.resample.resample_frac`, `julius.lowpass.lowpass_filters`
+or `julius.bands.split_bands` need a module holding the filters, which can be more
+expensive to build than to apply for short signals. The modules are kept in a
+least recently used cache, keyed on the class of the module, its parameters,
+and the device and dtype of the input, so that calling the same function millions of times
+with a handful of configurations only builds the filters once for each.
+
+The maximum number of modules kept is 64 by default, which can be overriden with
+the `JULIUS_CACHE_SIZE` environment variable, or with `set_max_size`.
+A size of 0 disables the cache.
+
+>>> from julius import lowpass_filter
+>>> clear()
+>>> x = torch.randn(4, 1024)
+>>> for _ in range(3):
+...     y = lowpass_filter(x, 0.1)
+>>> stats()
+CacheStats(hits=2, misses=1, size=1, max_size=64)
+>>> clear()
+"""
+
+from collections import OrderedDict
+import os
+import threading
+import typing as tp
+
+import torch
+
+
+class CacheStats(tp.NamedTuple):
+    """
+    Statistics of a `ModuleCache`.
+    """
+    hits: int
+    misses: int
+    size: int
+    max_size: int
+
+
+def _freeze(value: tp.Any) -> tp.Any:
+    # Return a hashable version of `value`, e.g. for the list of cutoffs.
+    if isinstance(value, torch.Tensor):
+        return ("tensor", _freeze(value.tolist()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+class ModuleCache:
+    """
+    Least recently used cache of modules, keyed on their class, parameters,
+    and the device and dtype of the input they are used with.
+
+    Args:
+        max_size (int): maximum number of modules to keep. If 0, nothing is cached.
+    """
+    def __init__(self, max_size: int = 64):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._modules: tp.Dict[tp.Any, torch.nn.Module] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._modules)
+
+    def _trim(self):
+        while len(self._modules) > self.max_size:
+            self._modules.popitem(last=False)  # type: ignore
+
+    def get(self, cls: tp.Callable[..., torch.nn.Module], args: tp.Sequence[tp.Any],
+            input: torch.Tensor) -> torch.nn.Module:
+        """
+        Return `cls(*args).to(input)`, reusing a previous instance if possible.
+        """
+        key = (cls, _freeze(args), input.device, input.dtype)
+        try:
+            hash(key)
+        except TypeError:
+            # Parameters we do not know how to compare, don't cache.
+            with self._lock:
+                self.misses += 1
+            return cls(*args).to(input)
+        with self._lock:
+            module = self._modules.get(key)
+            if module is not None:
+                self._modules.move_to_end(key)  # type: ignore
+                self.hits += 1
+                return module
+            self.misses += 1
+        module = cls(*args).to(input)
+        with self._lock:
+            if self.max_size > 0:
+                self._modules[key] = module
+                self._trim()
+        return module
+
+    def set_max_size(self, max_size: int):
+        """
+        Change the maximum number of modules, evicting the least recently used ones if needed.
+        """
+        if max_size < 0:
+            raise ValueError("max_size should be positive.")
+        with self._lock:
+            self.max_size = max_size
+            self._trim()
+
+    def clear(self):
+        """
+        Remove all the modules and reset the statistics.
+        """
+        with self._lock:
+            self._modules.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Return the `CacheStats` for this cache.
+        """
+        return CacheStats(self.hits, self.misses, len(self), self.max_size)
+
+
+_cache = ModuleCache(int(os.environ.get("JULIUS_CACHE_SIZE", "64")))
+
+
+def get_cache():
+    """
+    Return the process-wide `ModuleCache` used by the functional APIs.
+    """
+    return _cache
+
+
+def cached(cls: tp.Callable[..., torch.nn.Module], args: tp.Sequence[tp.Any],
+           input: torch.Tensor) -> torch.nn.Module:
+    """
+    Return `cls(*args).to(input)`, using the process-wide cache.
+    """
+    return _cache.get(cls, args, input)
+
+
+def set_max_size(max_size: int):
+    """
+    Change the maximum number of modules in the process-wide cache.
+    """
+    _cache.set_max_size(max_size)
+
+
+def clear():
+    """
+    Clear the process-wide cache and its statistics.
+    """
+    _cache.clear()
+
+
+def stats():
+    """
+    Return the `CacheStats` of the process-wide cache.
+    """
+    return _cache.stats()
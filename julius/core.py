@@ -86,6 +86,33 @@ def pure_tone(freq: float, sr: float = 128, dur: float = 4, device=None):
     return torch.cos(2 * math.pi * freq * time)
 
 
+def next_fast_len(length: int):
+    """
+    Return the smallest integer larger or equal to `length` whose only prime factors
+    are 2, 3 and 5. FFT implementations are the fastest for such sizes, while sizes with
+    large prime factors can be many times slower.
+
+    >>> print(next_fast_len(1000), next_fast_len(1009), next_fast_len(5003))
+    1000 1024 5120
+    """
+    best = 1
+    while best < length:
+        best *= 2
+    # We go over all the products of powers of 3 and 5 below `best`, each completed
+    # by the smallest power of 2 reaching `length`.
+    power5 = 1
+    while power5 < best:
+        power35 = power5
+        while power35 < best:
+            power2 = 1
+            while power35 * power2 < length:
+                power2 *= 2
+            best = min(best, power35 * power2)
+            power35 *= 3
+        power5 *= 5
+    return best
+
+
 def unfold(input, kernel_size: int, stride: int):
     """1D only unfolding similar to the one from PyTorch.
     However PyTorch unfold is extremely slow.
@@ -113,11 +140,15 @@ def unfold(input, kernel_size: int, stride: int):
     length = shape.pop(-1)
     n_frames = math.ceil((max(length, kernel_size) - kernel_size) / stride) + 1
     tgt_length = (n_frames - 1) * stride + kernel_size
-    padded = F.pad(input, (0, tgt_length - length)).contiguous()
+    padded = input
+    if tgt_length > length:
+        padded = F.pad(input, (0, tgt_length - length))
+    padded = padded.contiguous()
     strides: tp.List[int] = []
     for dim in range(padded.dim()):
         strides.append(padded.stride(dim))
     last_stride = strides.pop(-1)
-    assert last_stride == 1, 'data should be contiguous'
+    # The stride of a dimension of size 1 is meaningless, and can be anything.
+    assert last_stride == 1 or padded.shape[-1] == 1, 'data should be contiguous'
     strides = strides + [stride, 1]
     return padded.as_strided(shape + [n_frames, kernel_size], strides)
@@ -0,0 +1,135 @@
+# File under the MIT license, see https://github.com/adefossez/julius/LICENSE for details.
+# Author: adefossez, 2021
+"""
+Design of windowed sinc lowpass filters from a specification, i.e. the edge of the
+pass band, the width of the transition band and the attenuation in the stop band,
+using a Kaiser window. `julius.lowpass.LowPassFilters`, the filters in `julius.filters`
+and `julius.resample.ResampleFrac` accept a `FilterSpec` instead of a number of zero crossings,
+so that the filters are not longer than needed to reach the required attenuation.
+
+>>> filter_ = design_lowpass(0.2, 0.05, 60)
+>>> len(filter_)
+77
+>>> stopband_attenuation(filter_, 0.25) >= 60
+True
+"""
+
+import math
+import typing as tp
+
+import torch
+import torch.fft  # noqa, needed with PyTorch 1.7 for `torch.fft` to be a module.
+
+from .core import sinc
+
+
+class FilterSpec(tp.NamedTuple):
+    """
+    Specification of a lowpass filter, used instead of the number of zero crossings.
+
+    Args:
+        transition (float): width of the transition band, centered on the cutoff frequency,
+            in the same unit as the cutoff frequency, e.g. `f / f_s` for
+            `julius.lowpass.LowPassFilters`.
+        attenuation (float): minimum attenuation in the stop band, in dB.
+    """
+    transition: float
+    attenuation: float = 60.
+
+
+def kaiser_beta(attenuation: float) -> float:
+    """
+    Return the `beta` parameter of the Kaiser window for the given
+    stop band `attenuation` in dB, using the formula by Kaiser (1974).
+    """
+    if attenuation > 50:
+        return 0.1102 * (attenuation - 8.7)
+    elif attenuation >= 21:
+        return 0.5842 * (attenuation - 21)**0.4 + 0.07886 * (attenuation - 21)
+    else:
+        return 0.
+
+
+def kaiser(x: torch.Tensor, beta: float) -> torch.Tensor:
+    """
+    Kaiser window evaluated at the positions `x` in `[-1, 1]`.
+    """
+    x = (1 - x**2).clamp(min=0)
+    return torch.i0(beta * x.sqrt()) / torch.i0(torch.tensor(beta).to(x))
+
+
+def _kaiser_lowpass(cutoff: float, half_size: int, beta: float):
+    time = torch.arange(-half_size, half_size + 1, dtype=torch.float64)
+    window = kaiser(time / max(half_size, 1), beta)
+    filter_ = 2 * cutoff * window * sinc(2 * cutoff * math.pi * time)
+    return filter_ / filter_.sum()
+
+
+def stopband_attenuation(filter_: torch.Tensor, stopband: float) -> float:
+    """
+    Return the minimum attenuation in dB of the filter `filter_` `[K]`
+    for the frequencies above `stopband`, expressed as `f / f_s`.
+    """
+    n_fft = 2**14
+    while n_fft < 16 * len(filter_):
+        n_fft *= 2
+    response = torch.fft.rfft(filter_.double(), n=n_fft).abs()
+    freqs = torch.arange(len(response), dtype=torch.float64) / n_fft
+    response = response[freqs >= stopband]
+    if len(response) == 0:
+        return math.inf
+    return -20 * math.log10(max(response.max().item(), 1e-300))
+
+
+def kaiser_size(passband: float, transition: float, attenuation: float) -> int:
+    """
+    Return the smallest half size of a Kaiser windowed sinc filter meeting the specification,
+    i.e. its number of taps is `2 * half_size + 1`, see `design_lowpass`.
+    """
+    if transition <= 0:
+        raise ValueError("transition should be positive.")
+    stopband = passband + transition
+    if stopband >= 0.5:
+        # Nothing to remove.
+        return 0
+    cutoff = passband + transition / 2
+    beta = kaiser_beta(attenuation)
+
+    def _meets(half_size: int):
+        filter_ = _kaiser_lowpass(cutoff, half_size, beta)
+        return stopband_attenuation(filter_, stopband) >= attenuation
+
+    # We start from the estimate of the filter length by Kaiser, which is
+    # usually within a few taps of the smallest one.
+    estimate = max(1, math.ceil((attenuation - 7.95) / (2.285 * 2 * math.pi * transition) / 2))
+    half_size = estimate
+    if _meets(half_size):
+        while half_size > 1 and _meets(half_size - 1):
+            half_size -= 1
+    else:
+        while not _meets(half_size):
+            half_size += 1
+            if half_size > 4 * estimate:
+                raise ValueError(f"Could not reach an attenuation of {attenuation}dB.")
+    return half_size
+
+
+def design_lowpass(passband: float, transition: float, attenuation: float = 60.) -> torch.Tensor:
+    """
+    Return the shortest Kaiser windowed sinc lowpass filter, with all the frequencies under
+    `passband` kept, and the frequencies above `passband + transition` attenuated
+    by at least `attenuation` dB, all frequencies being expressed as `f / f_s`.
+    The cutoff frequency is `passband + transition / 2`, and the filter is normalized
+    so that a constant signal is preserved.
+
+    Args:
+        passband (float): edge of the pass band.
+        transition (float): width of the transition band.
+        attenuation (float): minimum attenuation in the stop band, in dB.
+
+    Returns:
+        Tensor `[2 * half_size + 1]` with the filter.
+    """
+    half_size = kaiser_size(passband, transition, attenuation)
+    cutoff = passband + transition / 2
+    return _kaiser_lowpass(cutoff, half_size, kaiser_beta(attenuation)).float()
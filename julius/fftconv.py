@@ -8,7 +8,9 @@ This module implements efficient FFT based convolutions for such convolutions. A
 application is for evaluationg FIR filters with a long receptive field, typically
 evaluated with a stride of 1.
 """
-from typing import Optional
+from collections import OrderedDict
+import math
+from typing import List, NamedTuple, Optional, Tuple
 
 import torch
 try:
@@ -17,7 +19,8 @@ except ImportError:
     new_fft = None  # type: ignore
 from torch.nn import functional as F
 
-from .core import pad_to, unfold
+from . import autotune
+from .core import next_fast_len, pad_to, unfold
 from .utils import simple_repr
 
 
@@ -41,26 +44,27 @@ def _new_irfft(x: torch.Tensor, length: int):
     return new_fft.irfft(x, length, dim=-1)
 
 
-if new_fft is None:
-    _rfft = _old_rfft
-    _irfft = _old_irfft
-else:
-    _rfft = _new_rfft
-    _irfft = _new_irfft
+def _complex_rfft(x: torch.Tensor):
+    return new_fft.rfft(x, dim=-1)
+
+
+def _complex_irfft(x: torch.Tensor, length: int):
+    return new_fft.irfft(x, length, dim=-1)
 
 
 def _compl_mul_conjugate(a: torch.Tensor, b: torch.Tensor):
     """
-    Given a and b two tensors of dimension 4
+    Given a a tensor of dimension 6 and b a tensor of dimension 5,
     with the last dimension being the real and imaginary part,
     returns a multiplied by the conjugate of b, the multiplication
-    being with respect to the second dimension.
+    being with respect to the third dimension of a and b, independently for each group
+    (second dimension of a, first of b).
 
     """
     # PyTorch 1.7 supports complex number, but not for all operations.
     # Once the support is widespread, this can likely go away.
 
-    op = "bcft,dct->bdft"
+    op = "bgcft,gdct->bgdft"
     return torch.stack([
         torch.einsum(op, a[..., 0], b[..., 0]) + torch.einsum(op, a[..., 1], b[..., 1]),
         torch.einsum(op, a[..., 1], b[..., 0]) - torch.einsum(op, a[..., 0], b[..., 1])
@@ -68,71 +72,903 @@ def _compl_mul_conjugate(a: torch.Tensor, b: torch.Tensor):
                        dim=-1)
 
 
+def _einsum_weight_layout(weight_z: torch.Tensor, groups: int):
+    """
+    Given the spectrum `[D, C / G, F, 2]` of the weight, returns it as `[G, D / G, C / G, F, 2]`.
+    """
+    out_channels, group_channels, n_freqs, _ = weight_z.shape
+    return weight_z.reshape(groups, out_channels // groups, group_channels, n_freqs, 2)
+
+
+def _einsum_conv(frames: torch.Tensor, weight_z: torch.Tensor, block_size: int):
+    """
+    Given `N` input frames `[B, C, N, block_size]`, and the weight spectrum
+    as returned by `_einsum_weight_layout`, returns the circular convolution
+    of each frame `[B, D, N, block_size]`.
+    """
+    batch, channels, n_frames, _ = frames.shape
+    groups, group_out_channels, group_channels, n_freqs, _ = weight_z.shape
+    frames_z = _rfft(frames).reshape(batch, groups, group_channels, n_frames, n_freqs, 2)
+    out_z = _compl_mul_conjugate(frames_z, weight_z)
+    out_z = out_z.reshape(batch, groups * group_out_channels, n_frames, n_freqs, 2)
+    return _irfft(out_z, block_size)
+
+
+def _einsum_out_channels(weight_z: torch.Tensor):
+    """
+    Return the number of groups and of output channels per group of the weight spectrum
+    returned by `_einsum_weight_layout`, or `_partitioned_weight_spectrum`.
+    """
+    return weight_z.shape[-5], weight_z.shape[-4]
+
+
+def _einsum_narrow_out_channels(weight_z: torch.Tensor, start: int, length: int):
+    """
+    Keep only `length` output channels in each group of the weight spectrum
+    returned by `_einsum_weight_layout`, starting from `start`.
+    """
+    return weight_z.narrow(-4, start, length)
+
+
+def _matmul_weight_layout(weight_z: torch.Tensor, groups: int):
+    """
+    Given the complex spectrum `[D, C / G, F]` of the weight, returns its conjugate
+    as `[G, F, C / G, D / G]`, ready to be used with `torch.matmul`.
+    """
+    out_channels, group_channels, n_freqs = weight_z.shape
+    weight_z = weight_z.reshape(groups, out_channels // groups, group_channels, n_freqs)
+    return weight_z.permute(0, 3, 2, 1).conj().contiguous()
+
+
+def _matmul_conv(frames: torch.Tensor, weight_z: torch.Tensor, block_size: int):
+    """
+    Given `N` input frames `[B, C, N, block_size]`, and the weight spectrum
+    as returned by `_matmul_weight_layout`, returns the circular convolution
+    of each frame `[B, D, N, block_size]`.
+    """
+    # Each frequency bin is a single batched matrix multiplication
+    # `[B * N, C / G] x [C / G, D / G]`, for each group. Compared with the real valued
+    # einsums, this avoids materializing 4 intermediate products and stacking them.
+    # We keep rebinding `z` so that each intermediate spectrum is freed as soon as possible.
+    batch, channels, n_frames, _ = frames.shape
+    groups, n_freqs, group_channels, group_out_channels = weight_z.shape
+    z = _rfft(frames).reshape(batch, groups, group_channels, n_frames, n_freqs)
+    z = z.permute(1, 4, 0, 3, 2).reshape(groups, n_freqs, batch * n_frames, group_channels)
+    z = torch.matmul(z, weight_z)
+    z = z.view(groups, n_freqs, batch, n_frames, group_out_channels)
+    z = z.permute(2, 0, 4, 3, 1).reshape(
+        batch, groups * group_out_channels, n_frames, n_freqs)
+    return _irfft(z, block_size)
+
+
+def _matmul_out_channels(weight_z: torch.Tensor):
+    """
+    Same as `_einsum_out_channels` for `_matmul_weight_layout`.
+    """
+    return weight_z.shape[-4], weight_z.shape[-1]
+
+
+def _matmul_narrow_out_channels(weight_z: torch.Tensor, start: int, length: int):
+    """
+    Same as `_einsum_narrow_out_channels` for `_matmul_weight_layout`.
+    """
+    return weight_z.narrow(-1, start, length)
+
+
+def _einsum_partitioned_conv(frames: torch.Tensor, weight_z: torch.Tensor, block_size: int):
+    """
+    Given `N + P - 1` input frames `[B, C, N + P - 1, block_size]` with a hop length
+    of `block_size // 2`, and the spectrum of the `P` partitions of the weight as returned
+    by `_partitioned_weight_spectrum`, returns the circular convolution of each
+    of the `N` output frames `[B, D, N, block_size]`.
+    """
+    batch, channels, n_frames, _ = frames.shape
+    n_parts, groups, group_out_channels, group_channels, n_freqs, _ = weight_z.shape
+    n_outputs = n_frames - n_parts + 1
+    frames_z = _rfft(frames).reshape(batch, groups, group_channels, n_frames, n_freqs, 2)
+    out_z = _compl_mul_conjugate(frames_z[:, :, :, :n_outputs], weight_z[0])
+    for part in range(1, n_parts):
+        out_z += _compl_mul_conjugate(frames_z[:, :, :, part:part + n_outputs], weight_z[part])
+    out_z = out_z.reshape(batch, groups * group_out_channels, n_outputs, n_freqs, 2)
+    return _irfft(out_z, block_size)
+
+
+def _matmul_partitioned_conv(frames: torch.Tensor, weight_z: torch.Tensor, block_size: int):
+    """
+    Same as `_einsum_partitioned_conv`, but with native complex tensors,
+    see `_matmul_conv`.
+    """
+    batch, channels, n_frames, _ = frames.shape
+    n_parts, groups, n_freqs, group_channels, group_out_channels = weight_z.shape
+    n_outputs = n_frames - n_parts + 1
+    z = _rfft(frames).reshape(batch, groups, group_channels, n_frames, n_freqs)
+    # The frames are put before the batch dimension, so that delaying the input
+    # by one partition is a contiguous slice.
+    z = z.permute(1, 4, 3, 0, 2).reshape(groups * n_freqs, n_frames * batch, group_channels)
+    weight_z = weight_z.reshape(n_parts, groups * n_freqs, group_channels, group_out_channels)
+    out_z = z.new_zeros(groups * n_freqs, n_outputs * batch, group_out_channels)
+    for part in range(n_parts):
+        # Frequency domain delay line: the p-th partition of the weight sees
+        # the spectrum of the input `p` blocks later.
+        out_z.baddbmm_(z[:, part * batch:(part + n_outputs) * batch], weight_z[part])
+    out_z = out_z.view(groups, n_freqs, n_outputs, batch, group_out_channels)
+    out_z = out_z.permute(3, 0, 4, 2, 1).reshape(
+        batch, groups * group_out_channels, n_outputs, n_freqs)
+    return _irfft(out_z, block_size)
+
+
+def _torch_version():
+    version = []
+    for part in torch.__version__.split('.')[:2]:
+        version.append(int(''.join(c for c in part if c.isdigit())))
+    return tuple(version)
+
+
+# The frequency domain contraction uses native complex tensors and `torch.matmul` when
+# available. Complex autograd is only usable from PyTorch 1.8, so for older versions,
+# we keep the real and imaginary parts separate and rely on `torch.einsum`.
+if new_fft is None:
+    _rfft = _old_rfft
+    _irfft = _old_irfft
+    _weight_layout = _einsum_weight_layout
+    _spectral_conv = _einsum_conv
+    _partitioned_conv = _einsum_partitioned_conv
+    _out_channels = _einsum_out_channels
+    _narrow_out_channels = _einsum_narrow_out_channels
+elif _torch_version() < (1, 8):
+    _rfft = _new_rfft
+    _irfft = _new_irfft
+    _weight_layout = _einsum_weight_layout
+    _spectral_conv = _einsum_conv
+    _partitioned_conv = _einsum_partitioned_conv
+    _out_channels = _einsum_out_channels
+    _narrow_out_channels = _einsum_narrow_out_channels
+else:
+    _rfft = _complex_rfft
+    _irfft = _complex_irfft
+    _weight_layout = _matmul_weight_layout
+    _spectral_conv = _matmul_conv
+    _partitioned_conv = _matmul_partitioned_conv
+    _out_channels = _matmul_out_channels
+    _narrow_out_channels = _matmul_narrow_out_channels
+
+
+def _compute_dtype(dtype: torch.dtype):
+    """
+    Return the dtype used for the FFTs and the frequency domain contraction
+    for an input or weight of type `dtype`. Half precision FFTs are not supported on CPU,
+    only for powers of 2 on CUDA, and the error grows with the kernel size,
+    so that `float16` and `bfloat16` are computed with `float32`.
+    """
+    if dtype == torch.float16 or dtype == torch.bfloat16:
+        return torch.float32
+    return dtype
+
+
+def _dilate(weight: torch.Tensor, dilation: int):
+    """
+    Insert `dilation - 1` zeros between each entry of the last dimension of `weight`.
+    """
+    if dilation == 1:
+        return weight
+    kernel_size = weight.shape[-1]
+    dilated = F.pad(weight[..., None], (0, dilation - 1))
+    dilated = dilated.reshape(list(weight.shape[:-1]) + [kernel_size * dilation])
+    return dilated[..., :(kernel_size - 1) * dilation + 1]
+
+
+def _weight_spectrum(weight: torch.Tensor, block_size: int, groups: int):
+    """
+    Return the spectrum of `weight`, zero padded to `block_size`, in the layout
+    expected by `_spectral_conv`.
+    """
+    weight = weight.to(_compute_dtype(weight.dtype))
+    return _weight_layout(_rfft(pad_to(weight, block_size)), groups)
+
+
+def _pad(input: torch.Tensor, padding: int, padding_mode: str):
+    """
+    Pad `input` with `padding` samples on each side, with `padding_mode` being one
+    of `'zeros'`, `'replicate'` or `'reflect'`, as for `torch.nn.Conv1d`.
+    """
+    if padding == 0:
+        return input
+    if padding_mode == 'zeros':
+        return F.pad(input, (padding, padding))
+    return F.pad(input, (padding, padding), mode=padding_mode)
+
+
+def _pad_backward(grad: torch.Tensor, padding: int, padding_mode: str):
+    """
+    Given the gradient with respect to `_pad(input, padding, padding_mode)`,
+    return the gradient with respect to `input`.
+    """
+    if padding == 0:
+        return grad
+    length = grad.shape[-1] - 2 * padding
+    left = grad[..., :padding]
+    right = grad[..., padding + length:]
+    grad = grad[..., padding:padding + length].clone()
+    if padding_mode == 'replicate':
+        grad[..., :1] += left.sum(dim=-1, keepdim=True)
+        grad[..., -1:] += right.sum(dim=-1, keepdim=True)
+    elif padding_mode == 'reflect':
+        grad[..., 1:padding + 1] += left.flip(-1)
+        grad[..., length - 1 - padding:length - 1] += right.flip(-1)
+    return grad
+
+
+def _pad_segment(input: torch.Tensor, start: int, end: int, padding: int, padding_mode: str):
+    """
+    Return the samples from `start` to `end` of `_pad(input, padding, padding_mode)`,
+    followed by zeros past its end, only copying the samples needed.
+    """
+    length = input.shape[-1]
+    # Positions with respect to `input`.
+    begin = start - padding
+    stop = end - padding
+    mode_stop = max(min(stop, length + padding), begin)
+    left = max(0, -begin)
+    right = max(0, mode_stop - length)
+    # Replicate and reflect padding need the samples at the edges of the input.
+    low = min(max(begin, 0), length)
+    high = max(min(stop, length), low)
+    if left > 0:
+        high = max(high, min(length, left + 1))
+    if right > 0:
+        low = min(low, max(0, length - 1 - right))
+    segment = input[..., low:high]
+    if left > 0 or right > 0:
+        mode = 'constant' if padding_mode == 'zeros' else padding_mode
+        segment = F.pad(segment, (left, right), mode=mode)
+    offset = begin - (low - left)
+    segment = segment[..., offset:offset + mode_stop - begin]
+    return pad_to(segment, end - start)
+
+
+def _fft_conv1d_blocks(input: torch.Tensor, weight_z: torch.Tensor,
+                       kernel_size: int, block_size: int,
+                       padding: int = 0, padding_mode: str = 'zeros'):
+    """
+    Valid convolution with stride 1 of `_pad(input, padding, padding_mode)` with the weight
+    whose spectrum over blocks of size `block_size` is `weight_z`, as returned by
+    `_weight_spectrum`. The output can be longer than the valid output of the convolution,
+    the extra entries should be discarded by the caller.
+    """
+    batch, _, length = input.shape
+    dtype = input.dtype
+    fold_stride = block_size - kernel_size + 1
+    padded_length = length + 2 * padding
+    n_frames = int(math.ceil((max(padded_length, block_size) - block_size) / fold_stride)) + 1
+
+    # The frames that are entirely inside the input are a view on it, only the frames
+    # overlapping the padding, or the end of the input, are copied. This avoids copying
+    # the whole input to pad it.
+    input = input.to(_compute_dtype(dtype)).contiguous()
+    first = min(int(math.ceil(padding / fold_stride)), n_frames)
+    last = max(min((length + padding - block_size) // fold_stride + 1, n_frames), first)
+    outs: List[torch.Tensor] = []
+    for begin, end in [(0, first), (first, last), (last, n_frames)]:
+        if begin == end:
+            continue
+        if begin == first and end == last:
+            strides = [input.stride(0), input.stride(1), fold_stride, 1]
+            frames = input.as_strided(
+                [batch, input.shape[1], end - begin, block_size], strides,
+                input.storage_offset() + begin * fold_stride - padding)
+        else:
+            segment = _pad_segment(input, begin * fold_stride,
+                                   (end - 1) * fold_stride + block_size, padding, padding_mode)
+            frames = unfold(segment, block_size, fold_stride)
+        out = _spectral_conv(frames, weight_z, block_size)
+        # The last bit is invalid, because FFT will do a circular convolution.
+        # The output goes back to the dtype of the input when copying the valid part.
+        outs.append(out[..., :fold_stride].to(dtype))
+    out = outs[0] if len(outs) == 1 else torch.cat(outs, dim=2)
+    return out.reshape(batch, out.shape[1], -1)
+
+
+def _partitioned_weight_spectrum(weight: torch.Tensor, partition_size: int, groups: int):
+    """
+    Split `weight` `[D, C / G, K]` into `P = ceil(K / partition_size)` partitions,
+    and return the spectrum of each, zero padded to `2 * partition_size`, stacked as `[P, *]`,
+    with `*` the layout expected by `_spectral_conv`.
+    """
+    out_channels, group_channels, kernel_size = weight.shape
+    n_parts = int(math.ceil(kernel_size / partition_size))
+    parts = pad_to(weight.to(_compute_dtype(weight.dtype)), n_parts * partition_size)
+    parts = parts.reshape(out_channels, group_channels, n_parts, partition_size)
+    parts_z = _rfft(pad_to(parts.permute(2, 0, 1, 3), 2 * partition_size))
+    return torch.stack([_weight_layout(parts_z[part], groups) for part in range(n_parts)])
+
+
+def _fft_conv1d_partitioned(input: torch.Tensor, weight_z: torch.Tensor,
+                            kernel_size: int, partition_size: int):
+    """
+    Same as `_fft_conv1d_blocks` but with a uniformly partitioned weight,
+    whose spectrum is given by `_partitioned_weight_spectrum`.
+    """
+    # The input is split in blocks of size `partition_size`, and the FFT size is twice that.
+    # The j-th output block is the sum over the partitions p of the circular convolution of
+    # the input frame `j + p` with the p-th partition of the weight.
+    batch, _, length = input.shape
+    dtype = input.dtype
+    n_parts = weight_z.shape[0]
+    n_outputs = int(math.ceil((length - kernel_size + 1) / partition_size))
+    input = pad_to(input.to(_compute_dtype(dtype)), (n_outputs + n_parts) * partition_size)
+    frames = unfold(input, 2 * partition_size, partition_size)
+    out = _partitioned_conv(frames, weight_z, 2 * partition_size)
+    out = out[..., :partition_size].to(dtype)
+    return out.reshape(batch, out.shape[1], -1)
+
+
+def _spectrum(weight: torch.Tensor, block_size: int, groups: int,
+              partition_size: Optional[int]):
+    """
+    Return the spectrum of `weight` as expected by `_fft_conv1d_spectrum`.
+    """
+    if partition_size is None:
+        return _weight_spectrum(weight, block_size, groups)
+    else:
+        return _partitioned_weight_spectrum(weight, partition_size, groups)
+
+
+def _polyphase(x: torch.Tensor, stride: int):
+    """
+    Given `x` of shape `[*, C, T]`, returns its `stride` polyphase components as
+    `[*, C * stride, ceil(T / stride)]`, with the `r`-th component of the channel `c`
+    being `x[..., c, r::stride]` (zero padded), stored in the channel `c * stride + r`.
+    """
+    if stride == 1:
+        return x
+    length = x.shape[-1]
+    x = pad_to(x, stride * int(math.ceil(length / stride)))
+    shape = list(x.shape[:-1])
+    x = x.reshape(shape + [-1, stride]).transpose(-1, -2)
+    shape[-1] *= stride
+    return x.reshape(shape + [-1])
+
+
+def _transform_weight(weight: torch.Tensor, dilation: int, stride: int):
+    """
+    Return the weight actually used for the stride 1 FFT convolution, see `fft_conv1d`.
+    """
+    return _polyphase(_dilate(weight, dilation), stride)
+
+
+def _prepare_fft_conv1d(input: torch.Tensor, weight: torch.Tensor, stride: int, padding: int,
+                        block_ratio: float, dilation: int, groups: int,
+                        partition_size: Optional[int], padding_mode: str = 'zeros'):
+    """
+    Check the arguments of `fft_conv1d`, and return the input to use for
+    the stride 1 FFT convolution (see `_polyphase`), the size of the weight
+    returned by `_transform_weight`, the block size, the final output length,
+    and the padding that remains to be applied to the input.
+    """
+    if padding_mode not in ['zeros', 'replicate', 'reflect']:
+        raise RuntimeError(f"Invalid padding_mode={padding_mode}, should be one of "
+                           "'zeros', 'replicate' or 'reflect'.")
+    if stride > 1:
+        # The polyphase decomposition copies the input anyway.
+        input = _pad(input, padding, padding_mode)
+        padding = 0
+    _, channels, length = input.shape
+    length += 2 * padding
+    out_channels, group_channels, kernel_size = weight.shape
+    if channels != groups * group_channels or out_channels % groups != 0:
+        raise RuntimeError(f"Invalid groups={groups} for {channels} input channels, "
+                           f"{out_channels} output channels and a weight of shape "
+                           f"{list(weight.shape)}.")
+    kernel_size = dilation * (kernel_size - 1) + 1
+
+    if length < kernel_size:
+        raise RuntimeError(f"Input should be at least as large as the kernel size {kernel_size}, "
+                           f"but it is only {length} samples long.")
+    if block_ratio < 1:
+        raise RuntimeError("Block ratio must be greater than 1.")
+    if partition_size is not None and partition_size < 1:
+        raise RuntimeError("Partition size must be at least 1.")
+    target_length = (length - kernel_size) // stride + 1
+
+    # With a stride, we only compute the outputs we keep. Splitting the input and kernel
+    # into their `stride` polyphase components, we have
+    #   y[j] = sum_k x[j * stride + k] w[k] = sum_r sum_q x_r[j + q] w_r[q],
+    # with x_r = x[r::stride] and w_r = w[r::stride], i.e. a convolution with stride 1
+    # over `stride` times more channels, on a signal and a kernel `stride` times shorter.
+    input = _polyphase(input, stride)
+    length = input.shape[-1] + 2 * padding
+    kernel_size = int(math.ceil(kernel_size / stride))
+
+    # We are going to process the input blocks by blocks, which is the usual overlap-save
+    # method, and keeps the FFT size, and the memory usage, bounded by the kernel size.
+    # The block size is rounded up to the next size that is fast for FFT, see `next_fast_len`.
+    # With partitions, the FFT size only depends on the partition size.
+    if partition_size is None:
+        block_size: int = next_fast_len(min(int(kernel_size * block_ratio), length))
+    else:
+        block_size = 2 * partition_size
+    return input, kernel_size, block_size, target_length, padding
+
+
+class MemoryPlan(NamedTuple):
+    """
+    Execution plan of `fft_conv1d` with a memory budget, see `fft_conv1d_plan`.
+    The convolution is computed over slices of `batch_size` entries of the batch,
+    `out_channels` output channels in each group, and `frames` blocks of outputs.
+    `peak_memory` is the planned peak memory in bytes, including the output,
+    the padded input and the spectrum of the weight, but not the original input.
+    """
+    batch_size: int
+    out_channels: int
+    frames: int
+    peak_memory: int
+
+
+def _chunk_memory(batch: int, channels: int, out_channels: int, kernel_size: int,
+                  block_size: int, hop: int, n_parts: int, frames: int, element_size: int):
+    """
+    Estimate the peak memory in bytes used by `_fft_conv1d_frames` to compute `frames` blocks
+    of `hop` outputs, with `batch` entries, `channels` input channels and `out_channels`
+    output channels, over `n_parts` partitions (1 if not using partitions).
+    """
+    n_freqs = block_size // 2 + 1
+    in_frames = frames + n_parts - 1
+    # Padded input, overlapping frames (copied by the FFT), spectrum of the input
+    # and of the output (as real numbers), output frames and their valid part.
+    input = batch * channels * ((in_frames - 1) * hop + block_size)
+    input_frames = batch * channels * in_frames * block_size
+    input_z = 2 * batch * channels * in_frames * n_freqs
+    output_z = 2 * batch * out_channels * frames * n_freqs
+    output_frames = batch * out_channels * frames * block_size
+    output = batch * out_channels * frames * hop
+    peak = input + max(input_frames + input_z, 2 * input_z, input_z + 2 * output_z,
+                       3 * output_z + output_frames, output_frames + output)
+    return element_size * peak
+
+
+def _plan_memory(batch: int, channels: int, length: int, out_channels: int, groups: int,
+                 kernel_size: int, block_size: int, target_length: int,
+                 partition_size: Optional[int], element_size: int, max_memory: Optional[int],
+                 strict: bool = True):
+    """
+    Return the `MemoryPlan` for `_fft_conv1d_spectrum`, with the arguments returned
+    by `_prepare_fft_conv1d`, `channels` and `out_channels` being the number of
+    input and output channels of the stride 1 convolution.
+    If the convolution cannot be computed within `max_memory`, raises a `RuntimeError`
+    if `strict` is True, otherwise returns the plan with the smallest slices.
+    """
+    if partition_size is None:
+        hop = block_size - kernel_size + 1
+        n_parts = 1
+    else:
+        hop = partition_size
+        n_parts = int(math.ceil(kernel_size / partition_size))
+    n_freqs = block_size // 2 + 1
+    fixed = element_size * (batch * channels * length + batch * out_channels * target_length +
+                            2 * n_parts * out_channels * (channels // groups) * n_freqs)
+    sizes = [batch, out_channels // groups, int(math.ceil(target_length / hop))]
+    peak = fixed + _chunk_memory(sizes[0], channels, groups * sizes[1], kernel_size,
+                                 block_size, hop, n_parts, sizes[2], element_size)
+    if max_memory is not None:
+        # Slicing the frames only costs the overlap between slices, while slicing
+        # the output channels requires computing again the spectrum of the input,
+        # so we first slice the frames, then the batch, then the output channels.
+        for index in [2, 0, 1]:
+            if peak <= max_memory:
+                break
+            low = 1
+            high = sizes[index]
+            while low < high:
+                sizes[index] = (low + high + 1) // 2
+                peak = fixed + _chunk_memory(sizes[0], channels, groups * sizes[1], kernel_size,
+                                             block_size, hop, n_parts, sizes[2], element_size)
+                if peak <= max_memory:
+                    low = sizes[index]
+                else:
+                    high = sizes[index] - 1
+            sizes[index] = low
+            peak = fixed + _chunk_memory(sizes[0], channels, groups * sizes[1], kernel_size,
+                                         block_size, hop, n_parts, sizes[2], element_size)
+        if strict and peak > max_memory:
+            raise RuntimeError(f"Cannot compute the convolution with max_memory={max_memory} "
+                               f"bytes, at least {peak} bytes are required.")
+    return MemoryPlan(sizes[0], sizes[1], sizes[2], peak)
+
+
+def _compute_element_size(input: torch.Tensor):
+    """
+    Return the size in bytes of the elements used to compute the convolution of `input`,
+    see `_compute_dtype`.
+    """
+    if _compute_dtype(input.dtype) != input.dtype:
+        return 4
+    return input.element_size()
+
+
+def _fft_conv1d_frames(input: torch.Tensor, weight_z: torch.Tensor,
+                       kernel_size: int, block_size: int, partition_size: Optional[int]):
+    """
+    Valid convolution with stride 1 of `input`, with the weight spectrum returned by `_spectrum`.
+    The extra entries at the end of the output should be discarded by the caller.
+    """
+    if partition_size is None:
+        return _fft_conv1d_blocks(input, weight_z, kernel_size, block_size)
+    else:
+        return _fft_conv1d_partitioned(input, weight_z, kernel_size, partition_size)
+
+
+def _fft_conv1d_chunked(input: torch.Tensor, weight_z: torch.Tensor,
+                        kernel_size: int, block_size: int, target_length: int,
+                        partition_size: Optional[int], plan: MemoryPlan):
+    """
+    Same as `_fft_conv1d_frames`, but computed over the slices given by `plan`.
+    """
+    batch = input.shape[0]
+    groups, group_out_channels = _out_channels(weight_z)
+    hop = block_size - kernel_size + 1 if partition_size is None else partition_size
+    length = plan.frames * hop
+    out = input.new_empty(batch, groups, group_out_channels, target_length)
+    for offset in range(0, batch, plan.batch_size):
+        batch_slice = input[offset:offset + plan.batch_size]
+        for channel in range(0, group_out_channels, plan.out_channels):
+            channels = min(plan.out_channels, group_out_channels - channel)
+            weight_slice = _narrow_out_channels(weight_z, channel, channels)
+            for start in range(0, target_length, length):
+                end = min(start + length, target_length)
+                # No reference is kept to the output of a slice, so that it is freed
+                # before computing the next one.
+                out[offset:offset + plan.batch_size, :, channel:channel + channels,
+                    start:end] = _fft_conv1d_frames(
+                        batch_slice[..., start:end + kernel_size - 1], weight_slice,
+                        kernel_size, block_size, partition_size,
+                    )[..., :end - start].reshape(-1, groups, channels, end - start)
+    return out.reshape(batch, groups * group_out_channels, target_length)
+
+
+def _fft_conv1d_spectrum(input: torch.Tensor, weight_z: torch.Tensor,
+                         kernel_size: int, block_size: int,
+                         bias: Optional[torch.Tensor], target_length: int,
+                         partition_size: Optional[int], max_memory: Optional[int] = None,
+                         padding: int = 0, padding_mode: str = 'zeros', strict: bool = True):
+    """
+    Same as `fft_conv1d` but with the input and padding returned by `_prepare_fft_conv1d`,
+    and the spectrum of the weight returned by `_spectrum`. See `_plan_memory` for `strict`.
+    """
+    if max_memory is None and partition_size is None:
+        out = _fft_conv1d_blocks(input, weight_z, kernel_size, block_size, padding, padding_mode)
+        out = out[..., :target_length]
+    elif max_memory is None:
+        input = _pad(input, padding, padding_mode)
+        out = _fft_conv1d_frames(input, weight_z, kernel_size, block_size, partition_size)
+        out = out[..., :target_length]
+    else:
+        input = _pad(input, padding, padding_mode)
+        batch, channels, length = input.shape
+        groups, group_out_channels = _out_channels(weight_z)
+        plan = _plan_memory(batch, channels, length, groups * group_out_channels, groups,
+                            kernel_size, block_size, target_length, partition_size,
+                            _compute_element_size(input), max_memory, strict)
+        out = _fft_conv1d_chunked(input, weight_z, kernel_size, block_size, target_length,
+                                  partition_size, plan)
+    if bias is not None:
+        out += bias[:, None]
+    return out
+
+
 def fft_conv1d(
         input: torch.Tensor, weight: torch.Tensor,
         bias: Optional[torch.Tensor] = None, stride: int = 1, padding: int = 0,
-        block_ratio: float = 5):
+        block_ratio: float = 5, dilation: int = 1, groups: int = 1,
+        partition_size: Optional[int] = None, max_memory: Optional[int] = None,
+        padding_mode: str = 'zeros'):
     """
     Same as `torch.nn.functional.conv1d` but using FFT for the convolution.
     Please check PyTorch documentation for more information.
 
     Args:
         input (Tensor): input signal of shape `[B, C, T]`.
-        weight (Tensor): weight of the convolution `[D, C, K]` with `D` the number
+        weight (Tensor): weight of the convolution `[D, C / groups, K]` with `D` the number
             of output channels.
         bias (Tensor or None): if not None, bias term for the convolution.
         stride (int): stride of convolution.
         padding (int): padding to apply to the input.
         block_ratio (float): can be tuned for speed. The input is splitted in chunks
-            with a size of `int(block_ratio * kernel_size)`.
+            with a size of `int(block_ratio * kernel_size)`, rounded up to the next
+            size that is fast for FFT (see `julius.core.next_fast_len`).
+        dilation (int): spacing between the kernel elements. The dilated kernel is
+            evaluated with FFT as a kernel of size `dilation * (K - 1) + 1`.
+        groups (int): number of blocked connections from input to output channels.
+            Only the spectral products within each group are computed,
+            so that a depthwise convolution (`groups = C`) costs `C` times less
+            than the equivalent dense convolution.
+        partition_size (int or None): if not None, uses a uniformly partitioned convolution:
+            the kernel is split into partitions of size `partition_size`, and the input
+            in blocks of the same size, using FFTs of size `2 * partition_size`.
+            The memory used, and the FFT size, no longer depend on the kernel size,
+            which is useful for very long kernels, e.g. reverberation impulse responses.
+            In that case, `block_ratio` is ignored.
+        max_memory (int or None): if not None, memory budget in bytes. The convolution
+            is computed over slices of the frames, batch and output channels,
+            so that the planned peak memory stays under `max_memory`,
+            see `fft_conv1d_plan`. The convolutions computing the gradients have different
+            shapes and are planned separately, with the smallest slices if
+            they cannot fit within `max_memory`, see `_FFTConv1dFunction`.
+        padding_mode (str): one of `'zeros'`, `'replicate'` or `'reflect'`, as for
+            `torch.nn.Conv1d`. With a stride of 1 and without `partition_size` or `max_memory`,
+            the padding is only applied to the frames overlapping the edges of the input,
+            and the other frames are a view on the input, which is never copied.
 
     Shape:
 
-        - Inputs: `input` is `[B, C, T]`, `weight` is `[D, C, K]` and bias is `[D]`.
+        - Inputs: `input` is `[B, C, T]`, `weight` is `[D, C / groups, K]` and bias is `[D]`.
         - Output: `(*, T)`
 
 
     ..note::
         This function is faster than `torch.nn.functional.conv1d` only in specific cases.
         Typically, the kernel size should be of the order of 256 to see any real gain,
-        for a stride of 1.
+        for a stride of 1. With a stride larger than 1, the input and kernel are
+        split into their `stride` polyphase components, so that only the outputs
+        that are kept get computed.
+
+    ..note::
+        `float16` and `bfloat16` inputs and weights are supported. The FFTs and the frequency
+        domain products are then computed in `float32`, while the output
+        has the same dtype as the input. The weight can have
+        a different dtype than the input, e.g. a `float32` module with `bfloat16` inputs.
+
+    ..note::
+        When a gradient is required, the convolution goes through a custom autograd
+        function, see `_FFTConv1dFunction`, which only saves the input and the weight
+        for the backward, instead of all the intermediate spectra.
 
     ..Warning::
-        Dilation and groups are not supported at the moment. This function might use
-        more memory than the default Conv1d implementation.
+        This function might use more memory than the default Conv1d implementation,
+        unless `max_memory` is used.
+    """
+    if not torch.jit.is_scripting() and _requires_grad(input, weight, bias):
+        return _FFTConv1dFunction.apply(
+            input, weight, bias, stride, padding, block_ratio, dilation, groups,
+            partition_size, max_memory, padding_mode, None)
+    input, kernel_size, block_size, target_length, padding = _prepare_fft_conv1d(
+        input, weight, stride, padding, block_ratio, dilation, groups, partition_size,
+        padding_mode)
+    weight_z = _spectrum(
+        _transform_weight(weight, dilation, stride), block_size, groups, partition_size)
+    return _fft_conv1d_spectrum(
+        input, weight_z, kernel_size, block_size, bias, target_length, partition_size,
+        max_memory, padding, padding_mode)
+
+
+def fft_conv1d_plan(
+        input: torch.Tensor, weight: torch.Tensor, stride: int = 1, padding: int = 0,
+        block_ratio: float = 5, dilation: int = 1, groups: int = 1,
+        partition_size: Optional[int] = None, max_memory: Optional[int] = None):
+    """
+    Return the `MemoryPlan` used by `fft_conv1d` with the same arguments, with the
+    size of the slices and the planned peak memory in bytes. If `max_memory` is None,
+    the convolution is computed in a single slice. Raises a `RuntimeError` if the
+    convolution cannot be computed within `max_memory`.
+
+    >>> x = torch.randn(16, 8, 48000)
+    >>> w = torch.randn(8, 8, 1024)
+    >>> plan = fft_conv1d_plan(x, w, max_memory=2**26)
+    >>> print(plan.peak_memory <= 2**26, plan.batch_size, plan.out_channels)
+    True 16 8
+    >>> print(plan.frames < fft_conv1d_plan(x, w).frames)
+    True
     """
-    input = F.pad(input, (padding, padding))
+    input, kernel_size, block_size, target_length, padding = _prepare_fft_conv1d(
+        input, weight, stride, padding, block_ratio, dilation, groups, partition_size)
     batch, channels, length = input.shape
-    out_channels, _, kernel_size = weight.shape
+    length += 2 * padding
+    return _plan_memory(batch, channels, length, weight.shape[0], groups, kernel_size, block_size,
+                        target_length, partition_size, _compute_element_size(input), max_memory)
 
-    if length < kernel_size:
-        raise RuntimeError(f"Input should be at least as large as the kernel size {kernel_size}, "
-                           f"but it is only {length} samples long.")
-    if block_ratio < 1:
-        raise RuntimeError("Block ratio must be greater than 1.")
 
-    # We are going to process the input blocks by blocks, as for some reason it is faster
-    # and less memory intensive (I think the culprit is `torch.einsum`.
-    block_size: int = min(int(kernel_size * block_ratio), length)
-    fold_stride = block_size - kernel_size + 1
-    weight = pad_to(weight, block_size)
-    weight_z = _rfft(weight)
+def _version(weight: torch.Tensor):
+    """
+    Return the version counter of `weight`, which is incremented by in-place modifications.
+    Inference tensors do not track it, but they cannot be modified in place anyway.
+    """
+    if hasattr(weight, 'is_inference') and weight.is_inference():
+        return -1
+    return weight._version
 
-    # We pad the input and get the different frames, on which
-    frames = unfold(input, block_size, fold_stride)
 
-    frames_z = _rfft(frames)
-    out_z = _compl_mul_conjugate(frames_z, weight_z)
-    out = _irfft(out_z, block_size)
-    # The last bit is invalid, because FFT will do a circular convolution.
-    out = out[..., :-kernel_size + 1]
-    out = out.reshape(batch, out_channels, -1)
-    out = out[..., ::stride]
-    target_length = (length - kernel_size) // stride + 1
-    out = out[..., :target_length]
-    if bias is not None:
-        out += bias[:, None]
-    return out
+class SpectrumCache:
+    """
+    Cache for the spectrum of the weight used with `fft_conv1d`.
+    The FFT of the weight is only recomputed when the weight changes
+    (i.e. it was modified in place or moved to another device or dtype),
+    or when the input length changes the block size.
+    Only the spectra of the last `max_size` block sizes are kept.
+
+    If the weight requires a gradient and autograd is enabled, the spectrum returned by `get`
+    is part of the autograd graph and is never cached. This is not the case with
+    `SpectrumCache.fft_conv1d`, which computes the gradients itself, see `_FFTConv1dFunction`.
+
+    Args:
+        max_size (int): maximum number of block sizes to keep the spectrum for.
+
+    >>> cache = SpectrumCache()
+    >>> weight = torch.randn(4, 2, 64)
+    >>> x = torch.randn(3, 2, 1024)
+    >>> y = cache.fft_conv1d(x, weight)
+    >>> print(torch.allclose(y, fft_conv1d(x, weight), atol=1e-5))
+    True
+    >>> print(len(cache))
+    1
+    """
+    def __init__(self, max_size: int = 4):
+        self.max_size = max_size
+        self._spectra: 'OrderedDict[int, torch.Tensor]' = OrderedDict()
+        self._key: Optional[Tuple[
+            int, int, torch.device, torch.dtype, int, int, int, Optional[int]]] = None
+
+    def __len__(self):
+        return len(self._spectra)
+
+    def clear(self):
+        """
+        Remove all the cached spectra.
+        """
+        self._spectra.clear()
+        self._key = None
+
+    def get(self, weight: torch.Tensor, block_size: int, dilation: int = 1, groups: int = 1,
+            stride: int = 1, partition_size: Optional[int] = None):
+        """
+        Return the spectrum of `weight` padded to `block_size`, as used internally
+        by `fft_conv1d` with the given `dilation`, `groups`, `stride` and `partition_size`.
+        """
+        if torch.is_grad_enabled() and weight.requires_grad:
+            # The spectrum is part of the autograd graph, it cannot be reused.
+            return _spectrum(_transform_weight(weight, dilation, stride), block_size, groups,
+                             partition_size)
+        key = (weight.data_ptr(), _version(weight), weight.device, weight.dtype,
+               dilation, groups, stride, partition_size)
+        if key != self._key:
+            self.clear()
+            self._key = key
+        if block_size in self._spectra:
+            self._spectra.move_to_end(block_size)
+        else:
+            self._spectra[block_size] = _spectrum(
+                _transform_weight(weight, dilation, stride), block_size, groups, partition_size)
+            if len(self._spectra) > self.max_size:
+                self._spectra.popitem(last=False)
+        return self._spectra[block_size]
+
+    def fft_conv1d(self, input: torch.Tensor, weight: torch.Tensor,
+                   bias: Optional[torch.Tensor] = None, stride: int = 1, padding: int = 0,
+                   block_ratio: float = 5, dilation: int = 1, groups: int = 1,
+                   partition_size: Optional[int] = None, max_memory: Optional[int] = None,
+                   padding_mode: str = 'zeros'):
+        """
+        Same as `fft_conv1d`, but reusing the spectrum of `weight` when possible.
+        `weight` should always be the same tensor for a given cache.
+        """
+        if not torch.jit.is_scripting() and _requires_grad(input, weight, bias):
+            return _FFTConv1dFunction.apply(
+                input, weight, bias, stride, padding, block_ratio, dilation, groups,
+                partition_size, max_memory, padding_mode, self)
+        input, kernel_size, block_size, target_length, padding = _prepare_fft_conv1d(
+            input, weight, stride, padding, block_ratio, dilation, groups, partition_size,
+            padding_mode)
+        weight_z = self.get(weight, block_size, dilation, groups, stride, partition_size)
+        return _fft_conv1d_spectrum(
+            input, weight_z, kernel_size, block_size, bias, target_length, partition_size,
+            max_memory, padding, padding_mode)
+
+
+def _requires_grad(input: torch.Tensor, weight: torch.Tensor, bias: Optional[torch.Tensor]):
+    """
+    Return True if autograd should track the convolution of `input` with `weight` and `bias`.
+    """
+    if not torch.is_grad_enabled():
+        return False
+    return input.requires_grad or weight.requires_grad or (
+        bias is not None and bias.requires_grad)
+
+
+def _transpose_weight(weight: torch.Tensor, groups: int):
+    """
+    Given the weight `[D, C / G, K]` of a convolution, return the weight `[C, D / G, K]`
+    of its transpose, i.e. with the input and output channels swapped and the kernel flipped.
+    """
+    out_channels, group_channels, kernel_size = weight.shape
+    weight = weight.reshape(groups, out_channels // groups, group_channels, kernel_size)
+    weight = weight.transpose(1, 2).flip(-1)
+    return weight.reshape(groups * group_channels, out_channels // groups, kernel_size)
+
+
+def _gradient_conv1d(input: torch.Tensor, weight: torch.Tensor, stride: int, padding: int,
+                     block_ratio: float, dilation: int, groups: int,
+                     partition_size: Optional[int], max_memory: Optional[int],
+                     padding_mode: str = 'zeros'):
+    """
+    Same as `fft_conv1d` without bias, used by `_FFTConv1dFunction.backward`, except that if
+    the convolution cannot be computed within `max_memory`, the smallest slices are used
+    instead of raising an error.
+    """
+    input, kernel_size, block_size, target_length, padding = _prepare_fft_conv1d(
+        input, weight, stride, padding, block_ratio, dilation, groups, partition_size,
+        padding_mode)
+    weight_z = _spectrum(
+        _transform_weight(weight, dilation, stride), block_size, groups, partition_size)
+    return _fft_conv1d_spectrum(
+        input, weight_z, kernel_size, block_size, None, target_length, partition_size,
+        max_memory, padding, padding_mode, strict=False)
+
+
+class _FFTConv1dFunction(torch.autograd.Function):
+    """
+    Autograd function for `fft_conv1d`. Only the input and weight are saved for the backward,
+    so that the activation memory is the same as for `torch.nn.functional.conv1d`.
+    Both gradients are computed again as FFT convolutions: the gradient with respect
+    to the input is the full convolution of the output gradient with the transposed weight,
+    and the gradient with respect to the weight is the correlation of the input with the output
+    gradient, summed over the batch, which is also a valid convolution with the batch
+    used as input channels, see `backward`. With `max_memory`, those convolutions
+    are planned separately as their shapes differ from the forward one, and they use
+    the smallest slices, rather than raising an error, if they cannot fit within `max_memory`,
+    so that a training step never fails in the backward after a successful forward.
+
+    If `cache` is not None, it is used to get the spectrum of the weight in the forward.
+    As autograd is disabled in the forward, the spectrum can be cached even if
+    the weight requires a gradient.
+    """
+    @staticmethod
+    def forward(ctx, input: torch.Tensor, weight: torch.Tensor,  # type: ignore
+                bias: Optional[torch.Tensor], stride: int, padding: int, block_ratio: float,
+                dilation: int, groups: int, partition_size: Optional[int],
+                max_memory: Optional[int], padding_mode: str, cache: Optional[SpectrumCache]):
+        ctx.save_for_backward(input, weight)
+        ctx.has_bias = bias is not None
+        ctx.options = (stride, padding, block_ratio, dilation, groups, partition_size,
+                       max_memory, padding_mode)
+        if cache is None:
+            return fft_conv1d(input, weight, bias, stride, padding, block_ratio, dilation,
+                              groups, partition_size, max_memory, padding_mode)
+        else:
+            return cache.fft_conv1d(input, weight, bias, stride, padding, block_ratio,
+                                    dilation, groups, partition_size, max_memory, padding_mode)
+
+    @staticmethod
+    def backward(ctx, grad: torch.Tensor):  # type: ignore
+        input, weight = ctx.saved_tensors
+        (stride, padding, block_ratio, dilation, groups, partition_size, max_memory,
+         padding_mode) = ctx.options
+        batch, channels, length = input.shape
+        out_channels, group_channels, kernel_size = weight.shape
+        kernel_size = dilation * (kernel_size - 1) + 1
+        padded_length = length + 2 * padding
+        grad_input = grad_weight = grad_bias = None
+
+        if ctx.needs_input_grad[0]:
+            # The output gradient is upsampled by the stride, then convolved with the transposed
+            # weight, with a full padding, which gives the gradient of the padded input,
+            # except for the last samples that were not used because of the stride.
+            grad_input = _gradient_conv1d(
+                _dilate(grad, stride), _transpose_weight(weight, groups), 1, kernel_size - 1,
+                block_ratio, dilation, groups, partition_size, max_memory)
+            grad_input = _pad_backward(pad_to(grad_input, padded_length), padding, padding_mode)
+
+        if ctx.needs_input_grad[1]:
+            # grad_weight[d, c, k] = sum_b sum_t grad[b, d, t] input[b, c, t * s + k * dilation]
+            # with `s` the stride, is a convolution with a stride `dilation` and a dilation `s`
+            # of the input `[C / G, G * B, T]`, with the output gradient `[D, B, T']` as weight.
+            input = input.reshape(batch, groups, group_channels, length)
+            input = input.permute(2, 1, 0, 3).reshape(group_channels, groups * batch, length)
+            grad_weight = _gradient_conv1d(
+                input, grad.transpose(0, 1), dilation, padding, block_ratio, stride, groups,
+                None, max_memory, padding_mode)
+            grad_weight = grad_weight[..., :weight.shape[-1]].transpose(0, 1)
+
+        if ctx.has_bias and ctx.needs_input_grad[2]:
+            grad_bias = grad.sum(dim=(0, 2))
+        return (grad_input, grad_weight, grad_bias) + (None,) * 9
 
 
 class FFTConv1d(torch.nn.Module):
@@ -147,6 +983,12 @@ class FFTConv1d(torch.nn.Module):
         stride (int): stride of convolution.
         padding (int): padding to apply to the input.
         bias (bool): if True, use a bias term.
+        dilation (int): spacing between the kernel elements.
+        groups (int): number of blocked connections from input to output channels.
+        partition_size (int or None): if not None, uses a uniformly partitioned convolution,
+            see `fft_conv1d`.
+        max_memory (int or None): if not None, memory budget in bytes, see `fft_conv1d`.
+        padding_mode (str): one of `'zeros'`, `'replicate'` or `'reflect'`.
 
     ..note::
         This module is faster than `torch.nn.Conv1d` only in specific cases.
@@ -154,8 +996,11 @@ class FFTConv1d(torch.nn.Module):
         for a stride of 1.
 
     ..warning::
-        Dilation and groups are not supported at the moment. This module might use
-        more memory than the default Conv1d implementation.
+        This module might use more memory than the default Conv1d implementation.
+
+    ..note::
+        If autotuning is enabled (see `julius.autotune`), the block ratio
+        is tuned for each input shape.
 
     >>> fftconv = FFTConv1d(12, 24, 128, 4)
     >>> x = torch.randn(4, 12, 1024)
@@ -163,21 +1008,365 @@ class FFTConv1d(torch.nn.Module):
     [4, 24, 225]
     """
     def __init__(self, in_channels: int, out_channels: int, kernel_size: int,
-                 stride: int = 1, padding: int = 0, bias: bool = True):
+                 stride: int = 1, padding: int = 0, bias: bool = True,
+                 dilation: int = 1, groups: int = 1, partition_size: Optional[int] = None,
+                 max_memory: Optional[int] = None, padding_mode: str = 'zeros'):
         super().__init__()
         self.in_channels = in_channels
         self.out_channels = out_channels
         self.kernel_size = kernel_size
         self.stride = stride
         self.padding = padding
+        self.dilation = dilation
+        self.groups = groups
+        self.partition_size = partition_size
+        self.max_memory = max_memory
+        self.padding_mode = padding_mode
 
-        conv = torch.nn.Conv1d(in_channels, out_channels, kernel_size, bias=bias)
+        conv = torch.nn.Conv1d(in_channels, out_channels, kernel_size, bias=bias,
+                               dilation=dilation, groups=groups)
         self.weight = conv.weight
         self.bias = conv.bias
+        self._spectrum_cache = SpectrumCache()
 
     def forward(self, input: torch.Tensor):
+        if not torch.jit.is_scripting():
+            block_ratio = autotune.DEFAULT_BLOCK_RATIO
+            tuner = autotune.get_tuner()
+            if tuner is not None and self.partition_size is None:
+                _, block_ratio = tuner.choose(
+                    input, self.weight, self.stride, self.padding, self.dilation, self.groups,
+                    fft_only=True)
+            return self._spectrum_cache.fft_conv1d(
+                input, self.weight, self.bias, self.stride, self.padding, block_ratio,
+                self.dilation, self.groups, self.partition_size, self.max_memory,
+                self.padding_mode)
         return fft_conv1d(
-            input, self.weight, self.bias, self.stride, self.padding)
+            input, self.weight, self.bias, self.stride, self.padding,
+            dilation=self.dilation, groups=self.groups, partition_size=self.partition_size,
+            max_memory=self.max_memory, padding_mode=self.padding_mode)
+
+    def __repr__(self):
+        return simple_repr(self, overrides={"bias": self.bias is not None})
+
+
+class StreamingFFTConv1d(FFTConv1d):
+    """
+    Same as `FFTConv1d`, but also supports processing a long signal chunk by chunk
+    with `feed`, using the overlap-save method. The last input samples required
+    for the next output are kept between calls, as well as the spectrum of the weight,
+    so that each call only costs a single block FFT of size `chunk_length + kernel_size - 1`.
+    The concatenation of the outputs of all the calls to `feed`, followed by `flush`,
+    is the same as the output of the offline `forward`.
+
+    Args:
+        see `FFTConv1d`.
+
+    ..note::
+        The padding is applied to the beginning of the stream with the first call to `feed`,
+        and to its end in `flush`. The chunks can have arbitrary sizes, but using a constant
+        chunk size will allow reusing the same spectrum of the weight for every chunk.
+        The spectrum is not cached if the weight requires a gradient, so you should
+        stream under `torch.no_grad()`.
+
+    >>> conv = StreamingFFTConv1d(2, 3, 64, padding=32)
+    >>> x = torch.randn(1, 2, 1000)
+    >>> outs = [conv.feed(chunk) for chunk in x.split(160, dim=-1)]
+    >>> outs.append(conv.flush())
+    >>> y = torch.cat(outs, dim=-1)
+    >>> print(list(y.shape))
+    [1, 3, 1001]
+    >>> print(torch.allclose(y, conv(x), atol=1e-5))
+    True
+    """
+    def __init__(self, in_channels: int, out_channels: int, kernel_size: int,
+                 stride: int = 1, padding: int = 0, bias: bool = True,
+                 dilation: int = 1, groups: int = 1):
+        super().__init__(in_channels, out_channels, kernel_size, stride, padding, bias,
+                         dilation, groups)
+        self._tail: Optional[torch.Tensor] = None
+        # Number of samples to drop from the next chunks, when the stride is larger
+        # than the kernel size and the next output starts after the end of the buffer.
+        self._skip = 0
+
+    def reset(self):
+        """
+        Forget about the current stream, the next call to `feed` will start a new one.
+        """
+        self._tail = None
+        self._skip = 0
+
+    def feed(self, chunk: torch.Tensor):
+        """
+        Process a new chunk `[B, C, T]` of the stream and return all the outputs
+        that can be computed so far, as a tensor `[B, D, T']`.
+        """
+        if self._tail is None:
+            self._tail = chunk.new_zeros(chunk.shape[0], chunk.shape[1], self.padding)
+        if self._skip > 0:
+            skip = min(self._skip, chunk.shape[-1])
+            chunk = chunk[..., skip:]
+            self._skip -= skip
+        buffer = torch.cat([self._tail, chunk], dim=-1)
+        batch, _, length = buffer.shape
+        kernel_size = self.dilation * (self.kernel_size - 1) + 1
+        if length < kernel_size:
+            self._tail = buffer
+            return buffer.new_zeros(batch, self.out_channels, 0)
+
+        # With a constant chunk size, the tail is always shorter than the kernel size,
+        # so that `block_size` stays the same and the spectrum of the weight can be reused.
+        block_size = next_fast_len(max(kernel_size - 1 + chunk.shape[-1], length))
+        weight_z = self._spectrum_cache.get(self.weight, block_size, self.dilation, self.groups)
+        out = _fft_conv1d_blocks(pad_to(buffer, block_size), weight_z, kernel_size, block_size)
+        n_outputs = (length - kernel_size) // self.stride + 1
+        out = out[..., :length - kernel_size + 1:self.stride]
+        self._tail = buffer[..., n_outputs * self.stride:]
+        self._skip = max(0, n_outputs * self.stride - length)
+        if self.bias is not None:
+            out += self.bias[:, None]
+        return out
+
+    def flush(self):
+        """
+        Process the end of the stream, including the right padding, and return the remaining
+        outputs. The next call to `feed` will start a new stream.
+        """
+        tail = self._tail
+        if tail is None:
+            raise RuntimeError("flush() called before any call to feed().")
+        out = self.feed(tail.new_zeros(tail.shape[0], tail.shape[1], self.padding))
+        self.reset()
+        return out
+
+
+def _nonuniform_partitions(kernel_size: int, latency: int,
+                           max_partition_size: Optional[int] = None):
+    """
+    Return the partitions of a causal kernel of size `kernel_size` used by
+    `LowLatencyFFTConv1d`, as a list of `(offset, partition_size, length)`, with `offset`
+    the delay (in samples) of the first tap of the partition, and `length` its number of taps.
+    The partition sizes are `latency, latency, 2 * latency, 2 * latency, 4 * latency...`,
+    up to `max_partition_size`, which is then used for all the remaining taps.
+    """
+    partitions: List[Tuple[int, int, int]] = []
+    offset = 0
+    partition_size = latency
+    while offset < kernel_size:
+        length = kernel_size - offset
+        if max_partition_size is None or 2 * partition_size <= max_partition_size:
+            length = min(length, 2 * partition_size)
+        partitions.append((offset, partition_size, length))
+        offset += length
+        partition_size *= 2
+    return partitions
+
+
+class LowLatencyFFTConv1d(torch.nn.Module):
+    """
+    Causal convolution for real-time processing of long FIR filters, with a latency of
+    `latency` samples, using a non-uniformly partitioned convolution.
+    The kernel is split into partitions whose size grows with their delay
+    (see `_nonuniform_partitions`): the head of the kernel uses partitions of `latency` samples,
+    while the tail uses larger FFTs, which are more efficient.
+    Each partition of size `S` is a uniformly partitioned convolution (see `fft_conv1d`
+    with `partition_size`) over blocks of size `S`, computed ahead of time
+    at a different phase for each size, so that at most two partition sizes are evaluated
+    for each block of `latency` samples, which bounds the worst case time for each block.
+
+    The streaming API is the same as for `StreamingFFTConv1d`: the signal is fed
+    chunk by chunk to `feed`, which returns the outputs for all the complete blocks
+    of `latency` samples received so far, and `flush` returns the remaining outputs.
+    Using chunks of `latency` samples, each call to `feed` returns exactly the outputs
+    for the chunk it was given.
+
+    Args:
+        in_channels (int): number of input channels.
+        out_channels (int): number of output channels.
+        kernel_size (int): kernel size of convolution.
+        latency (int): size of the blocks, in samples.
+        bias (bool): if True, use a bias term.
+        dilation (int): spacing between the kernel elements.
+        groups (int): number of blocked connections from input to output channels.
+        max_partition_size (int or None): if not None, maximum size of the partitions,
+            which bounds the FFT size for very long kernels.
+        head_fft (bool or None): if False, the head of the kernel (the first `2 * latency` taps)
+            is evaluated with a direct convolution instead of FFT. If None, FFT is used
+            if `latency` is larger than 32.
+
+    ..note::
+        The convolution is causal, i.e. the `t`-th output depends on the input from
+        `t - kernel_size + 1` to `t`, so that the output has the same length as the input.
+        This is the same as `torch.nn.Conv1d` with a left padding of `kernel_size - 1`,
+        which is what `forward` computes.
+        The spectrum of the partitions is not cached if the weight requires a gradient,
+        so you should stream under `torch.no_grad()`.
+
+    >>> conv = LowLatencyFFTConv1d(2, 2, 1000, latency=64)
+    >>> x = torch.randn(1, 2, 1000)
+    >>> with torch.no_grad():
+    ...     outs = [conv.feed(chunk) for chunk in x.split(64, dim=-1)]
+    ...     outs.append(conv.flush())
+    ...     y = torch.cat(outs, dim=-1)
+    ...     print(torch.allclose(y, conv(x), atol=1e-4))
+    True
+    >>> print([chunk.shape[-1] for chunk in outs[:3]])
+    [64, 64, 64]
+    """
+    def __init__(self, in_channels: int, out_channels: int, kernel_size: int, latency: int,
+                 bias: bool = True, dilation: int = 1, groups: int = 1,
+                 max_partition_size: Optional[int] = None, head_fft: Optional[bool] = None):
+        super().__init__()
+        if latency < 1:
+            raise ValueError("Latency must be at least 1.")
+        if max_partition_size is not None and max_partition_size < latency:
+            raise ValueError("Maximum partition size must be at least the latency.")
+        self.in_channels = in_channels
+        self.out_channels = out_channels
+        self.kernel_size = kernel_size
+        self.latency = latency
+        self.dilation = dilation
+        self.groups = groups
+        self.max_partition_size = max_partition_size
+        if head_fft is None:
+            head_fft = latency > 32
+        self.head_fft = head_fft
+
+        conv = torch.nn.Conv1d(in_channels, out_channels, kernel_size, bias=bias,
+                               dilation=dilation, groups=groups)
+        self.weight = conv.weight
+        self.bias = conv.bias
+        self._partitions = _nonuniform_partitions(
+            dilation * (kernel_size - 1) + 1, latency, max_partition_size)
+        self._spectra: List[torch.Tensor] = []
+        self._spectra_key: Optional[Tuple[int, int, torch.device, torch.dtype]] = None
+        self.reset()
+
+    def reset(self):
+        """
+        Forget about the current stream, the next call to `feed` will start a new one.
+        """
+        self._history: Optional[torch.Tensor] = None
+        self._pending: Optional[torch.Tensor] = None
+        self._accumulator: Optional[torch.Tensor] = None
+        self._block = 0
+
+    def forward(self, input: torch.Tensor):
+        kernel_size = self.dilation * (self.kernel_size - 1) + 1
+        return fft_conv1d(F.pad(input, (kernel_size - 1, 0)), self.weight, self.bias,
+                          dilation=self.dilation, groups=self.groups)
+
+    def _partition_weights(self):
+        """
+        Return the weight of each partition, as used with `torch.nn.functional.conv1d`.
+        """
+        weight = _dilate(self.weight, self.dilation)
+        kernel_size = weight.shape[-1]
+        weights = []
+        for offset, _, length in self._partitions:
+            # The delay of the tap `k` of the kernel is `kernel_size - 1 - k`.
+            weights.append(weight[..., kernel_size - offset - length:kernel_size - offset])
+        return weights
+
+    def _get_spectra(self):
+        """
+        Return the spectrum of each partition, see `_partitioned_weight_spectrum`,
+        only computing them again when the weight changes, see `SpectrumCache`.
+        For the head partition, if `head_fft` is False, the weight is returned instead.
+        """
+        weight = self.weight
+        cache = not (torch.is_grad_enabled() and weight.requires_grad)
+        key = (weight.data_ptr(), _version(weight), weight.device, weight.dtype)
+        if cache and key == self._spectra_key:
+            return self._spectra
+        spectra = []
+        for index, partition_weight in enumerate(self._partition_weights()):
+            _, partition_size, _ = self._partitions[index]
+            if index == 0 and not self.head_fft:
+                spectra.append(partition_weight)
+            else:
+                spectra.append(
+                    _partitioned_weight_spectrum(partition_weight, partition_size, self.groups))
+        if cache:
+            self._spectra = spectra
+            self._spectra_key = key
+        return spectra
+
+    def _process_block(self, block: torch.Tensor, spectra: List[torch.Tensor]):
+        """
+        Process the next block of `latency` input samples, and return the matching outputs.
+        """
+        assert self._history is not None and self._accumulator is not None
+        latency = self.latency
+        history = torch.cat([self._history[..., latency:], block], dim=-1)
+        self._history = history
+        # The last sample of the history is the last sample of `block`.
+        history_start = self._block * latency + latency - history.shape[-1]
+
+        for index, (offset, partition_size, length) in enumerate(self._partitions):
+            period = partition_size // latency
+            if period == 1:
+                start = self._block * latency
+            elif self._block % period == period // 2 - 1:
+                # The partitions of size `S > latency` have a delay of at least
+                # `2 * S - 2 * latency`, so that the outputs for a block of size `S` can be
+                # computed during any of the `S / latency` blocks before it is needed.
+                # Using a different phase for each size, they never happen at the same time.
+                start = partition_size * ((self._block + period - 1) // period)
+            else:
+                continue
+            begin = start - offset - length + 1 - history_start
+            frames = history[..., begin:begin + length + partition_size - 1]
+            if index == 0 and not self.head_fft:
+                out = F.conv1d(frames, spectra[index], groups=self.groups)
+            else:
+                out = _fft_conv1d_partitioned(frames, spectra[index], length, partition_size)
+                out = out[..., :partition_size]
+            start -= self._block * latency
+            self._accumulator[..., start:start + partition_size] += out
+
+        out = self._accumulator[..., :latency]
+        self._accumulator = F.pad(self._accumulator[..., latency:], (0, latency))
+        self._block += 1
+        if self.bias is not None:
+            out = out + self.bias[:, None]
+        return out
+
+    def feed(self, chunk: torch.Tensor):
+        """
+        Process a new chunk `[B, C, T]` of the stream and return the outputs
+        for all the complete blocks of `latency` samples so far, as a tensor `[B, D, T']`.
+        """
+        batch, channels, _ = chunk.shape
+        if self._pending is None:
+            kernel_size = self.dilation * (self.kernel_size - 1) + 1
+            max_partition_size = self._partitions[-1][1]
+            self._pending = chunk.new_zeros(batch, channels, 0)
+            self._history = chunk.new_zeros(batch, channels, kernel_size - 1 + self.latency)
+            self._accumulator = chunk.new_zeros(batch, self.out_channels, 2 * max_partition_size)
+        pending = torch.cat([self._pending, chunk], dim=-1)
+        n_blocks = pending.shape[-1] // self.latency
+        spectra = self._get_spectra()
+        outs = [pending.new_zeros(batch, self.out_channels, 0)]
+        for block in range(n_blocks):
+            outs.append(self._process_block(
+                pending[..., block * self.latency:(block + 1) * self.latency], spectra))
+        self._pending = pending[..., n_blocks * self.latency:]
+        return torch.cat(outs, dim=-1)
+
+    def flush(self):
+        """
+        Process the last incomplete block of the stream, and return the remaining outputs.
+        The next call to `feed` will start a new stream.
+        """
+        pending = self._pending
+        if pending is None:
+            raise RuntimeError("flush() called before any call to feed().")
+        remaining = pending.shape[-1]
+        out = self.feed(pending.new_zeros(pending.shape[0], pending.shape[1],
+                                          (self.latency - remaining) % self.latency))
+        self.reset()
+        return out[..., :remaining]
 
     def __repr__(self):
         return simple_repr(self, overrides={"bias": self.bias is not None})
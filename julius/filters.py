@@ -10,6 +10,8 @@ from typing import Sequence, Optional
 import torch
 
 # Import all lowpass filters for consistency.
+from .cache import cached
+from .design import FilterSpec
 from .lowpass import lowpass_filter, lowpass_filters, LowPassFilter,  LowPassFilters  # noqa
 from .utils import simple_repr
 
@@ -38,6 +40,8 @@ class HighPassFilters(torch.nn.Module):
         fft (bool or None): if True, uses `julius.fftconv` rather than PyTorch convolutions.
             If False, uses PyTorch convolutions. If None, either one will be chosen automatically
             depending on the effective filter size.
+        spec (FilterSpec or None): if provided, `zeros` is ignored and the filters are designed
+            from the given transition width and attenuation, see `julius.lowpass.LowPassFilters`.
 
 
     ..warning::
@@ -58,9 +62,9 @@ class HighPassFilters(torch.nn.Module):
     """
 
     def __init__(self, cutoffs: Sequence[float], stride: int = 1, pad: bool = True,
-                 zeros: float = 8, fft: Optional[bool] = None):
+                 zeros: float = 8, fft: Optional[bool] = None, spec: Optional[FilterSpec] = None):
         super().__init__()
-        self._lowpasses = LowPassFilters(cutoffs, stride, pad, zeros, fft)
+        self._lowpasses = LowPassFilters(cutoffs, stride, pad, zeros, fft, spec)
 
     @property
     def cutoffs(self):
@@ -82,6 +86,10 @@ class HighPassFilters(torch.nn.Module):
     def fft(self):
         return self._lowpasses.fft
 
+    @property
+    def spec(self):
+        return self._lowpasses.spec
+
     def forward(self, input):
         lows = self._lowpasses(input)
 
@@ -116,9 +124,9 @@ class HighPassFilter(torch.nn.Module):
     """
 
     def __init__(self, cutoff: float, stride: int = 1, pad: bool = True,
-                 zeros: float = 8, fft: Optional[bool] = None):
+                 zeros: float = 8, fft: Optional[bool] = None, spec: Optional[FilterSpec] = None):
         super().__init__()
-        self._highpasses = HighPassFilters([cutoff], stride, pad, zeros, fft)
+        self._highpasses = HighPassFilters([cutoff], stride, pad, zeros, fft, spec)
 
     @property
     def cutoff(self):
@@ -140,6 +148,10 @@ class HighPassFilter(torch.nn.Module):
     def fft(self):
         return self._highpasses.fft
 
+    @property
+    def spec(self):
+        return self._highpasses.spec
+
     def forward(self, input):
         return self._highpasses(input)[0]
 
@@ -149,21 +161,23 @@ class HighPassFilter(torch.nn.Module):
 
 def highpass_filters(input: torch.Tensor,  cutoffs: Sequence[float],
                      stride: int = 1, pad: bool = True,
-                     zeros: float = 8, fft: Optional[bool] = None):
+                     zeros: float = 8, fft: Optional[bool] = None,
+                     spec: Optional[FilterSpec] = None):
     """
     Functional version of `HighPassFilters`, refer to this class for more information.
     """
-    return HighPassFilters(cutoffs, stride, pad, zeros, fft).to(input)(input)
+    return cached(HighPassFilters, (cutoffs, stride, pad, zeros, fft, spec), input)(input)
 
 
 def highpass_filter(input: torch.Tensor,  cutoff: float,
                     stride: int = 1, pad: bool = True,
-                    zeros: float = 8, fft: Optional[bool] = None):
+                    zeros: float = 8, fft: Optional[bool] = None,
+                    spec: Optional[FilterSpec] = None):
     """
     Functional version of `HighPassFilter`, refer to this class for more information.
     Output will not have a dimension inserted in the front.
     """
-    return highpass_filters(input, [cutoff], stride, pad, zeros, fft)[0]
+    return highpass_filters(input, [cutoff], stride, pad, zeros, fft, spec)[0]
 
 
 class BandPassFilter(torch.nn.Module):
@@ -192,6 +206,8 @@ class BandPassFilter(torch.nn.Module):
         fft (bool or None): if True, uses `julius.fftconv` rather than PyTorch convolutions.
             If False, uses PyTorch convolutions. If None, either one will be chosen automatically
             depending on the effective filter size.
+        spec (FilterSpec or None): if provided, `zeros` is ignored and the filters are designed
+            from the given transition width and attenuation, see `julius.lowpass.LowPassFilters`.
 
 
     Shape:
@@ -209,12 +225,13 @@ class BandPassFilter(torch.nn.Module):
     """
 
     def __init__(self, cutoff_low: float, cutoff_high: float, stride: int = 1, pad: bool = True,
-                 zeros: float = 8, fft: Optional[bool] = None):
+                 zeros: float = 8, fft: Optional[bool] = None, spec: Optional[FilterSpec] = None):
         super().__init__()
         if cutoff_low > cutoff_high:
             raise ValueError(f"Lower cutoff {cutoff_low} should be less than "
                              f"higher cutoff {cutoff_high}.")
-        self._lowpasses = LowPassFilters([cutoff_low, cutoff_high], stride, pad, zeros, fft)
+        self._lowpasses = LowPassFilters(
+            [cutoff_low, cutoff_high], stride, pad, zeros, fft, spec)
 
     @property
     def cutoff_low(self):
@@ -240,6 +257,10 @@ class BandPassFilter(torch.nn.Module):
     def fft(self):
         return self._lowpasses.fft
 
+    @property
+    def spec(self):
+        return self._lowpasses.spec
+
     def forward(self, input):
         lows = self._lowpasses(input)
         return lows[1] - lows[0]
@@ -250,9 +271,11 @@ class BandPassFilter(torch.nn.Module):
 
 def bandpass_filter(input: torch.Tensor,  cutoff_low: float, cutoff_high: float,
                     stride: int = 1, pad: bool = True,
-                    zeros: float = 8, fft: Optional[bool] = None):
+                    zeros: float = 8, fft: Optional[bool] = None,
+                    spec: Optional[FilterSpec] = None):
     """
     Functional version of `BandPassfilter`, refer to this class for more information.
     Output will not have a dimension inserted in the front.
     """
-    return BandPassFilter(cutoff_low, cutoff_high, stride, pad, zeros, fft).to(input)(input)
+    return cached(
+        BandPassFilter, (cutoff_low, cutoff_high, stride, pad, zeros, fft, spec), input)(input)
@@ -10,8 +10,11 @@ from typing import Sequence, Optional
 import torch
 from torch.nn import functional as F
 
+from . import autotune
+from .cache import cached
 from .core import sinc
-from .fftconv import fft_conv1d
+from .design import FilterSpec, kaiser_beta, kaiser_size
+from .fftconv import fft_conv1d, SpectrumCache
 from .utils import simple_repr
 
 
@@ -44,7 +47,12 @@ class LowPassFilters(torch.nn.Module):
             cutoff frequency.
         fft (bool or None): if True, uses `julius.fftconv` rather than PyTorch convolutions.
             If False, uses PyTorch convolutions. If None, either one will be chosen automatically
-            depending on the effective filter size.
+            depending on the effective filter size, or by benchmarking both if autotuning
+            is enabled (see `julius.autotune`).
+        spec (FilterSpec or None): if provided, `zeros` is ignored, and the filters use
+            a Kaiser window rather than a Hann window, with the shortest size such that all
+            the filters have the given transition width (in the same unit as `cutoffs`)
+            and stop band attenuation, see `julius.design`.
 
 
     ..warning::
@@ -52,6 +60,18 @@ class LowPassFilters(torch.nn.Module):
         frequency provided. If you combine a lot of filters with very diverse frequencies, it might
         be more efficient to split them over multiple modules with similar frequencies.
 
+    ..note::
+        When using FFT, the spectrum of the filters is cached with a
+        `julius.fftconv.SpectrumCache`, so that it is only computed again if the
+        input length changes the block size. This also applies to all the modules
+        in `julius.filters` and `julius.bands`.
+
+    ..note::
+        `float16` and `bfloat16` inputs are supported, and the output has the same
+        dtype as the input, even if the filters are kept in `float32`.
+        With FFT, the filtering is computed in `float32` (see `julius.fftconv.fft_conv1d`),
+        otherwise, the filters are converted to the dtype of the input.
+
     ..note::
         A lowpass with a cutoff frequency of 0 is defined as the null function
         by convention here. This allows for a highpass with a cutoff of 0 to
@@ -70,7 +90,7 @@ class LowPassFilters(torch.nn.Module):
     """
 
     def __init__(self, cutoffs: Sequence[float], stride: int = 1, pad: bool = True,
-                 zeros: float = 8, fft: Optional[bool] = None):
+                 zeros: float = 8, fft: Optional[bool] = None, spec: Optional[FilterSpec] = None):
         super().__init__()
         self.cutoffs = list(cutoffs)
         if min(self.cutoffs) < 0:
@@ -80,11 +100,21 @@ class LowPassFilters(torch.nn.Module):
         self.stride = stride
         self.pad = pad
         self.zeros = zeros
-        self.half_size = int(zeros / min([c for c in self.cutoffs if c > 0]) / 2)
+        self.spec = spec
+        if spec is None:
+            self.half_size = int(zeros / min([c for c in self.cutoffs if c > 0]) / 2)
+            window = torch.hann_window(2 * self.half_size + 1, periodic=False)
+        else:
+            transition, attenuation = spec
+            self.half_size = max(
+                kaiser_size(cutoff - transition / 2, transition, attenuation)
+                for cutoff in self.cutoffs if cutoff > 0)
+            window = torch.kaiser_window(
+                2 * self.half_size + 1, periodic=False, beta=kaiser_beta(attenuation))
+        self._auto_fft = fft is None
         if fft is None:
             fft = self.half_size > 32
         self.fft = fft
-        window = torch.hann_window(2 * self.half_size + 1, periodic=False)
         time = torch.arange(-self.half_size, self.half_size + 1)
         filters = []
         for cutoff in cutoffs:
@@ -97,16 +127,33 @@ class LowPassFilters(torch.nn.Module):
                 filter_ /= filter_.sum()
             filters.append(filter_)
         self.register_buffer("filters", torch.stack(filters)[:, None])
+        self._spectrum_cache = SpectrumCache()
 
     def forward(self, input):
         shape = list(input.shape)
         input = input.view(-1, 1, shape[-1])
-        if self.pad:
-            input = F.pad(input, (self.half_size, self.half_size), mode='replicate')
-        if self.fft:
-            out = fft_conv1d(input, self.filters, stride=self.stride)
+        padding = self.half_size if self.pad else 0
+        fft = self.fft
+        block_ratio = autotune.DEFAULT_BLOCK_RATIO
+        if not torch.jit.is_scripting():
+            tuner = autotune.get_tuner()
+            if tuner is not None and (self._auto_fft or fft):
+                fft, block_ratio = tuner.choose(
+                    input, self.filters, self.stride, padding, fft_only=not self._auto_fft)
+        if fft:
+            # The replicate padding is applied by `fft_conv1d` only to the frames
+            # at the edges of the input, which avoids copying the whole input.
+            if not torch.jit.is_scripting():
+                # The spectrum of the filters is only computed once per block size.
+                out = self._spectrum_cache.fft_conv1d(
+                    input, self.filters, stride=self.stride, padding=padding,
+                    block_ratio=block_ratio, padding_mode='replicate')
+            else:
+                out = fft_conv1d(input, self.filters, stride=self.stride, padding=padding,
+                                 padding_mode='replicate')
         else:
-            out = F.conv1d(input, self.filters, stride=self.stride)
+            input = F.pad(input, (padding, padding), mode='replicate')
+            out = F.conv1d(input, self.filters.to(input.dtype), stride=self.stride)
         shape.insert(0, len(self.cutoffs))
         shape[-1] = out.shape[-1]
         return out.permute(1, 0, 2).reshape(shape)
@@ -131,9 +178,9 @@ class LowPassFilter(torch.nn.Module):
     """
 
     def __init__(self, cutoff: float, stride: int = 1, pad: bool = True,
-                 zeros: float = 8, fft: Optional[bool] = None):
+                 zeros: float = 8, fft: Optional[bool] = None, spec: Optional[FilterSpec] = None):
         super().__init__()
-        self._lowpasses = LowPassFilters([cutoff], stride, pad, zeros, fft)
+        self._lowpasses = LowPassFilters([cutoff], stride, pad, zeros, fft, spec)
 
     @property
     def cutoff(self):
@@ -155,6 +202,10 @@ class LowPassFilter(torch.nn.Module):
     def fft(self):
         return self._lowpasses.fft
 
+    @property
+    def spec(self):
+        return self._lowpasses.spec
+
     def forward(self, input):
         return self._lowpasses(input)[0]
 
@@ -164,18 +215,20 @@ class LowPassFilter(torch.nn.Module):
 
 def lowpass_filters(input: torch.Tensor,  cutoffs: Sequence[float],
                     stride: int = 1, pad: bool = True,
-                    zeros: float = 8, fft: Optional[bool] = None):
+                    zeros: float = 8, fft: Optional[bool] = None,
+                    spec: Optional[FilterSpec] = None):
     """
     Functional version of `LowPassFilters`, refer to this class for more information.
     """
-    return LowPassFilters(cutoffs, stride, pad, zeros, fft).to(input)(input)
+    return cached(LowPassFilters, (cutoffs, stride, pad, zeros, fft, spec), input)(input)
 
 
 def lowpass_filter(input: torch.Tensor,  cutoff: float,
                    stride: int = 1, pad: bool = True,
-                   zeros: float = 8, fft: Optional[bool] = None):
+                   zeros: float = 8, fft: Optional[bool] = None,
+                   spec: Optional[FilterSpec] = None):
     """
     Same as `lowpass_filters` but with a single cutoff frequency.
     Output will not have a dimension inserted in the front.
     """
-    return lowpass_filters(input, [cutoff], stride, pad, zeros, fft)[0]
+    return lowpass_filters(input, [cutoff], stride, pad, zeros, fft, spec)[0]
@@ -9,24 +9,217 @@ with a small numerator and denominator when removing the gcd (e.g. new_sr = 700,
 
 Very similar to [bmcfee/resampy](https://github.com/bmcfee/resampy) except this implementation
 is optimized for the case mentioned before, while resampy is slower but more general.
+When the numerator and denominator are large (e.g. new_sr = 30001, old_sr = 20001),
+the filter of each output sample is instead interpolated from an oversampled sinc table,
+like resampy does, so that memory and compute stay bounded.
 
 """
 
 import math
-from typing import Optional
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 
 import torch
 from torch.nn import functional as F
 
+from . import autotune
+from .cache import cached
 from .core import sinc
+from .design import FilterSpec, kaiser, kaiser_beta, stopband_attenuation
+from .fftconv import fft_conv1d, SpectrumCache
 from .utils import simple_repr
 
 
+# Maximum number of coefficients for the polyphase filters of `ResampleFrac`,
+# above which the filters are interpolated from a table.
+_MAX_KERNEL_SIZE = 2**22
+
+
+def _trim_layout(old_sr: int, new_sr: int, width: int,
+                 trim: Optional[bool] = None) -> Tuple[List[int], int, int]:
+    # Layout of the polyphase filters of `ResampleFrac` (with reduced sample rates),
+    # as `(bases, phases, taps)`: the output phases are split into groups of `phases`
+    # consecutive phases, and the group `g` only uses the `taps` input samples starting at
+    # `bases[g]` in each window of `2 * width + old_sr` samples.
+    # The filter of the phase `i` is non zero only for the `2 * width + 2` samples
+    # starting at `i * old_sr // new_sr`, so that with `old_sr` large compared with
+    # `2 * width`, most of the taps can be skipped. Each group is a separate
+    # convolution, which is less efficient with few phases, hence the minimum of 32.
+    size = 2 * width + old_sr
+    groups = max(1, min(round(old_sr / (2 * width)), new_sr // 32))
+    if trim is None:
+        trim = groups >= 8
+    if not trim or groups == 1:
+        return [0], new_sr, size
+    phases = -(-new_sr // groups)
+    firsts = [first * old_sr // new_sr for first in range(0, new_sr, phases)]
+    lasts = [min(first + phases, new_sr) - 1 for first in range(0, new_sr, phases)]
+    lasts = [last * old_sr // new_sr for last in lasts]
+    taps = min(size, max(last - first for first, last in zip(firsts, lasts)) + 2 * width + 2)
+    return [min(first, size - taps) for first in firsts], phases, taps
+
+
+def _filter_taps(old_sr: int, new_sr: int, zeros: int, rolloff: float):
+    # Number of taps used by `ResampleFrac` for each output sample.
+    gcd = math.gcd(old_sr, new_sr)
+    old_sr //= gcd
+    new_sr //= gcd
+    width = math.ceil(zeros * old_sr / (rolloff * min(old_sr, new_sr)))
+    _, _, taps = _trim_layout(old_sr, new_sr, width)
+    if new_sr * taps > _MAX_KERNEL_SIZE:
+        return 2 * width
+    return taps
+
+
+def _stage_cost(old_sr: int, new_sr: int, zeros: int, rolloff: float):
+    # Estimated time, in nanoseconds, taken by `ResampleFrac` to produce one second of output
+    # on CPU, following its automatic choice between direct, FFT and interpolated filters.
+    # The constants are fitted on the `bench/resample.py` timings. The direct convolution
+    # is a lot more efficient per tap with a large number of output phases. With trimmed
+    # filters, each group of phases is a separate convolution going over the whole input,
+    # which costs about 1ns per input sample and per group.
+    gcd = math.gcd(old_sr, new_sr)
+    old = old_sr // gcd
+    new = new_sr // gcd
+    if old == new:
+        return 0.
+    width = math.ceil(zeros * old / (rolloff * min(old, new)))
+    bases, phases, taps = _trim_layout(old, new, width)
+    if new * taps > _MAX_KERNEL_SIZE:
+        per_output = 4. * 2 * width
+    elif len(bases) == 1 and taps // old > 24:
+        per_output = 12 * (old + new) / new
+    else:
+        per_output = taps * (0.035 + 0.5 / phases)
+        if len(bases) > 1:
+            per_output += len(bases) * old / new
+    return new_sr * per_output
+
+
+def _plan_cost(sample_rates: Sequence[int], zeros: int = 24, rolloff: float = 0.945):
+    # Estimated cost of a chain of `ResampleFrac`, see `_stage_cost`.
+    return sum(_stage_cost(old_sr, new_sr, zeros, rolloff)
+               for old_sr, new_sr in zip(sample_rates[:-1], sample_rates[1:]))
+
+
+def plan_resample(old_sr: int, new_sr: int, zeros: int = 24, rolloff: float = 0.945,
+                  max_stages: int = 3, max_factor: int = 12) -> List[int]:
+    """
+    Return the chain of sample rates `[old_sr, ..., new_sr]` minimizing the estimated
+    time to resample from `old_sr` to `new_sr` with `ResampleFrac` stages, with at most
+    `max_stages` stages. The intermediate sample rates are integers of the form
+    `old_sr * a / b` or `new_sr * a / b`, with `a, b <= max_factor`,
+    and are strictly between `old_sr` and `new_sr`, so that each stage keeps all the
+    frequencies of the final output.
+
+    >>> plan_resample(44100, 16000)
+    [44100, 18000, 16000]
+    >>> plan_resample(48000, 44100)
+    [48000, 44100]
+    """
+    if not isinstance(old_sr, int) or not isinstance(new_sr, int):
+        raise ValueError("old_sr and new_sr should be integers")
+    if max_stages < 1:
+        raise ValueError("max_stages should be at least 1.")
+    low, high = sorted([old_sr, new_sr])
+    candidates = set()
+    for sr in [old_sr, new_sr]:
+        for num in range(1, max_factor + 1):
+            for den in range(1, max_factor + 1):
+                if (sr * num) % den == 0 and low < sr * num // den < high:
+                    candidates.add(sr * num // den)
+    # Intermediate rates ordered from `old_sr` to `new_sr`.
+    rates = sorted(candidates, reverse=old_sr > new_sr) + [new_sr]
+
+    # best[sr] is the cheapest chain from `old_sr` to `sr` found so far, as (cost, chain),
+    # with chains of at most `stages` stages after the `stages`-th iteration.
+    best: Dict[int, Tuple[float, List[int]]] = {old_sr: (0., [old_sr])}
+    for _ in range(max_stages):
+        updated = dict(best)
+        for sr, (cost, chain) in best.items():
+            start = 0 if sr == old_sr else rates.index(sr) + 1
+            for next_sr in rates[start:]:
+                next_cost = cost + _stage_cost(sr, next_sr, zeros, rolloff)
+                if next_sr not in updated or next_cost < updated[next_sr][0]:
+                    updated[next_sr] = (next_cost, chain + [next_sr])
+        best = updated
+    return best[new_sr][1]
+
+
+def _window(t: torch.Tensor, zeros: int, beta: Optional[float] = None):
+    # Window of the sinc filters, for `t` in `[-zeros * pi, zeros * pi]`,
+    # either a cosine squared window, or a Kaiser window if `beta` is given (see `FilterSpec`).
+    if beta is None:
+        return torch.cos(t / zeros / 2)**2
+    return kaiser(t / (zeros * math.pi), beta)
+
+
+def _spec_zeros(rolloff: float, transition: float, attenuation: float, oversample: int = 8):
+    # Smallest number of zero crossings for the Kaiser windowed sinc used by `ResampleFrac`
+    # to reach the `attenuation` above `(rolloff + transition) / 2`, in units of the lowest
+    # sample rate. The polyphase filters sample the filter at intermediate positions, so we
+    # measure the attenuation on a grid `oversample` times finer.
+    if transition <= 0:
+        raise ValueError("transition should be positive.")
+    stopband = (rolloff + transition) / 2
+    if stopband >= oversample / 2:
+        return 1
+    beta = kaiser_beta(attenuation)
+
+    def _meets(zeros: int):
+        # Time in zero crossings, for a step of `1 / oversample` samples.
+        width = math.ceil(zeros * oversample / rolloff)
+        t = torch.arange(-width, width + 1, dtype=torch.float64) * rolloff / oversample
+        t = t.clamp(-zeros, zeros) * math.pi
+        filter_ = sinc(t) * _window(t, zeros, beta)
+        filter_ /= filter_.sum()
+        return stopband_attenuation(filter_, stopband / oversample) >= attenuation
+
+    # Estimate by Kaiser of the filter length, see `julius.design.kaiser_size`.
+    estimate = max(1, math.ceil(
+        rolloff * (attenuation - 7.95) / (2.285 * 2 * math.pi * transition) / 2))
+    zeros = estimate
+    if _meets(zeros):
+        while zeros > 1 and _meets(zeros - 1):
+            zeros -= 1
+    else:
+        while not _meets(zeros):
+            zeros += 1
+            if zeros > 4 * estimate:
+                raise ValueError(f"Could not reach an attenuation of {attenuation}dB.")
+    return zeros
+
+
+def _sinc_table(zeros: int, oversample: int, beta: Optional[float] = None):
+    # Windowed sinc sampled `oversample` times per zero crossing, see
+    # `ResampleFrac._init_kernels` for the expression of the filter. We keep two extra zeros
+    # at the end, so that the linear interpolation never goes out of bounds.
+    t = torch.arange(zeros * oversample + 2).float() / oversample
+    t = t.clamp_(max=zeros)
+    t *= math.pi
+    table = sinc(t) * _window(t, zeros, beta)
+    table[zeros * oversample:] = 0
+    return table
+
+
+def _table_filters(table: torch.Tensor, t: torch.Tensor, max_index: int):
+    # Linearly interpolate the filters from `table` (see `_sinc_table`), at the positions `t`
+    # (absolute time in zero crossings, times `oversample`), normalized over the last dimension.
+    t = t.clamp(max=max_index)
+    low = t.long()
+    alpha = t - low
+    kernel = table[low] * (1 - alpha) + table[low + 1] * alpha
+    # Renormalize kernel to ensure a constant signal is preserved.
+    return kernel / kernel.sum(dim=-1, keepdim=True)
+
+
 class ResampleFrac(torch.nn.Module):
     """
     Resampling from the sample rate `old_sr` to `new_sr`.
     """
-    def __init__(self, old_sr: int, new_sr: int, zeros: int = 24, rolloff: float = 0.945):
+    def __init__(self, old_sr: int, new_sr: int, zeros: int = 24, rolloff: float = 0.945,
+                 interpolate: Optional[bool] = None, oversample: int = 512,
+                 fft: Optional[bool] = None, trim: Optional[bool] = None,
+                 spec: Optional[FilterSpec] = None):
         """
         Args:
             old_sr (int): sample rate of the input signal x.
@@ -36,6 +229,34 @@ class ResampleFrac(torch.nn.Module):
                 to ensure sufficient margin due to the imperfection of the FIR filter used.
                 Lowering this value will reduce anti-aliasing, but will reduce some of the
                 highest frequencies.
+            interpolate (bool or None): if True, the filter for each output sample is
+                linearly interpolated from an oversampled windowed sinc table, which supports
+                arbitrary ratios, at the cost of a small approximation error.
+                If False, exact polyphase filters are used, one per output phase.
+                If None (default), the interpolation is used only when the polyphase filters
+                would have more than `2**22` coefficients in total, i.e. when
+                both sample rates are large after dividing them by their GCD.
+            oversample (int): number of entries in the sinc table per zero crossing,
+                when `interpolate` is used.
+            fft (bool or None): if True, the polyphase filters are applied with
+                `julius.fftconv` rather than PyTorch convolutions. If None, FFT is used
+                when the filters have more than 24 taps for each of the `old_sr` input phases
+                (e.g. `zeros=56`, or large downsampling ratios), or by benchmarking
+                both if autotuning is enabled (see `julius.autotune`).
+                Not used with `interpolate` or `trim`.
+            trim (bool or None): if True, the near zero taps of the polyphase filters are
+                skipped, by applying the filters of groups of consecutive phases only to the
+                part of the input they actually depend on. This only matters when `old_sr`
+                is large compared with the filter width, e.g. going from 1000 to 999,
+                and is used in that case if None (default). Trimmed filters are always applied
+                with PyTorch convolutions.
+            spec (FilterSpec or None): if provided, `zeros` is ignored and the filter uses
+                a Kaiser window rather than a cosine squared one, with the smallest number
+                of zero crossings reaching the attenuation of the spec, for a transition band
+                of the given width around the cutoff frequency, expressed as a fraction of
+                `min(old_sr, new_sr)`, like `rolloff`. For instance with `rolloff=0.9`
+                and a transition of `0.1`, the stop band starts at the Nyquist frequency
+                of the lowest sample rate. See `julius.design`.
 
         Shape:
 
@@ -45,7 +266,13 @@ class ResampleFrac(torch.nn.Module):
 
         .. caution::
             After dividing `old_sr` and `new_sr` by their GCD, both should be small
-            for this implementation to be fast.
+            for this implementation to be fast, otherwise the `trim` mode or the slower
+            `interpolate` mode is used.
+
+        ..note::
+            `float16` and `bfloat16` inputs are supported, the kernel is converted
+            to the dtype of the input, so that the output has the same dtype.
+            With FFT, the filtering is computed in `float32`.
 
         >>> import torch
         >>> resample = ResampleFrac(4, 5)
@@ -59,22 +286,55 @@ class ResampleFrac(torch.nn.Module):
         gcd = math.gcd(old_sr, new_sr)
         self.old_sr = old_sr // gcd
         self.new_sr = new_sr // gcd
+        self.spec = spec
+        self._beta: Optional[float] = None
+        if spec is not None:
+            zeros = _spec_zeros(rolloff, *spec)
+            self._beta = kaiser_beta(spec.attenuation)
         self.zeros = zeros
         self.rolloff = rolloff
+        self.oversample = oversample
 
-        self._init_kernels()
+        self._width = math.ceil(self.zeros * self.old_sr / self._cutoff())
+        if trim and fft:
+            raise ValueError("trim and fft cannot be both True.")
+        if fft:
+            trim = False
+        self._bases, self._phases, self._taps = _trim_layout(
+            self.old_sr, self.new_sr, self._width, trim)
+        if interpolate is None:
+            interpolate = self.new_sr * self._taps > _MAX_KERNEL_SIZE
+        self.interpolate = interpolate
+        if self.interpolate:
+            self._init_table()
+            self.register_buffer("kernel", torch.empty(0), persistent=False)
+        else:
+            self._init_kernels()
+            self.register_buffer("table", torch.empty(0), persistent=False)
+        self.trim = not self.interpolate and len(self._bases) > 1
+        self._auto_fft = fft is None and not self.trim
+        if fft is None:
+            fft = not self.interpolate and not self.trim and self._taps // self.old_sr > 24
+        self.fft = fft
+        self._spectrum_cache = SpectrumCache()
+
+    def _cutoff(self):
+        return self.rolloff * min(self.new_sr, self.old_sr)
+
+    def _init_table(self):
+        self.register_buffer(
+            "table", _sinc_table(self.zeros, self.oversample, self._beta), persistent=False)
 
     def _init_kernels(self):
         if self.old_sr == self.new_sr:
+            self.register_buffer("kernel", torch.empty(0), persistent=False)
             return
 
-        kernels = []
-        sr = min(self.new_sr, self.old_sr)
         # rolloff will perform antialiasing filtering by removing the highest frequencies.
         # At first I thought I only needed this when downsampling, but when upsampling
         # you will get edge artifacts without this, the edge is equivalent to zero padding,
         # which will add high freq artifacts.
-        sr *= self.rolloff
+        sr = self._cutoff()
 
         # The key idea of the algorithm is that x(t) can be exactly reconstructed from x[i] (tensor)
         # using the sinc interpolation formula:
@@ -93,23 +353,108 @@ class ResampleFrac(torch.nn.Module):
         #               = sum_i x[i + old_sr] sinc(pi * old_sr * (i / old_sr - j / new_sr))
         # so y[j+new_sr] uses the same filter as y[j], but on a shifted version of x by `old_sr`.
         # This will explain the F.conv1d after, with a stride of old_sr.
-        self._width = math.ceil(self.zeros * self.old_sr / sr)
+        # The half width of the filter, `self._width = ceil(zeros * old_sr / sr)`,
+        # is computed in `__init__`.
         # If old_sr is still big after GCD reduction, most filters will be very unbalanced, i.e.,
         # they will have a lot of almost zero values to the left or to the right...
-        # There is probably a way to evaluate those filters more efficiently, but this is kept for
-        # future work.
-        idx = torch.arange(-self._width, self._width + self.old_sr).float()
-        for i in range(self.new_sr):
-            t = (-i/self.new_sr + idx/self.old_sr) * sr
-            t = t.clamp_(-self.zeros, self.zeros)
-            t *= math.pi
-            window = torch.cos(t/self.zeros/2)**2
-            kernel = sinc(t) * window
-            # Renormalize kernel to ensure a constant signal is preserved.
-            kernel.div_(kernel.sum())
-            kernels.append(kernel)
-
-        self.register_buffer("kernel", torch.stack(kernels).view(self.new_sr, 1, -1))
+        # With `trim`, we only keep `self._taps` values starting at the base of the group
+        # of each phase (see `_trim_layout`), and when this gets too large,
+        # we use `_interpolate` instead.
+        # All the phases are computed at once, `i` is the phase and `idx` the input index.
+        i = torch.arange(self.new_sr).float()[:, None]
+        bases = torch.tensor(self._bases).repeat_interleave(self._phases)[:self.new_sr]
+        idx = (bases[:, None] - self._width + torch.arange(self._taps)).float()
+        t = (-i/self.new_sr + idx/self.old_sr) * sr
+        t = t.clamp_(-self.zeros, self.zeros)
+        t *= math.pi
+        window = _window(t, self.zeros, self._beta)
+        kernel = sinc(t) * window
+        # Renormalize kernel to ensure a constant signal is preserved.
+        kernel.div_(kernel.sum(dim=-1, keepdim=True))
+
+        self.register_buffer("kernel", kernel.view(self.new_sr, 1, -1))
+
+    def _interpolate(self, x: torch.Tensor, start: int, end: int, offset: int = 0,
+                     max_elements: int = 2**22):
+        """
+        Resample `x` `[B, T]` using filters interpolated from `self.table`,
+        computing the output samples from `start` to `end` (excluded), by chunks of
+        at most `max_elements` entries for the gathered input frames.
+        `x` should be the input padded with `self._width - 1` samples on the left,
+        starting at the index `offset` of the padded input.
+        """
+        width = self._width
+        taps = 2 * width
+        sr = self._cutoff()
+        batch = x.shape[0]
+        # frames[:, n] contains the input samples from `n - width + 1` to `n + width`.
+        frames = x.unfold(-1, taps, 1)
+        offsets = torch.arange(-width + 1, width + 1, device=x.device).float()
+        max_index = self.zeros * self.oversample
+        chunk = max(1, max_elements // (batch * taps))
+        ys = []
+        for begin in range(start, end, chunk):
+            # The output j is at time `j * old_sr / new_sr` in the input, we use integer
+            # arithmetic to avoid rounding errors on long signals.
+            pos = torch.arange(begin, min(begin + chunk, end), device=x.device)
+            pos = pos * self.old_sr
+            index = pos // self.new_sr
+            frac = (pos - index * self.new_sr).float() / self.new_sr
+            index -= offset
+            t = (offsets - frac[:, None]).abs() * (sr / self.old_sr * self.oversample)
+            kernel = _table_filters(self.table, t, max_index)  # type: ignore
+            ys.append(torch.einsum("bck,ck->bc", frames[:, index], kernel.to(x.dtype)))
+        if not ys:
+            return x.new_zeros(batch, 0)
+        return torch.cat(ys, dim=-1)
+
+    def _conv(self, x: torch.Tensor):
+        """
+        Apply the polyphase filters with PyTorch convolutions to `x` `[B, 1, T]`, with `T`
+        at least `2 * width + old_sr`, returning one output for each phase and each window of
+        `2 * width + old_sr` samples, with a stride of `old_sr`.
+        """
+        kernel: torch.Tensor = self.kernel.to(x.dtype)  # type: ignore
+        if len(self._bases) == 1:
+            return F.conv1d(x, kernel, stride=self.old_sr)
+        windows = (x.shape[-1] - 2 * self._width - self.old_sr) // self.old_sr + 1
+        span = (windows - 1) * self.old_sr + self._taps
+        ys = []
+        for group, base in enumerate(self._bases):
+            weight = kernel[group * self._phases:(group + 1) * self._phases]
+            ys.append(F.conv1d(x[..., base:base + span], weight, stride=self.old_sr))
+        return torch.cat(ys, dim=1)
+
+    def _polyphase(self, x: torch.Tensor):
+        """
+        Apply the polyphase filters to `x` `[B, 1, T]`, returning `[B, new_sr, T // old_sr + 1]`.
+        """
+        fft = self.fft and not self.trim
+        block_ratio = autotune.DEFAULT_BLOCK_RATIO
+        padding = self._width + self.old_sr
+        if not torch.jit.is_scripting():
+            if torch.onnx.is_in_onnx_export():
+                # FFTs are not supported by ONNX.
+                fft = False
+            else:
+                tuner = autotune.get_tuner()
+                if tuner is not None and not self.trim and (self._auto_fft or fft):
+                    fft, block_ratio = tuner.choose(
+                        x, self.kernel, self.old_sr, padding,  # type: ignore
+                        fft_only=not self._auto_fft)
+        if fft:
+            # The padding of `fft_conv1d` is symmetric, we pad `old_sr` extra samples
+            # on the left, which gives one extra output for each phase.
+            if not torch.jit.is_scripting():
+                ys = self._spectrum_cache.fft_conv1d(
+                    x, self.kernel, stride=self.old_sr, padding=padding,  # type: ignore
+                    block_ratio=block_ratio, padding_mode='replicate')
+            else:
+                ys = fft_conv1d(x, self.kernel, stride=self.old_sr,  # type: ignore
+                                padding=padding, padding_mode='replicate')
+            return ys[..., 1:]
+        x = F.pad(x, (self._width, self._width + self.old_sr), mode='replicate')
+        return self._conv(x)
 
     def forward(self, x: torch.Tensor, output_length: Optional[int] = None, full: bool = False):
         """
@@ -130,14 +475,18 @@ class ResampleFrac(torch.nn.Module):
         shape = x.shape
         length = x.shape[-1]
         x = x.reshape(-1, length)
-        x = F.pad(x[:, None], (self._width, self._width + self.old_sr), mode='replicate')
-        ys = F.conv1d(x, self.kernel, stride=self.old_sr)  # type: ignore
-        y = ys.transpose(1, 2).reshape(list(shape[:-1]) + [-1])
 
         float_output_length = torch.as_tensor(self.new_sr * length / self.old_sr)
         max_output_length = torch.ceil(float_output_length).long()
         default_output_length = torch.floor(float_output_length).long()
 
+        if self.interpolate:
+            x = F.pad(x[:, None], (self._width - 1, self._width), mode='replicate')
+            ys = self._interpolate(x[:, 0], 0, int(max_output_length))
+        else:
+            ys = self._polyphase(x[:, None]).transpose(1, 2)
+        y = ys.reshape(list(shape[:-1]) + [-1])
+
         if output_length is None:
             applied_output_length = max_output_length if full else default_output_length
         elif output_length < 0 or output_length > max_output_length:
@@ -148,26 +497,738 @@ class ResampleFrac(torch.nn.Module):
                 raise ValueError("You cannot pass both full=True and output_length")
         return y[..., :applied_output_length]  # type: ignore
 
+    def _input_window(self, out_start: int, out_end: int):
+        # Range `[start, end)` of input samples needed for the outputs from `out_start` to
+        # `out_end` (excluded), which can go outside of the input, where it is replicate padded.
+        if self.interpolate:
+            # See `_interpolate`, with the left padding of `width - 1`.
+            start = out_start * self.old_sr // self.new_sr - self._width + 1
+            end = (out_end - 1) * self.old_sr // self.new_sr + self._width + 1
+        else:
+            # The outputs are computed by groups of `new_sr`, from windows of
+            # `2 * width + old_sr` samples with a stride of `old_sr`.
+            start = (out_start // self.new_sr) * self.old_sr - self._width
+            end = ((out_end - 1) // self.new_sr + 1) * self.old_sr + self._width
+        return start, end
+
+    def forward_window(self, x: torch.Tensor, out_start: int, out_length: int):
+        """
+        Return the outputs from `out_start` to `out_start + out_length` (excluded),
+        the same as `self(x, full=True)[..., out_start:out_start + out_length]`,
+        but only reading the part of `x` needed to compute them, e.g. to take random crops
+        from a long signal, which can be memory mapped.
+
+        ..note::
+            With `fft`, the window is computed with PyTorch convolutions, so that it is
+            only equal to the full output up to the precision of the FFT.
+
+        >>> resample = ResampleFrac(44100, 16000)
+        >>> x = torch.randn(2, 44100)
+        >>> y = resample.forward_window(x, 1000, 4000)
+        >>> torch.allclose(y, resample(x)[..., 1000:5000], atol=1e-5)
+        True
+        """
+        length = x.shape[-1]
+        max_output_length = -(-self.new_sr * length // self.old_sr)
+        if out_start < 0 or out_length < 0 or out_start + out_length > max_output_length:
+            raise ValueError(f"The window should be within [0, {max_output_length}).")
+        if self.old_sr == self.new_sr or out_length == 0:
+            return x[..., out_start:out_start + out_length]
+        out_end = out_start + out_length
+        start, end = self._input_window(out_start, out_end)
+        shape = x.shape
+        x = x[..., max(start, 0):min(end, length)]
+        x = x.reshape(-1, x.shape[-1])
+        x = F.pad(x[:, None], (max(-start, 0), max(end - length, 0)), mode='replicate')
+        if self.interpolate:
+            offset = out_start * self.old_sr // self.new_sr
+            y = self._interpolate(x[:, 0], out_start, out_end, offset)
+        else:
+            y = self._conv(x).transpose(1, 2).reshape(x.shape[0], -1)
+            first = (out_start // self.new_sr) * self.new_sr
+            y = y[:, out_start - first:out_end - first]
+        return y.reshape(list(shape[:-1]) + [out_length])
+
+    def __repr__(self):
+        return simple_repr(self)
+
+
+class StreamingResampleFrac(ResampleFrac):
+    """
+    Same as `ResampleFrac`, but also supports processing a long signal chunk by chunk
+    with `feed`. The last input samples required for the next outputs are kept between calls,
+    along with the number of input and output samples so far, so that the phase does not drift.
+    The concatenation of the outputs of all the calls to `feed`, followed by `flush`,
+    is the same as the output of the offline `forward`.
+
+    Args:
+        see `ResampleFrac`.
+
+    ..note::
+        The replicate padding is applied to the beginning of the stream with the first call
+        to `feed`, and to its end in `flush`. An output sample at the time `t`
+        (in input samples) is returned once the input up to `t + latency` has been fed,
+        see the `latency` attribute.
+
+    >>> resample = StreamingResampleFrac(48000, 16000)
+    >>> x = torch.randn(2, 48000)
+    >>> outs = [resample.feed(chunk) for chunk in x.split(960, dim=-1)]
+    >>> outs.append(resample.flush())
+    >>> y = torch.cat(outs, dim=-1)
+    >>> print(list(y.shape), torch.allclose(y, resample(x), atol=1e-6))
+    [2, 16000] True
+    """
+    def __init__(self, old_sr: int, new_sr: int, zeros: int = 24, rolloff: float = 0.945,
+                 interpolate: Optional[bool] = None, oversample: int = 512,
+                 fft: Optional[bool] = None, trim: Optional[bool] = None,
+                 spec: Optional[FilterSpec] = None):
+        super().__init__(
+            old_sr, new_sr, zeros, rolloff, interpolate, oversample, fft, trim, spec)
+        if self.old_sr == self.new_sr:
+            self.latency = 0
+        elif self.interpolate:
+            self.latency = self._width
+        else:
+            # All the outputs in `[m * old_sr, (m + 1) * old_sr)` are computed together.
+            self.latency = self._width + self.old_sr - 1
+        self._buffer: Optional[torch.Tensor] = None
+        self._shape: List[int] = []
+        self._offset = 0
+        self._length = 0
+        self._outputs = 0
+
+    def reset(self):
+        """
+        Forget about the current stream, the next call to `feed` will start a new one.
+        """
+        self._buffer = None
+        self._offset = 0
+        self._length = 0
+        self._outputs = 0
+
+    def _process(self, end: Optional[int] = None):
+        # Return the outputs that can be computed from the current buffer,
+        # up to `end` (excluded) if provided.
+        buffer = self._buffer
+        assert buffer is not None
+        batch, length = buffer.shape
+        if self.interpolate:
+            # With the left padding of `width - 1`, the output j needs the padded input
+            # up to `floor(j * old_sr / new_sr) + 2 * width - 1`.
+            last = self._offset + length - 2 * self._width
+            available = ((last + 1) * self.new_sr - 1) // self.old_sr + 1 if last >= 0 else 0
+            if end is None:
+                end = available
+            end = min(end, available)
+            if end <= self._outputs:
+                return buffer.new_zeros(batch, 0)
+            out = self._interpolate(buffer, self._outputs, end, self._offset)
+            consumed = end * self.old_sr // self.new_sr - self._offset
+        else:
+            size = 2 * self._width + self.old_sr
+            n_groups = (length - size) // self.old_sr + 1 if length >= size else 0
+            consumed = n_groups * self.old_sr
+            if n_groups == 0:
+                return buffer.new_zeros(batch, 0)
+            ys = self._conv(buffer[:, None, :consumed - self.old_sr + size])
+            out = ys.transpose(1, 2).reshape(batch, -1)
+            if end is not None:
+                out = out[:, :max(0, end - self._outputs)]
+        self._buffer = buffer[:, consumed:]
+        self._offset += consumed
+        self._outputs += out.shape[-1]
+        return out
+
+    def feed(self, chunk: torch.Tensor):
+        """
+        Process a new chunk `[*, T]` of the stream and return all the outputs
+        that can be computed so far, as a tensor `[*, T']`.
+        """
+        shape = list(chunk.shape[:-1])
+        batch = 1
+        for dim in shape:
+            batch *= dim
+        chunk = chunk.reshape(batch, chunk.shape[-1])
+        if self.old_sr == self.new_sr:
+            self._buffer = chunk[:, :0]
+            self._shape = shape
+            return chunk.reshape(shape + [chunk.shape[-1]])
+        if self._buffer is None:
+            if chunk.shape[-1] == 0:
+                return chunk.reshape(shape + [0])
+            self._shape = shape
+            left = self._width - 1 if self.interpolate else self._width
+            chunk = torch.cat([chunk[:, :1].expand(-1, left), chunk], dim=-1)
+            self._buffer = chunk
+        else:
+            self._buffer = torch.cat([self._buffer, chunk], dim=-1)
+        self._length += chunk.shape[-1]
+        out = self._process()
+        return out.reshape(shape + [out.shape[-1]])
+
+    def flush(self, full: bool = False):
+        """
+        Process the end of the stream, including the right padding, and return the remaining
+        outputs. The next call to `feed` will start a new stream.
+        The total number of outputs is the same as for `forward`, in particular if `full`
+        is True, the longest possible output is returned.
+        """
+        buffer = self._buffer
+        if buffer is None:
+            raise RuntimeError("flush() called before any call to feed().")
+        shape = self._shape
+        if self.old_sr == self.new_sr:
+            self.reset()
+            return buffer.reshape(shape + [0])
+        # `_length` includes the left padding.
+        left = self._width - 1 if self.interpolate else self._width
+        length = self._length - left
+        if full:
+            end = (self.new_sr * length + self.old_sr - 1) // self.old_sr
+        else:
+            end = self.new_sr * length // self.old_sr
+        right = self._width if self.interpolate else self._width + self.old_sr
+        self._buffer = torch.cat([buffer, buffer[:, -1:].expand(-1, right)], dim=-1)
+        out = self._process(end)
+        self.reset()
+        return out.reshape(shape + [out.shape[-1]])
+
+
+class ResampleBatch(torch.nn.Module):
+    """
+    Resampling of each entry of a batch with its own sample rates, e.g. for speed perturbation.
+    The filter of each output sample is interpolated from a windowed sinc table shared by all
+    the entries, as for `ResampleFrac` with `interpolate=True`, so that the whole batch
+    is resampled at once.
+
+    Args:
+        zeros (int): number of zero crossing to keep in the sinc filter.
+        rolloff (float): use a lowpass filter that is `rolloff * min(old_sr, new_sr) / 2`,
+            see `ResampleFrac`.
+        oversample (int): number of entries in the sinc table per zero crossing.
+
+    Shape:
+
+        - Input: `[B, *, T]`, with `old_sr` and `new_sr` given either as numbers
+            or as tensors `[B]`.
+        - Output: `[B, *, T']`, and the length `int(new_sr * T / old_sr)` of each entry, `[B]`.
+            `T'` is the largest length, the shorter outputs are padded with zeros.
+
+    ..note::
+        If both `old_sr` and `new_sr` are integers, the position of the output samples
+        is computed exactly, otherwise, only the ratio `new_sr / old_sr` is used,
+        in double precision.
+
+    >>> resample = ResampleBatch()
+    >>> x = torch.randn(3, 2, 16000)
+    >>> y, lengths = resample(x, 16000, torch.tensor([14400, 16000, 17600]))
+    >>> print(list(y.shape), lengths.tolist())
+    [3, 2, 17600] [14400, 16000, 17600]
+    """
+    def __init__(self, zeros: int = 24, rolloff: float = 0.945, oversample: int = 512):
+        super().__init__()
+        self.zeros = zeros
+        self.rolloff = rolloff
+        self.oversample = oversample
+        self.register_buffer("table", _sinc_table(zeros, oversample), persistent=False)
+
+    def forward(self, x: torch.Tensor, old_sr: Union[int, float, torch.Tensor],
+                new_sr: Union[int, float, torch.Tensor], max_elements: int = 2**22):
+        """
+        Resample x, by chunks of at most `max_elements` entries for the gathered input frames.
+        Returns a tuple `(y, lengths)`.
+        """
+        shape = list(x.shape)
+        batch, length = shape[0], shape[-1]
+        x = x.reshape(batch, -1, length)
+        old = torch.as_tensor(old_sr, device=x.device).expand(batch)
+        new = torch.as_tensor(new_sr, device=x.device).expand(batch)
+        if (old <= 0).any() or (new <= 0).any():
+            raise ValueError("old_sr and new_sr should be positive.")
+        exact = not (old.is_floating_point() or new.is_floating_point())
+        ratio = new.double() / old.double()
+        if exact:
+            lengths = new * length // old
+        else:
+            # Small tolerance for the rounding of the ratios, e.g. 0.9 in float32.
+            lengths = (ratio * length + 1e-3).floor().long()
+        output_length = int(lengths.max()) if batch > 0 else 0
+
+        # Cutoff frequency of the filter, relative to the input sample rate.
+        cutoff = self.rolloff * ratio.clamp(max=1).float()
+        width = math.ceil(self.zeros / cutoff.min().item()) if batch > 0 else 1
+        taps = 2 * width
+        phases = self.oversample
+        # The filters for each entry are computed for `phases + 1` fractional delays
+        # between 0 and 1, and then linearly interpolated for each output sample.
+        # We process the batch by groups so that the filters fit in `max_elements`.
+        group = max(1, max_elements // ((phases + 1) * taps))
+        padded = F.pad(x, (width - 1, width), mode='replicate')
+        ys = []
+        for offset in range(0, batch, group):
+            ys.append(self._resample(
+                padded[offset:offset + group], length, output_length, width,
+                cutoff[offset:offset + group], old[offset:offset + group],
+                new[offset:offset + group], ratio[offset:offset + group],
+                exact, max_elements))
+        if ys:
+            y = torch.cat(ys, dim=0)
+        else:
+            y = x.new_zeros(batch, x.shape[1], output_length)
+        mask = torch.arange(output_length, device=x.device) < lengths[:, None]
+        y = y * mask[:, None].to(y.dtype)
+        # As for `ResampleFrac`, identical sample rates leave the input unchanged.
+        identity = ratio == 1
+        if identity.any():
+            y[identity] = F.pad(x[identity], (0, output_length - length))
+        return y.reshape(shape[:-1] + [output_length]), lengths
+
+    def _resample(self, x: torch.Tensor, length: int, output_length: int, width: int,
+                  cutoff: torch.Tensor, old: torch.Tensor, new: torch.Tensor,
+                  ratio: torch.Tensor, exact: bool, max_elements: int):
+        # Resample the padded input `x` `[B, C, T + 2 * width - 1]`, see `forward`.
+        batch, channels, _ = x.shape
+        taps = 2 * width
+        phases = self.oversample
+        offsets = torch.arange(-width + 1, width + 1, device=x.device).float()
+        delays = torch.arange(phases + 1, device=x.device).float() / phases
+        t = (offsets - delays[:, None]).abs() * (cutoff[:, None, None] * self.oversample)
+        filters = _table_filters(self.table, t, self.zeros * self.oversample)  # type: ignore
+        filters = filters.to(x.dtype)
+
+        # frames[:, :, n] contains the input samples from `n - width + 1` to `n + width`.
+        frames = x.unfold(-1, taps, 1)
+        batch_index = torch.arange(batch, device=x.device)[:, None]
+        channel_index = torch.arange(channels, device=x.device)[None, :, None]
+        chunk = max(1, max_elements // (batch * channels * taps))
+        ys = []
+        for begin in range(0, output_length, chunk):
+            pos = torch.arange(begin, min(begin + chunk, output_length), device=x.device)
+            if exact:
+                pos = pos[None] * old[:, None]
+                index = pos // new[:, None]
+                frac = (pos - index * new[:, None]).float() / new[:, None]
+            else:
+                time = pos[None] / ratio[:, None]
+                index = time.floor()
+                frac = (time - index).float()
+                index = index.long()
+            # Outputs past the length of an entry are masked afterwards.
+            index = index.clamp(max=length - 1)
+            phase = frac * phases
+            low = phase.long().clamp(max=phases - 1)
+            alpha = (phase - low)[..., None].to(x.dtype)
+            kernel = torch.lerp(filters[batch_index, low], filters[batch_index, low + 1], alpha)
+            inputs = frames[batch_index[:, None], channel_index, index[:, None]]
+            ys.append(torch.einsum("bnck,bck->bnc", inputs, kernel))
+        if not ys:
+            return x.new_zeros(batch, channels, 0)
+        return torch.cat(ys, dim=-1)
+
+    def __repr__(self):
+        return simple_repr(self)
+
+
+class ResampleBank(torch.nn.Module):
+    """
+    Resampling of the same input from `old_sr` to each of the sample rates in `new_srs`.
+    With `cascade=True`, the anti-aliasing filtering is shared between the targets:
+    each target is computed either from the input or from a target with a higher sample rate,
+    whichever requires the fewest taps for each output sample (see `ResampleFrac`).
+    For instance, going from 48kHz to 24kHz, 16kHz and 8kHz, 16kHz is obtained from 24kHz
+    (ratio 2/3 rather than 1/3), and 8kHz from 16kHz (ratio 1/2 rather than 1/6).
+
+    Args:
+        old_sr (int): sample rate of the input signal x.
+        new_srs (list[int]): sample rates of the outputs.
+        zeros (int): number of zero crossing to keep in the sinc filter.
+        rolloff (float): see `ResampleFrac`.
+        cascade (bool): if True, the targets can be computed from one another as explained
+            above, otherwise they are all computed from the input, with the same output as
+            independent `ResampleFrac` modules.
+        fft (bool or None): see `ResampleFrac`.
+
+    ..note::
+        When going through a target with a higher sample rate, the output is filtered
+        a second time, with a higher cutoff frequency, which will slightly increase the
+        attenuation right below the cutoff.
+
+    Shape:
+
+        - Input: `[*, T]`
+        - Output: list of `[*, T_i]` with `T_i = int(new_srs[i] * T / old_sr)`.
+
+    >>> resample = ResampleBank(48000, [8000, 16000, 22050, 24000])
+    >>> [(resample.sample_rate(source), new_sr) for source, new_sr in resample.plan()]
+    [(48000, 24000), (24000, 22050), (24000, 16000), (16000, 8000)]
+    >>> x = torch.randn(2, 48000)
+    >>> [list(y.shape) for y in resample(x)]
+    [[2, 8000], [2, 16000], [2, 22050], [2, 24000]]
+    """
+    def __init__(self, old_sr: int, new_srs: Sequence[int], zeros: int = 24,
+                 rolloff: float = 0.945, cascade: bool = True, fft: Optional[bool] = None):
+        super().__init__()
+        if not isinstance(old_sr, int) or not all(isinstance(sr, int) for sr in new_srs):
+            raise ValueError("old_sr and new_srs should be integers")
+        self.old_sr = old_sr
+        self.new_srs = list(new_srs)
+        self.zeros = zeros
+        self.rolloff = rolloff
+        self.cascade = cascade
+        self.fft = fft
+
+        # Targets are computed by decreasing sample rate, `self._stages[i]` is the index in
+        # `new_srs` of the i-th target computed, and `self._sources[i]` is the index of its
+        # source, with -1 for the input.
+        self._stages: List[int] = sorted(
+            range(len(self.new_srs)), key=lambda index: -self.new_srs[index])
+        self._sources: List[int] = []
+        resamplers = []
+        for position, index in enumerate(self._stages):
+            new_sr = self.new_srs[index]
+            source = -1
+            taps = _filter_taps(old_sr, new_sr, zeros, rolloff)
+            if cascade:
+                for other in self._stages[:position]:
+                    other_sr = self.new_srs[other]
+                    if other_sr <= new_sr:
+                        continue
+                    other_taps = _filter_taps(other_sr, new_sr, zeros, rolloff)
+                    if other_taps < taps:
+                        source = other
+                        taps = other_taps
+            self._sources.append(source)
+            source_sr = old_sr if source == -1 else self.new_srs[source]
+            resamplers.append(ResampleFrac(source_sr, new_sr, zeros, rolloff, fft=fft))
+        self.resamplers = torch.nn.ModuleList(resamplers)
+
+    def sample_rate(self, index: int):
+        """
+        Return the sample rate of the target `index`, or of the input if `index` is -1.
+        """
+        return self.old_sr if index == -1 else self.new_srs[index]
+
+    def plan(self):
+        """
+        Return the list of `(source, new_sr)` in the order they are computed, with `source`
+        the index of the target used as input (-1 for the input itself).
+        """
+        return [(source, self.new_srs[index])
+                for source, index in zip(self._sources, self._stages)]
+
+    def forward(self, x: torch.Tensor, full: bool = False):
+        """
+        Resample x to all the target sample rates, returning a list of tensors
+        in the same order as `new_srs`. If `full` is True, returns the longest possible outputs,
+        see `ResampleFrac.forward`.
+        """
+        length = x.shape[-1]
+        # Full outputs for all the targets, which are then trimmed.
+        stages: List[torch.Tensor] = []
+        outputs: List[torch.Tensor] = [x] * len(self.new_srs)
+        for position, resample in enumerate(self.resamplers):
+            source = self._sources[position]
+            index = self._stages[position]
+            if source == -1:
+                stage = resample(x, None, True)
+            else:
+                stage = stages[self._stages.index(source)]
+                stage = resample(stage, None, True)
+            stages.append(stage)
+            new_sr = self.new_srs[index]
+            if full:
+                output_length = -(-new_sr * length // self.old_sr)
+            else:
+                output_length = new_sr * length // self.old_sr
+            outputs[index] = stage[..., :output_length]
+        return outputs
+
+    def __repr__(self):
+        return simple_repr(self)
+
+
+class ResampleChain(torch.nn.Module):
+    """
+    Resampling from `old_sr` to `new_sr` through a chain of `ResampleFrac`,
+    with the intermediate sample rates given by `plan_resample`. For ratios with
+    large numerators or denominators, this can be a lot faster than a single `ResampleFrac`,
+    e.g. going from 48kHz to 8kHz through 8.8kHz is twice as fast on CPU.
+    The chosen sample rates are given by the `sample_rates` attribute.
+
+    Args:
+        old_sr (int): sample rate of the input signal x.
+        new_sr (int): sample rate of the output.
+        zeros (int): number of zero crossing to keep in the sinc filter.
+        rolloff (float): see `ResampleFrac`.
+        max_stages (int): maximum number of `ResampleFrac` stages, 1 gives the same
+            output as `ResampleFrac`.
+        fft (bool or None): see `ResampleFrac`.
+
+    ..note::
+        The output is filtered once per stage, which will slightly increase the
+        attenuation right below the cutoff frequency, compared with `ResampleFrac`.
+
+    Shape:
+
+        - Input: `[*, T]`
+        - Output: `[*, T']` with `T' = int(new_sr * T / old_sr)`
+
+    >>> resample = ResampleChain(48000, 8000)
+    >>> resample.sample_rates
+    [48000, 8800, 8000]
+    >>> x = torch.randn(2, 48000)
+    >>> list(resample(x).shape)
+    [2, 8000]
+    """
+    def __init__(self, old_sr: int, new_sr: int, zeros: int = 24, rolloff: float = 0.945,
+                 max_stages: int = 3, fft: Optional[bool] = None):
+        super().__init__()
+        self.old_sr = old_sr
+        self.new_sr = new_sr
+        self.zeros = zeros
+        self.rolloff = rolloff
+        self.max_stages = max_stages
+        self.fft = fft
+        self.sample_rates = plan_resample(old_sr, new_sr, zeros, rolloff, max_stages)
+        self.resamplers = torch.nn.ModuleList([
+            ResampleFrac(source_sr, target_sr, zeros, rolloff, fft=fft)
+            for source_sr, target_sr in zip(self.sample_rates[:-1], self.sample_rates[1:])])
+
+    def forward(self, x: torch.Tensor, output_length: Optional[int] = None, full: bool = False):
+        """
+        Resample x, see `ResampleFrac.forward` for the meaning of `output_length` and `full`.
+        """
+        length = x.shape[-1]
+        max_output_length = -(-self.new_sr * length // self.old_sr)
+        if output_length is None:
+            output_length = max_output_length if full else self.new_sr * length // self.old_sr
+        elif output_length < 0 or output_length > max_output_length:
+            raise ValueError(f"output_length must be between 0 and {max_output_length}")
+        elif full:
+            raise ValueError("You cannot pass both full=True and output_length")
+        for resample in self.resamplers:
+            x = resample(x, None, True)
+        return x[..., :output_length]
+
+    def __repr__(self):
+        return simple_repr(self)
+
+
+def _block_kernel(kernel: torch.Tensor, block: int, stride: int):
+    # From the polyphase filters `kernel` `[P, K]` applied with a given `stride`,
+    # returns the filters `[block * P, 1, K + stride * (block - 1)]` computing
+    # `block` consecutive outputs of each phase with a single convolution,
+    # with a stride of `block * stride`.
+    phases, taps = kernel.shape
+    out = kernel.new_zeros(block, phases, taps + stride * (block - 1))
+    for index in range(block):
+        out[index, :, stride * index:stride * index + taps] = kernel
+    return out.view(block * phases, 1, -1)
+
+
+class Downsample2(torch.nn.Module):
+    """
+    Downsampling by a factor of 2, or `2 ** stages` with a cascade of 2x stages,
+    with the same output as `ResampleFrac(2, 1)` for each stage.
+    With `rolloff=1`, the filter is the classic half-band filter.
+    The convolution of `ResampleFrac(2, 1)` has a single output channel, which is
+    inefficient, instead blocks of 16 consecutive outputs are computed by a convolution
+    with 16 output channels, which is a few times faster, see `bench/resample.py`.
+
+    Args:
+        zeros (int): number of zero crossing to keep in the sinc filter.
+        rolloff (float): see `ResampleFrac`.
+        stages (int): number of 2x stages, e.g. 2 to downsample by a factor of 4.
+
+    Shape:
+
+        - Input: `[*, T]`
+        - Output: `[*, T']` with `T' = int(T / 2 ** stages)`
+
+    >>> downsample = Downsample2(stages=2)
+    >>> x = torch.randn(2, 48000)
+    >>> list(downsample(x).shape)
+    [2, 12000]
+    """
+    def __init__(self, zeros: int = 24, rolloff: float = 0.945, stages: int = 1):
+        super().__init__()
+        if stages < 1:
+            raise ValueError("stages should be at least 1.")
+        self.zeros = zeros
+        self.rolloff = rolloff
+        self.stages = stages
+        self._block = 16
+        resample = ResampleFrac(2, 1, zeros, rolloff, fft=False)
+        self._width = resample._width
+        self._taps = resample.kernel.shape[-1]  # type: ignore
+        self.register_buffer(
+            "kernel", _block_kernel(resample.kernel[:, 0], self._block, 2))  # type: ignore
+
+    def _downsample(self, x: torch.Tensor):
+        # Longest possible output, i.e. `ceil(T / 2)`, for `x` `[B, T]`.
+        batch, length = x.shape
+        out_length = (length + 1) // 2
+        blocks = -(-out_length // self._block)
+        padded_length = 2 * self._block * blocks + self._taps - 2
+        x = F.pad(x[:, None], (self._width, padded_length - self._width - length),
+                  mode='replicate')
+        ys = F.conv1d(x, self.kernel.to(x.dtype), stride=2 * self._block)  # type: ignore
+        return ys.transpose(1, 2).reshape(batch, -1)[:, :out_length]
+
+    def forward(self, x: torch.Tensor, full: bool = False):
+        """
+        Downsample x. If `full` is True, returns the longest possible output,
+        i.e. `ceil(T / 2 ** stages)` samples, see `ResampleFrac.forward`.
+        """
+        shape = x.shape
+        length = x.shape[-1]
+        x = x.reshape(-1, length)
+        for _ in range(self.stages):
+            x = self._downsample(x)
+        factor = 1 << self.stages
+        if full:
+            out_length = (length + factor - 1) // factor
+        else:
+            out_length = length // factor
+        return x[:, :out_length].reshape(list(shape[:-1]) + [out_length])
+
+    def __repr__(self):
+        return simple_repr(self)
+
+
+class Upsample2(torch.nn.Module):
+    """
+    Upsampling by a factor of 2, or `2 ** stages` with a cascade of 2x stages,
+    with the same output as `ResampleFrac(1, 2)` for each stage.
+    With `rolloff=1`, the filter is the classic half-band filter.
+    As for `Downsample2`, blocks of 8 consecutive outputs of each phase are computed
+    by a single convolution with 16 output channels.
+
+    Args:
+        zeros (int): number of zero crossing to keep in the sinc filter.
+        rolloff (float): see `ResampleFrac`.
+        stages (int): number of 2x stages, e.g. 2 to upsample by a factor of 4.
+
+    Shape:
+
+        - Input: `[*, T]`
+        - Output: `[*, T * 2 ** stages]`
+
+    >>> upsample = Upsample2(stages=3)
+    >>> x = torch.randn(2, 1000)
+    >>> list(upsample(x).shape)
+    [2, 8000]
+    """
+    def __init__(self, zeros: int = 24, rolloff: float = 0.945, stages: int = 1):
+        super().__init__()
+        if stages < 1:
+            raise ValueError("stages should be at least 1.")
+        self.zeros = zeros
+        self.rolloff = rolloff
+        self.stages = stages
+        self._block = 8
+        resample = ResampleFrac(1, 2, zeros, rolloff, fft=False)
+        self._width = resample._width
+        self.register_buffer(
+            "kernel", _block_kernel(resample.kernel[:, 0], self._block, 1))  # type: ignore
+
+    def _upsample(self, x: torch.Tensor):
+        batch, length = x.shape
+        blocks = -(-length // self._block)
+        x = F.pad(x[:, None], (self._width, self._block * blocks + self._width - length),
+                  mode='replicate')
+        ys = F.conv1d(x, self.kernel.to(x.dtype), stride=self._block)  # type: ignore
+        # The channels are ordered by output time, then phase.
+        return ys.transpose(1, 2).reshape(batch, -1)[:, :2 * length]
+
+    def forward(self, x: torch.Tensor):
+        """
+        Upsample x.
+        """
+        shape = x.shape
+        x = x.reshape(-1, x.shape[-1])
+        for _ in range(self.stages):
+            x = self._upsample(x)
+        return x.reshape(list(shape[:-1]) + [-1])
+
     def __repr__(self):
         return simple_repr(self)
 
 
 def resample_frac(x: torch.Tensor, old_sr: int, new_sr: int,
                   zeros: int = 24, rolloff: float = 0.945,
-                  output_length: Optional[int] = None, full: bool = False):
+                  output_length: Optional[int] = None, full: bool = False,
+                  interpolate: Optional[bool] = None, oversample: int = 512,
+                  fft: Optional[bool] = None, trim: Optional[bool] = None,
+                  spec: Optional[FilterSpec] = None):
     """
     Functional version of `ResampleFrac`, refer to its documentation for more information.
 
-    ..warning::
-        If you call repeatidly this functions with the same sample rates, then the
-        resampling kernel will be recomputed everytime. For best performance, you should use
-        and cache an instance of `ResampleFrac`.
+    ..note::
+        The resampling kernel is kept in the process-wide cache of `julius.cache`,
+        so that calling repeatidly this function with the same sample rates
+        only computes it once.
+    """
+    resample = cached(
+        ResampleFrac,
+        (old_sr, new_sr, zeros, rolloff, interpolate, oversample, fft, trim, spec), x)
+    return resample(x, output_length, full)
+
+
+def resample_batch(x: torch.Tensor, old_sr: Union[int, float, torch.Tensor],
+                   new_sr: Union[int, float, torch.Tensor], zeros: int = 24,
+                   rolloff: float = 0.945, oversample: int = 512
+                   ) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Functional version of `ResampleBatch`, refer to its documentation for more information.
+
+    >>> x = torch.randn(4, 16000)
+    >>> y, lengths = resample_batch(x, 1, torch.tensor([0.9, 1.0, 1.05, 1.1]))
+    >>> print(list(y.shape), lengths.tolist())
+    [4, 17600] [14400, 16000, 16800, 17600]
+    """
+    return cached(ResampleBatch, (zeros, rolloff, oversample), x)(x, old_sr, new_sr)
+
+
+def resample_bank(x: torch.Tensor, old_sr: int, new_srs: Sequence[int], zeros: int = 24,
+                  rolloff: float = 0.945, cascade: bool = True, full: bool = False,
+                  fft: Optional[bool] = None) -> List[torch.Tensor]:
+    """
+    Functional version of `ResampleBank`, refer to its documentation for more information.
+    """
+    resample = cached(ResampleBank, (old_sr, list(new_srs), zeros, rolloff, cascade, fft), x)
+    return resample(x, full)
+
+
+def resample_chain(x: torch.Tensor, old_sr: int, new_sr: int, zeros: int = 24,
+                   rolloff: float = 0.945, max_stages: int = 3,
+                   output_length: Optional[int] = None, full: bool = False,
+                   fft: Optional[bool] = None):
+    """
+    Functional version of `ResampleChain`, refer to its documentation for more information.
+    """
+    resample = cached(ResampleChain, (old_sr, new_sr, zeros, rolloff, max_stages, fft), x)
+    return resample(x, output_length, full)
+
+
+def downsample2(x: torch.Tensor, zeros: int = 24, rolloff: float = 0.945, stages: int = 1,
+                full: bool = False):
+    """
+    Functional version of `Downsample2`, refer to its documentation for more information.
+    """
+    return cached(Downsample2, (zeros, rolloff, stages), x)(x, full)
+
+
+def upsample2(x: torch.Tensor, zeros: int = 24, rolloff: float = 0.945, stages: int = 1):
+    """
+    Functional version of `Upsample2`, refer to its documentation for more information.
     """
-    return ResampleFrac(old_sr, new_sr, zeros, rolloff).to(x)(x, output_length, full)
+    return cached(Upsample2, (zeros, rolloff, stages), x)(x)
 
 
 # Easier implementations for downsampling and upsampling by a factor of 2
-# Kept for testing and reference
+# Kept for testing and reference, see `Downsample2` and `Upsample2` for
+# implementations with anti-aliasing.
 
 def _kernel_upsample2_downsample2(zeros):
     # Kernel for upsampling and downsampling by a factor of 2. Interestingly,
@@ -0,0 +1,183 @@
+# File under the MIT license, see https://github.com/adefossez/julius/LICENSE for details.
+# Author: adefossez, 2020
+"""
+FFT based cross-correlation, autocorrelation and time delay estimation.
+The cross-correlation of two signals `x` and `y` is defined here as
+`c[lag] = sum_t x[t + lag] y[t]`, so that if `x` is a delayed version of `y`
+by `d` samples, `c` will peak at `lag = d`.
+
+When only the lags in `[-max_lag, max_lag]` are needed, `y` is split into blocks of
+`2 * max_lag + 1` samples, each block only seeing a window of `x` of twice that size,
+so that the cost scales as `T log(max_lag)` rather than `T * max_lag`
+(or `T log(T)` with a single FFT over the whole signal).
+The blocks are computed with `julius.fftconv.fft_conv1d`, with one
+group per signal, and one channel per block.
+"""
+from typing import Optional
+
+import torch
+import torch.fft  # noqa, needed with PyTorch 1.7 for `torch.fft` to be a module.
+from torch.nn import functional as F
+
+from .core import next_fast_len, pad_to, unfold
+from .fftconv import fft_conv1d
+
+
+def _xcorr_lags(x: torch.Tensor, y: torch.Tensor, min_lag: int, max_lag: int):
+    """
+    Return the cross-correlation of `x` `[*, T]` and `y` `[*, T']`
+    for the lags from `min_lag` to `max_lag`, as `[*, max_lag - min_lag + 1]`.
+    """
+    if x.shape[:-1] != y.shape[:-1]:
+        raise ValueError(f"x and y should have the same shape except for the last dimension, "
+                         f"got {list(x.shape)} and {list(y.shape)}.")
+    shape = list(x.shape[:-1])
+    x = x.reshape(-1, x.shape[-1])
+    y = y.reshape(-1, y.shape[-1])
+    batch, length = y.shape
+    n_lags = max_lag - min_lag + 1
+    block = max(1, min(n_lags, length))
+    n_blocks = (length + block - 1) // block
+    window = block + n_lags - 1
+
+    # The j-th block of y only sees the samples of x from `j * block + min_lag`
+    # to `j * block + max_lag + block - 1`, with zeros outside of x.
+    if min_lag < 0:
+        x = F.pad(x, (-min_lag, 0))
+    else:
+        x = x[:, min_lag:]
+    x = pad_to(x, (n_blocks - 1) * block + window)[:, :(n_blocks - 1) * block + window]
+    frames = unfold(x, window, block).reshape(1, batch * n_blocks, window)
+    y = pad_to(y, n_blocks * block).reshape(batch, n_blocks, block)
+    out = fft_conv1d(frames, y, groups=batch)
+    return out.reshape(shape + [n_lags])
+
+
+def correlate(x: torch.Tensor, y: torch.Tensor, mode: str = 'full',
+              max_lag: Optional[int] = None):
+    """
+    Cross-correlation `c[lag] = sum_t x[t + lag] y[t]` of `x` and `y`, computed
+    independently for each entry of the batch, similar to `scipy.signal.correlate`.
+
+    Args:
+        x (Tensor): first signal `[*, T]`.
+        y (Tensor): second signal `[*, T']`.
+        mode (str): `'full'` or `'valid'`, as for `scipy.signal.correlate`. With `'full'`,
+            all the lags with some overlap between `x` and `y` are returned, from `-(T' - 1)`
+            to `T - 1`. With `'valid'`, only the lags for which `y` is entirely
+            inside `x`, i.e. from 0 to `T - T'`.
+        max_lag (int or None): if not None, only return the lags from `-max_lag` to `max_lag`.
+            Only supported with `mode='full'`.
+
+    Shape:
+
+        - Inputs: `[*, T]` and `[*, T']`.
+        - Output: `[*, T + T' - 1]` for `'full'`, `[*, T - T' + 1]` for `'valid'`,
+            and `[*, 2 * max_lag + 1]` if `max_lag` is not None.
+
+    >>> y = torch.randn(2, 1000)
+    >>> x = torch.nn.functional.pad(y, (10, 0))
+    >>> c = correlate(x, y, max_lag=20)
+    >>> print(list(c.shape), (c.argmax(dim=-1) - 20).tolist())
+    [2, 41] [10, 10]
+    """
+    length = x.shape[-1]
+    length_y = y.shape[-1]
+    if mode == 'full':
+        if max_lag is None:
+            return _xcorr_lags(x, y, -(length_y - 1), length - 1)
+        if max_lag < 0:
+            raise ValueError("max_lag should be positive.")
+        return _xcorr_lags(x, y, -max_lag, max_lag)
+    elif mode == 'valid':
+        if max_lag is not None:
+            raise ValueError("max_lag is only supported with mode='full'.")
+        if length_y > length:
+            raise ValueError("With mode='valid', y should not be longer than x.")
+        return _xcorr_lags(x, y, 0, length - length_y)
+    else:
+        raise ValueError(f"Invalid mode={mode}, should be 'full' or 'valid'.")
+
+
+def autocorr(x: torch.Tensor, max_lag: Optional[int] = None):
+    """
+    Autocorrelation `c[lag] = sum_t x[t + lag] x[t]` of `x`, for the lags from 0
+    to `max_lag` (`T - 1` if None), the negative lags being symmetric.
+
+    Shape:
+
+        - Input: `[*, T]`
+        - Output: `[*, max_lag + 1]`
+
+    >>> x = torch.randn(4, 1000)
+    >>> c = autocorr(x, max_lag=10)
+    >>> print(list(c.shape), torch.allclose(c[:, 0], x.pow(2).sum(-1), rtol=1e-4))
+    [4, 11] True
+    """
+    if max_lag is None:
+        max_lag = x.shape[-1] - 1
+    if max_lag < 0:
+        raise ValueError("max_lag should be positive.")
+    return _xcorr_lags(x, x, 0, max_lag)
+
+
+def gcc_phat(x: torch.Tensor, y: torch.Tensor, max_lag: int,
+             block_size: Optional[int] = None, eps: float = 1e-12):
+    """
+    Generalized cross-correlation with phase transform (GCC-PHAT) of `x` and `y`, for the
+    lags from `-max_lag` to `max_lag`, with the same convention as `correlate`.
+    The cross-spectrum is averaged over Hann windowed frames of `block_size` samples
+    with an overlap of 50%, then whitened, so that the result has a sharp peak at the delay
+    between `x` and `y`, even for reverberant or colored signals.
+
+    Args:
+        x (Tensor): first signal `[*, T]`.
+        y (Tensor): second signal `[*, T']`. The shortest of `x` and `y`
+            is padded with zeros.
+        max_lag (int): maximum lag to return.
+        block_size (int or None): size of the frames. Should be larger than `2 * max_lag`.
+            If None, uses `next_fast_len(4 * max_lag + 1)`.
+        eps (float): added to the magnitude of the cross-spectrum before normalizing it.
+
+    Shape:
+
+        - Inputs: `[*, T]` and `[*, T']`.
+        - Output: `[*, 2 * max_lag + 1]`
+    """
+    if max_lag < 0:
+        raise ValueError("max_lag should be positive.")
+    if block_size is None:
+        block_size = next_fast_len(4 * max_lag + 1)
+    if block_size <= 2 * max_lag:
+        raise ValueError(f"block_size={block_size} should be larger than 2 * max_lag.")
+    length = max(x.shape[-1], y.shape[-1])
+    x = pad_to(x, length)
+    y = pad_to(y, length)
+    hop = block_size // 2
+    window = torch.hann_window(block_size, periodic=True, device=x.device, dtype=x.dtype)
+    x_z = torch.fft.rfft(unfold(x, block_size, hop) * window, dim=-1)
+    y_z = torch.fft.rfft(unfold(y, block_size, hop) * window, dim=-1)
+    cross = (x_z * y_z.conj()).sum(dim=-2)
+    cross = cross / (cross.abs() + eps)
+    out = torch.fft.irfft(cross, block_size, dim=-1)
+    return torch.cat([out[..., block_size - max_lag:], out[..., :max_lag + 1]], dim=-1)
+
+
+def time_delay(x: torch.Tensor, y: torch.Tensor, max_lag: int,
+               block_size: Optional[int] = None):
+    """
+    Estimate the delay in samples of `x` with respect to `y`, between `-max_lag` and `max_lag`,
+    using `gcc_phat`. A positive delay means that `x` is late compared with `y`,
+    i.e. `x[t + delay] ~ y[t]`.
+
+    Shape:
+
+        - Inputs: `[*, T]` and `[*, T']`.
+        - Output: `[*]`, as a tensor of integers.
+
+    >>> y = torch.randn(2, 48000)
+    >>> x = torch.nn.functional.pad(y, (120, 0))
+    >>> print(time_delay(x, y, max_lag=400).tolist())
+    [120, 120]
+    """
+    return gcc_phat(x, y, max_lag, block_size).argmax(dim=-1) - max_lag
@@ -0,0 +1,76 @@
+# File under the MIT license, see https://github.com/adefossez/julius/LICENSE for details.
+# Author: adefossez, 2020
+
+import json
+from pathlib import Path
+import tempfile
+import unittest
+
+import torch as th
+
+from julius import autotune, FFTConv1d, LowPassFilters, lowpass_filter
+
+
+class TestAutotune(unittest.TestCase):
+    def setUp(self):
+        th.manual_seed(1234)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "autotune.json"
+        autotune.enable(self.path)
+
+    def tearDown(self):
+        autotune.disable()
+        self.tmp.cleanup()
+
+    def test_lowpass(self):
+        x = th.randn(4, 2048)
+        autotune.disable()
+        y_ref = lowpass_filter(x, 0.01, fft=False)
+        autotune.enable(self.path)
+        mod = LowPassFilters([0.01])
+        y = mod(x)[0]
+        self.assertLessEqual((y - y_ref).abs().max(), 1e-4)
+
+        tuner = autotune.get_tuner()
+        self.assertEqual(len(tuner), 1)
+        content = json.load(open(self.path))
+        self.assertEqual(len(content["choices"]), 1)
+        choice = list(content["choices"].values())[0]
+        self.assertIn(choice["block_ratio"], autotune.BLOCK_RATIOS)
+
+        # A new process would reuse the results.
+        self.assertEqual(len(autotune.Autotuner(self.path)), 1)
+        mod(x)
+        self.assertEqual(len(tuner), 1)
+        mod(x[:2])
+        self.assertEqual(len(tuner), 2)
+
+    def test_explicit_fft(self):
+        x = th.randn(4, 2048)
+        # With an explicit fft=False, there is nothing to tune.
+        LowPassFilters([0.01], fft=False)(x)
+        self.assertEqual(len(autotune.get_tuner()), 0)
+        LowPassFilters([0.01], fft=True)(x)
+        key, = autotune.get_tuner()._choices
+        self.assertTrue(key.endswith("fft"))
+
+    def test_fftconv(self):
+        x = th.randn(2, 4, 1024)
+        mod = FFTConv1d(4, 6, 64)
+        with th.no_grad():
+            y = mod(x)
+            autotune.disable()
+            y_ref = mod(x)
+        self.assertLessEqual((y - y_ref).abs().max(), 1e-4)
+        self.assertEqual(len(autotune.Autotuner(self.path)), 1)
+
+    def test_clear(self):
+        LowPassFilters([0.01])(th.randn(2048))
+        self.assertTrue(self.path.exists())
+        autotune.get_tuner().clear()
+        self.assertFalse(self.path.exists())
+        self.assertEqual(len(autotune.get_tuner()), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+# File under the MIT license, see https://github.com/adefossez/julius/LICENSE for details.
+# Author: adefossez, 2020
+
+import unittest
+
+import torch as th
+
+from julius import cache, resample, lowpass, filters, bands
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        cache.set_max_size(64)
+        cache.clear()
+
+    def test_functionals(self):
+        x = th.randn(2, 3, 1000)
+        calls = [
+            (lambda: resample.resample_frac(x, 4, 5),
+             lambda: resample.ResampleFrac(4, 5)(x)),
+            (lambda: lowpass.lowpass_filters(x, [0.1, 0.2]),
+             lambda: lowpass.LowPassFilters([0.1, 0.2])(x)),
+            (lambda: filters.highpass_filter(x, 0.1),
+             lambda: filters.HighPassFilter(0.1)(x)),
+            (lambda: filters.bandpass_filter(x, 0.1, 0.2),
+             lambda: filters.BandPassFilter(0.1, 0.2)(x)),
+            (lambda: bands.split_bands(x, 64, cutoffs=th.tensor([12., 24.])),
+             lambda: bands.SplitBands(64, cutoffs=[12, 24])(x)),
+        ]
+        for index, (fn, ref) in enumerate(calls):
+            for _ in range(3):
+                self.assertTrue(th.allclose(fn(), ref()))
+            self.assertEqual(cache.stats(), cache.CacheStats(
+                2 * (index + 1), index + 1, index + 1, 64))
+
+    def test_keys(self):
+        x = th.randn(1000)
+        resample.resample_frac(x, 4, 5)
+        resample.resample_frac(x, 4, 5, zeros=8)
+        y = resample.resample_frac(x.double(), 4, 5)
+        self.assertEqual(y.dtype, th.float64)
+        self.assertEqual(cache.stats().misses, 3)
+        resample.resample_frac(x.double(), 4, 5)
+        self.assertEqual(cache.stats().hits, 1)
+
+    def test_lru(self):
+        x = th.randn(1000)
+        cache.set_max_size(2)
+        for cutoff in [0.1, 0.2, 0.1, 0.3, 0.2]:
+            lowpass.lowpass_filter(x, cutoff)
+        # 0.2 was evicted by 0.3, as 0.1 was more recently used.
+        self.assertEqual(cache.stats(), cache.CacheStats(1, 4, 2, 2))
+        cache.set_max_size(0)
+        lowpass.lowpass_filter(x, 0.1)
+        self.assertEqual(cache.stats(), cache.CacheStats(1, 5, 0, 0))
+        with self.assertRaises(ValueError):
+            cache.set_max_size(-1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+# File under the MIT license, see https://github.com/adefossez/julius/LICENSE for details.
+# Author: adefossez, 2021
+
+import math
+import unittest
+
+import torch as th
+
+from julius import design, filters, lowpass, resample
+
+
+def pure_tone(freq, sr, dur=4):
+    # `julius.core.pure_tone` is in float32, whose phase errors are above
+    # the attenuations we want to measure.
+    time = th.arange(int(sr * dur), dtype=th.float64) / sr
+    return th.cos(2 * math.pi * freq * time)
+
+
+def gain(x, y, trim=1000):
+    # Unlike `julius.core.volume`, no floor at -80dB.
+    x = x[trim:-trim]
+    y = y[trim:-trim]
+    return 10 * th.log10(y.pow(2).mean() / x.pow(2).mean()).item()
+
+
+class TestDesign(unittest.TestCase):
+    def test_design_lowpass(self):
+        for passband, transition, attenuation in [
+                (0.1, 0.02, 40), (0.2, 0.05, 60), (0.3, 0.01, 80), (0.05, 0.1, 100)]:
+            filter_ = design.design_lowpass(passband, transition, attenuation)
+            msg = str((passband, transition, attenuation))
+            self.assertGreaterEqual(
+                design.stopband_attenuation(filter_, passband + transition), attenuation, msg)
+            # One tap shorter on each side should not meet the specification.
+            half_size = len(filter_) // 2
+            shorter = design._kaiser_lowpass(
+                passband + transition / 2, half_size - 1, design.kaiser_beta(attenuation))
+            self.assertLess(
+                design.stopband_attenuation(shorter, passband + transition), attenuation, msg)
+            self.assertAlmostEqual(filter_.sum().item(), 1, places=5)
+
+    def test_lowpass(self):
+        sr = 1000
+        spec = design.FilterSpec(0.02, 80)
+        filt = lowpass.LowPassFilter(0.1, spec=spec).double()
+        self.assertEqual(filt.spec, spec)
+        for freq, keep in [(0.09, True), (0.11, False), (0.3, False)]:
+            x = pure_tone(freq * sr, sr)
+            y = filt(x)
+            attn = gain(x, y)
+            if keep:
+                self.assertGreater(attn, -0.1)
+            else:
+                self.assertLess(attn, -80)
+        # Wider transitions give shorter filters.
+        small = lowpass.LowPassFilters([0.1], spec=design.FilterSpec(0.05, 60))
+        self.assertLess(small.half_size, filt._lowpasses.half_size)
+        self.assertEqual(th.jit.script(filt)(x).shape, x.shape)
+
+    def test_filters(self):
+        spec = design.FilterSpec(0.02, 60)
+        x = th.randn(4, 2048)
+        for low, high in [(0.1, 0.2), (0.05, 0.3)]:
+            band = filters.bandpass_filter(x, low, high, spec=spec)
+            lows = lowpass.lowpass_filters(x, [low, high], spec=spec)
+            self.assertTrue(th.allclose(band, lows[1] - lows[0], atol=1e-5))
+            high_x = filters.highpass_filter(x, low, spec=spec)
+            self.assertTrue(th.allclose(high_x, x - lowpass.lowpass_filter(x, low, spec=spec),
+                                        atol=1e-5))
+
+    def test_resample(self):
+        # The stop band only matters when downsampling, otherwise the input
+        # does not contain anything above the new Nyquist frequency.
+        for old_sr, new_sr in [(5, 4), (2, 1), (3, 1)]:
+            for rolloff, transition, attenuation in [(0.9, 0.1, 60), (0.8, 0.15, 90)]:
+                spec = design.FilterSpec(transition, attenuation)
+                resampler = resample.ResampleFrac(
+                    old_sr, new_sr, rolloff=rolloff, spec=spec).double()
+                self.assertEqual(resampler.spec, spec)
+                sr = 1000 * old_sr
+                stop = (rolloff + transition) / 2 * new_sr / old_sr
+                x = pure_tone(1.05 * stop * sr, sr)
+                y = resampler(x)
+                attn = gain(x, y)
+                self.assertLess(attn, -attenuation, str((old_sr, new_sr, spec)))
+                x = pure_tone(0.05 * sr, sr)
+                y = resampler(x)
+                attn = gain(x, y)
+                self.assertGreater(attn, -0.1)
@@ -1,7 +1,7 @@
 from doctest import testmod
 import unittest
 
-from julius import resample, fftconv, lowpass, bands, utils
+from julius import autotune, cache, core, design, resample, fftconv, lowpass, bands, utils, xcorr
 
 
 class DocStringTest(unittest.TestCase):
@@ -17,5 +17,20 @@ class DocStringTest(unittest.TestCase):
     def test_bands(self):
         self.assertEqual(testmod(bands).failed, 0)
 
+    def test_autotune(self):
+        self.assertEqual(testmod(autotune).failed, 0)
+
+    def test_design(self):
+        self.assertEqual(testmod(design).failed, 0)
+
+    def test_core(self):
+        self.assertEqual(testmod(core).failed, 0)
+
+    def test_cache(self):
+        self.assertEqual(testmod(cache).failed, 0)
+
+    def test_xcorr(self):
+        self.assertEqual(testmod(xcorr).failed, 0)
+
     def test_utils(self):
         self.assertEqual(testmod(utils).failed, 0)
@@ -1,6 +1,7 @@
 # File under the MIT license, see https://github.com/adefossez/julius/LICENSE for details.
 # Author: adefossez, 2020
 
+from itertools import product
 import random
 import unittest
 
@@ -8,6 +9,7 @@ import torch as th
 from torch.nn import functional as F
 
 import julius
+from julius import core, fftconv
 
 TOLERANCE = 1e-4  # as relative delta in percentage
 
@@ -21,9 +23,12 @@ class _BaseTest(unittest.TestCase):
         delta = 100 * th.norm(a - b) / th.norm(b)
         self.assertLessEqual(delta, tol, msg)
 
-    def compare_pytorch(self, *args, block_ratio=10, msg=None, tol=TOLERANCE, **kwargs):
+    def compare_pytorch(self, *args, block_ratio=10, partition_size=None, max_memory=None,
+                        msg=None, tol=TOLERANCE, **kwargs):
         y_ref = F.conv1d(*args, **kwargs)
-        y = julius.fft_conv1d(*args, block_ratio=block_ratio, **kwargs)
+        y = julius.fft_conv1d(
+            *args, block_ratio=block_ratio, partition_size=partition_size,
+            max_memory=max_memory, **kwargs)
         self.assertEqual(list(y.shape), list(y_ref.shape), msg)
         self.assertSimilar(y, y_ref, msg, tol)
 
@@ -57,6 +62,225 @@ class TestFFTConv1d(_BaseTest):
                     x, w, bias, stride, padding, block_ratio=block_ratio,
                     msg=repr(state))
 
+    def test_groups_dilation(self):
+        for _ in range(5):
+            kernel_size = random.randrange(4, 64)
+            dilation = random.choice([1, 2, 3])
+            groups = random.choice([1, 2, 4])
+            length = random.randrange(dilation * kernel_size, 1024)
+            chin = groups * random.randrange(1, 4)
+            chout = groups * random.randrange(1, 4)
+            x = th.randn(2, chin, length)
+            w = th.randn(chout, chin // groups, kernel_size)
+            bias = th.randn(chout)
+            state = {"kernel_size": kernel_size, "dilation": dilation, "groups": groups,
+                     "chin": chin, "chout": chout}
+            for stride in [1, 3]:
+                state["stride"] = stride
+                self.compare_pytorch(
+                    x, w, bias, stride, kernel_size // 2,
+                    dilation=dilation, groups=groups, msg=repr(state))
+
+    def test_depthwise(self):
+        x = th.randn(3, 8, 2048)
+        w = th.randn(8, 1, 256)
+        self.compare_pytorch(x, w, groups=8)
+        mod = julius.FFTConv1d(8, 8, 256, groups=8, bias=False)
+        self.assertEqual(list(mod.weight.shape), [8, 1, 256])
+        self.assertSimilar(mod(x), F.conv1d(x, mod.weight, groups=8))
+
+        with self.assertRaises(RuntimeError):
+            julius.fft_conv1d(x, th.randn(8, 3, 256), groups=8)
+
+    def test_large_stride(self):
+        x = th.randn(2, 3, 1000)
+        w = th.randn(4, 3, 33)
+        for stride in [4, 32, 33, 50, 1000]:
+            self.compare_pytorch(x, w, stride=stride, msg=str(stride))
+            self.compare_pytorch(x, w, stride=stride, padding=7, dilation=3, msg=str(stride))
+
+    def test_partitioned(self):
+        for _ in range(5):
+            kernel_size = random.randrange(4, 512)
+            partition_size = random.choice([1, 7, 16, 64, 1024])
+            length = random.randrange(kernel_size, 2048)
+            chin = random.randrange(1, 4)
+            chout = random.randrange(1, 4)
+            x = th.randn(2, chin, length)
+            w = th.randn(chout, chin, kernel_size)
+            bias = th.randn(chout)
+            state = {"kernel_size": kernel_size, "partition_size": partition_size,
+                     "length": length}
+            for stride in [1, 3]:
+                state["stride"] = stride
+                self.compare_pytorch(
+                    x, w, bias, stride, kernel_size // 2, partition_size=partition_size,
+                    msg=repr(state))
+
+        x = th.randn(2, 4, 1000)
+        w = th.randn(4, 2, 300)
+        self.compare_pytorch(x, w, groups=2, dilation=2, partition_size=128)
+
+    def test_max_memory(self):
+        x = th.randn(4, 4, 2000)
+        w = th.randn(6, 2, 100)
+        bias = th.randn(6)
+        plans = []
+        for partition_size, stride, padding in [(None, 1, 0), (None, 2, 30), (32, 1, 0)]:
+            kwargs = {"stride": stride, "padding": padding, "groups": 2, "block_ratio": 10,
+                      "partition_size": partition_size}
+            max_memory = fftconv.fft_conv1d_plan(x, w, **kwargs).peak_memory
+            while True:
+                # We reduce the budget until it is too small to compute the output.
+                try:
+                    plan = fftconv.fft_conv1d_plan(x, w, max_memory=max_memory, **kwargs)
+                except RuntimeError:
+                    with self.assertRaises(RuntimeError):
+                        julius.fft_conv1d(x, w, max_memory=max_memory, **kwargs)
+                    break
+                msg = repr((kwargs, plan))
+                self.assertLessEqual(plan.peak_memory, max_memory, msg)
+                self.compare_pytorch(x, w, bias, max_memory=max_memory, msg=msg, **kwargs)
+                plans.append(plan)
+                max_memory = int(0.9 * max_memory)
+        self.assertTrue(any(plan.frames == 1 for plan in plans))
+        self.assertTrue(any(plan.batch_size < 4 for plan in plans))
+        self.assertTrue(any(plan.out_channels < 3 for plan in plans))
+
+        max_memory = fftconv.fft_conv1d_plan(x, w, groups=2).peak_memory // 2
+        mod = julius.FFTConv1d(4, 6, 100, groups=2, max_memory=max_memory)
+        weight = mod.weight.detach().clone().requires_grad_()
+        mod(x).pow(2).sum().backward()
+        F.conv1d(x, weight, mod.bias, groups=2).pow(2).sum().backward()
+        self.assertSimilar(mod.weight.grad, weight.grad, tol=1e-3)
+
+        # The gradient convolutions have other shapes, and might not fit within a budget
+        # that the forward met, they must not fail.
+        x = th.randn(3, 2, 166, requires_grad=True)
+        w = th.randn(1, 2, 8, requires_grad=True)
+        kwargs = {"stride": 3, "padding": 14}
+        max_memory = fftconv.fft_conv1d_plan(x, w, **kwargs).peak_memory
+        while True:
+            try:
+                y = julius.fft_conv1d(x, w, max_memory=max_memory, **kwargs)
+            except RuntimeError:
+                break
+            grad = th.randn_like(y)
+            grads = th.autograd.grad(y, [x, w], grad)
+            grads_ref = th.autograd.grad(F.conv1d(x, w, **kwargs), [x, w], grad)
+            for g, g_ref in zip(grads, grads_ref):
+                self.assertSimilar(g, g_ref, msg=repr(max_memory), tol=1e-3)
+            max_memory = int(0.9 * max_memory)
+
+    def test_autograd(self):
+        configs = [
+            # stride, padding, dilation, groups, partition_size
+            (1, 0, 1, 1, None),
+            (3, 5, 2, 2, None),
+            (2, 10, 1, 2, 16),
+            (1, 3, 3, 3, None),
+        ]
+        for stride, padding, dilation, groups, partition_size in configs:
+            msg = repr((stride, padding, dilation, groups, partition_size))
+            x = th.randn(2, 6, 500, requires_grad=True)
+            w = th.randn(6, 6 // groups, 40, requires_grad=True)
+            bias = th.randn(6, requires_grad=True)
+            y = julius.fft_conv1d(x, w, bias, stride, padding, dilation=dilation, groups=groups,
+                                  partition_size=partition_size)
+            grad = th.randn_like(y)
+            grads = th.autograd.grad(y, [x, w, bias], grad)
+            y_ref = F.conv1d(x, w, bias, stride, padding, dilation, groups)
+            grads_ref = th.autograd.grad(y_ref, [x, w, bias], grad)
+            for g, g_ref in zip(grads, grads_ref):
+                self.assertSimilar(g, g_ref, msg=msg, tol=1e-3)
+
+        # Only the input and the weight are saved for the backward.
+        w = th.randn(6, 6, 40, requires_grad=True)
+        saved = []
+        with th.autograd.graph.saved_tensors_hooks(lambda t: saved.append(t) or t, lambda t: t):
+            julius.fft_conv1d(x, w, bias, padding=100).sum().backward()
+        self.assertEqual(sum(t.numel() for t in saved), x.numel() + w.numel())
+
+        x = th.randn(1, 2, 30, dtype=th.float64, requires_grad=True)
+        w = th.randn(2, 1, 7, dtype=th.float64, requires_grad=True)
+        self.assertTrue(th.autograd.gradgradcheck(
+            lambda x, w: julius.fft_conv1d(x, w, stride=2, groups=2), [x, w]))
+
+    def test_padding_mode(self):
+        configs = [
+            # length, kernel_size, padding, stride, block_ratio, partition_size
+            (1000, 64, 32, 1, 5, None),
+            (1000, 64, 200, 1, 2, None),
+            (50, 64, 40, 1, 5, None),
+            (1000, 64, 999, 1, 5, None),
+            (1000, 31, 15, 3, 5, None),
+            (1000, 64, 32, 1, 5, 16),
+        ]
+        for padding_mode in ['zeros', 'replicate', 'reflect']:
+            mode = 'constant' if padding_mode == 'zeros' else padding_mode
+            for length, kernel_size, padding, stride, block_ratio, partition_size in configs:
+                msg = repr((padding_mode, length, kernel_size, padding, stride, partition_size))
+                x = th.randn(2, 4, length, requires_grad=True)
+                w = th.randn(6, 2, kernel_size, requires_grad=True)
+                y_ref = F.conv1d(F.pad(x, (padding, padding), mode=mode), w, stride=stride,
+                                 groups=2)
+                y = julius.fft_conv1d(
+                    x, w, stride=stride, padding=padding, block_ratio=block_ratio, groups=2,
+                    partition_size=partition_size, padding_mode=padding_mode)
+                self.assertEqual(list(y.shape), list(y_ref.shape), msg)
+                self.assertSimilar(y, y_ref, msg)
+                grad = th.randn_like(y)
+                grads = th.autograd.grad(y, [x, w], grad)
+                grads_ref = th.autograd.grad(y_ref, [x, w], grad)
+                for g, g_ref in zip(grads, grads_ref):
+                    self.assertSimilar(g, g_ref, msg, tol=1e-3)
+
+        mod = julius.FFTConv1d(4, 6, 64, padding=32, padding_mode='reflect')
+        with th.no_grad():
+            x = th.randn(2, 4, 1000)
+            y_ref = F.conv1d(F.pad(x, (32, 32), mode='reflect'), mod.weight, mod.bias)
+            self.assertSimilar(mod(x), y_ref)
+        with self.assertRaises(RuntimeError):
+            julius.fft_conv1d(x, mod.weight, padding_mode='circular')
+
+    def test_half(self):
+        x = th.randn(2, 4, 2000)
+        w = th.randn(6, 2, 300)
+        bias = th.randn(6)
+        for dtype, tol in [(th.float16, 0.1), (th.bfloat16, 1)]:
+            for kwargs in [{}, {"stride": 3, "padding": 10}, {"partition_size": 64},
+                           {"max_memory": 2**20}]:
+                msg = repr((dtype, kwargs))
+                y_ref = julius.fft_conv1d(x, w, bias, groups=2, **kwargs)
+                y = julius.fft_conv1d(x.to(dtype), w.to(dtype), bias.to(dtype), groups=2,
+                                      **kwargs)
+                self.assertEqual(y.dtype, dtype, msg)
+                self.assertSimilar(y.float(), y_ref, msg, tol=tol)
+                # Weights in float32, e.g. with autocast.
+                y = julius.fft_conv1d(x.to(dtype), w, bias, groups=2, **kwargs)
+                self.assertEqual(y.dtype, dtype, msg)
+                self.assertSimilar(y.float(), y_ref, msg, tol=tol)
+
+        mod = julius.FFTConv1d(4, 6, 300, groups=2)
+        x = x.to(th.bfloat16).requires_grad_()
+        y = mod(x)
+        self.assertEqual(y.dtype, th.bfloat16)
+        y.float().pow(2).sum().backward()
+        self.assertEqual(x.grad.dtype, th.bfloat16)
+        self.assertEqual(mod.weight.grad.dtype, th.float32)
+
+    def test_next_fast_len(self):
+        def is_fast(size):
+            for factor in [2, 3, 5]:
+                while size % factor == 0:
+                    size //= factor
+            return size == 1
+
+        fast = [size for size in range(1, 3000) if is_fast(size)]
+        for length in range(1, 2800):
+            self.assertEqual(
+                core.next_fast_len(length), min(size for size in fast if size >= length))
+
     def test_small_input(self):
         x = th.randn(1, 5, 19)
         w = th.randn(10, 5, 32)
@@ -85,14 +309,157 @@ class TestFFTConv1d(_BaseTest):
         mod = julius.FFTConv1d(4, 5, 8, bias=False)
         mod(x)
 
+    def test_streaming(self):
+        configs = [
+            # kernel_size, stride, padding, dilation, groups
+            (32, 1, 0, 1, 1),
+            (32, 3, 40, 1, 1),
+            (32, 2, 7, 3, 2),
+            # The stride is larger than the kernel size.
+            (2, 3, 17, 1, 1),
+            (3, 50, 5, 2, 1),
+        ]
+        for config, length in product(configs, [101, 2000]):
+            kernel_size, stride, padding, dilation, groups = config
+            mod = julius.StreamingFFTConv1d(
+                4, 6, kernel_size, stride=stride, padding=padding, dilation=dilation,
+                groups=groups)
+            msg = repr((kernel_size, stride, padding, dilation, groups, length))
+            x = th.randn(2, 4, length)
+            with th.no_grad():
+                y_ref = mod(x)
+                for _ in range(2):
+                    # The second pass checks that flush properly reset the stream.
+                    chunks = []
+                    offset = 0
+                    while offset < x.shape[-1]:
+                        size = random.choice([1, 17, 160, 333])
+                        chunks.append(mod.feed(x[..., offset:offset + size]))
+                        offset += size
+                    chunks.append(mod.flush())
+                    y = th.cat(chunks, dim=-1)
+                    self.assertEqual(list(y.shape), list(y_ref.shape), msg)
+                    self.assertSimilar(y, y_ref, msg=msg)
+
+        for padding, length in [(0, 20), (17, 68)]:
+            mod = julius.StreamingFFTConv1d(1, 1, 2, stride=3, padding=padding)
+            x = th.randn(1, 1, length)
+            with th.no_grad():
+                y_ref = mod(x)
+                chunks = [mod.feed(chunk) for chunk in x.split(4, dim=-1)]
+                y = th.cat(chunks + [mod.flush()], dim=-1)
+                self.assertEqual(list(y.shape), list(y_ref.shape))
+                self.assertSimilar(y, y_ref)
+
+    def test_low_latency(self):
+        configs = [
+            # kernel_size, latency, dilation, groups, max_partition_size, head_fft
+            (2000, 16, 1, 1, None, None),
+            (700, 64, 1, 2, 128, True),
+            (301, 8, 2, 1, 32, False),
+            (5, 32, 1, 1, None, None),
+        ]
+        for kernel_size, latency, dilation, groups, max_partition_size, head_fft in configs:
+            mod = julius.LowLatencyFFTConv1d(
+                4, 6, kernel_size, latency, dilation=dilation, groups=groups,
+                max_partition_size=max_partition_size, head_fft=head_fft)
+            msg = repr(mod)
+            x = th.randn(2, 4, 3000)
+            padding = dilation * (kernel_size - 1)
+            with th.no_grad():
+                y_ref = F.conv1d(F.pad(x, (padding, 0)), mod.weight, mod.bias,
+                                 dilation=dilation, groups=groups)
+                self.assertSimilar(mod(x), y_ref, msg=msg, tol=1e-3)
+                chunks = [mod.feed(chunk) for chunk in x.split(latency, dim=-1)]
+                self.assertTrue(all(chunk.shape[-1] == latency for chunk in chunks[:-1]), msg)
+                chunks.append(mod.flush())
+                y = th.cat(chunks, dim=-1)
+                self.assertEqual(list(y.shape), list(y_ref.shape), msg)
+                self.assertSimilar(y, y_ref, msg=msg, tol=1e-3)
+
+                chunks = []
+                offset = 0
+                while offset < x.shape[-1]:
+                    size = random.choice([1, 17, 160, 333])
+                    chunks.append(mod.feed(x[..., offset:offset + size]))
+                    offset += size
+                chunks.append(mod.flush())
+                self.assertSimilar(th.cat(chunks, dim=-1), y_ref, msg=msg, tol=1e-3)
+
+        partitions = fftconv._nonuniform_partitions(1000, 16)
+        self.assertEqual([size for _, size, _ in partitions], [16, 32, 64, 128, 256, 512])
+        self.assertEqual(sum(length for _, _, length in partitions), 1000)
+        partitions = fftconv._nonuniform_partitions(1000, 16, 64)
+        self.assertEqual(partitions[-1], (16 * 2 + 32 * 2, 64, 1000 - 96))
+
+    def test_spectrum_cache(self):
+        mod = julius.FFTConv1d(4, 5, 64)
+        x = th.randn(3, 4, 2048)
+        with th.no_grad():
+            y = mod(x)
+            self.assertSimilar(mod(x), y)
+            self.assertEqual(len(mod._spectrum_cache), 1)
+            mod(x[..., :100])
+            self.assertEqual(len(mod._spectrum_cache), 2)
+            # In place changes of the weight must invalidate the cache.
+            mod.weight.mul_(2)
+            self.assertSimilar(mod(x), 2 * y - mod.bias[:, None])
+            self.assertEqual(len(mod._spectrum_cache), 1)
+
+        # With autograd, the gradient must be computed with respect to the weight.
+        weight = mod.weight.detach().clone().requires_grad_()
+        for _ in range(2):
+            mod(x).pow(2).sum().backward()
+            F.conv1d(x, weight, mod.bias).pow(2).sum().backward()
+        self.assertSimilar(mod.weight.grad, weight.grad, tol=1e-3)
+
+    @unittest.skipIf(not hasattr(th, 'inference_mode'), "requires torch.inference_mode")
+    def test_inference_mode(self):
+        # Inference tensors do not track a version counter, which the spectrum caches use.
+        julius.cache.clear()
+        x = th.randn(2, 4, 2048)
+        with th.inference_mode():
+            julius.lowpass_filter(x, 0.005)
+            julius.highpass_filter(x, 0.005)
+            julius.resample_frac(x, 2, 1, zeros=56)
+            mod = julius.FFTConv1d(4, 5, 64)
+            self.assertSimilar(mod(x), F.conv1d(x, mod.weight, mod.bias))
+            mod = julius.LowLatencyFFTConv1d(4, 5, 300, 16)
+            mod(x)
+            mod.feed(x)
+        julius.cache.clear()
+
+    def test_compl_mul_conjugate(self):
+        # Real valued contraction, used for PyTorch versions without complex autograd.
+        a = th.randn(2, 3, 4, 5, 6, 2)
+        b = th.randn(3, 7, 4, 6, 2)
+        ref = th.einsum(
+            "bgcft,gdct->bgdft", th.view_as_complex(a), th.view_as_complex(b).conj())
+        out = fftconv._compl_mul_conjugate(a, b)
+        self.assertSimilar(out, th.view_as_real(ref))
+
     def test_torchscript(self):
         x = th.randn(16, 4, 1024)
         mod = julius.FFTConv1d(4, 5, 8, bias=True)
         jitted = th.jit.script(mod)
         self.assertEqual(list(jitted(x).shape), [16, 5, 1024 - 8 + 1])
 
+        mod = julius.FFTConv1d(4, 5, 8, partition_size=4)
+        jitted = th.jit.script(mod)
+        with th.no_grad():
+            self.assertSimilar(jitted(x), mod(x))
+
     def test_repr(self):
         mod = julius.FFTConv1d(4, 5, 8, bias=False)
         self.assertEqual(
             repr(mod),
             "FFTConv1d(in_channels=4,out_channels=5,kernel_size=8,bias=False)")
+        mod = julius.FFTConv1d(4, 4, 8, groups=4, dilation=2)
+        self.assertEqual(
+            repr(mod),
+            "FFTConv1d(in_channels=4,out_channels=4,kernel_size=8,dilation=2,groups=4)")
+        mod = julius.LowLatencyFFTConv1d(2, 2, 1024, 64)
+        self.assertEqual(
+            repr(mod),
+            "LowLatencyFFTConv1d(in_channels=2,out_channels=2,kernel_size=1024,latency=64,"
+            "head_fft=True)")
@@ -67,6 +67,26 @@ class TestLowPassFilters(_BaseTest):
             y_ref = lowpass_filter(x, freq, fft=False)
             self.assertSimilar(y_fft, y_ref, x, f"freq={freq}", tol=0.01)
 
+    def test_spectrum_cache(self):
+        mod = LowPassFilters([0.01, 0.02], fft=True)
+        x = th.randn(4, 4096)
+        y = mod(x)
+        self.assertEqual(len(mod._spectrum_cache), 1)
+        self.assertSimilar(mod(x), y, x, tol=1e-4)
+        self.assertEqual(len(mod._spectrum_cache), 1)
+        y_ref = LowPassFilters([0.01, 0.02], fft=False)(x)
+        self.assertSimilar(y, y_ref, x, tol=0.01)
+
+    def test_half(self):
+        x = th.randn(4, 4096)
+        for fft in [True, False]:
+            mod = LowPassFilters([0.01, 0.2], fft=fft)
+            y_ref = mod(x)
+            for dtype in [th.float16, th.bfloat16]:
+                y = mod(x.to(dtype))
+                self.assertEqual(y.dtype, dtype)
+                self.assertSimilar(y.float(), y_ref, x, f"{dtype}, fft={fft}")
+
     def test_torchscript(self):
         x = th.randn(128)
 
@@ -70,6 +70,30 @@ class TestDownsample2(_BaseTest):
         y_gt = x_low[::2]
         self.assertSimilar(y, y_gt, x, "mixture")
 
+    def test_module(self):
+        th.manual_seed(1234)
+        x = th.randn(2, 3, 4801)
+        for rolloff in [0.945, 1.]:
+            for stages in [1, 2, 3]:
+                mod = resample.Downsample2(rolloff=rolloff, stages=stages)
+                for full in [False, True]:
+                    y_ref = x
+                    for _ in range(stages):
+                        y_ref = resample.resample_frac(y_ref, 2, 1, rolloff=rolloff, full=True)
+                    factor = 2 ** stages
+                    length = -(-4801 // factor) if full else 4801 // factor
+                    y = mod(x, full=full)
+                    self.assertEqual(list(y.shape), [2, 3, length])
+                    self.assertSimilar(y, y_ref[..., :length], x, f"{rolloff} {stages}", tol=1e-3)
+        # Frequencies above the new Nyquist frequency are removed.
+        x_low = pure_tone(12, sr=128)
+        x = x_low + pure_tone(40, sr=128) + pure_tone(56, sr=128)
+        self.assertSimilar(resample.downsample2(x, stages=2), x_low[::4], x)
+        mod = resample.Downsample2(stages=2)
+        self.assertSimilar(th.jit.script(mod)(x), mod(x), x)
+        with self.assertRaises(ValueError):
+            resample.Downsample2(stages=0)
+
 
 class TestUpsample2(_BaseTest):
     def test_upsample(self):
@@ -80,6 +104,23 @@ class TestUpsample2(_BaseTest):
             y = resample._upsample2(x)
             self.assertSimilar(y, y_gt, x, f"freq={freq}")
 
+    def test_module(self):
+        th.manual_seed(1234)
+        x = th.randn(2, 3, 4801)
+        for rolloff in [0.945, 1.]:
+            for stages in [1, 2, 3]:
+                y_ref = x
+                for _ in range(stages):
+                    y_ref = resample.resample_frac(y_ref, 1, 2, rolloff=rolloff)
+                y = resample.upsample2(x, rolloff=rolloff, stages=stages)
+                self.assertEqual(y.shape, y_ref.shape)
+                self.assertSimilar(y, y_ref, x, f"{rolloff} {stages}", tol=1e-3)
+        for freq in [8, 16, 20]:
+            x = pure_tone(freq, sr=64)
+            self.assertSimilar(resample.upsample2(x, stages=2), pure_tone(freq, sr=256), x)
+        mod = resample.Upsample2(stages=2)
+        self.assertSimilar(th.jit.script(mod)(x), mod(x), x)
+
 
 class TestResampleFrac(_BaseTest):
     def test_ref(self):
@@ -119,11 +160,231 @@ class TestResampleFrac(_BaseTest):
             # We allow some relatively high tolerance as we are not using the same window.
             self.assertSimilar(y, y_re, x, f"{old_sr} to {new_sr}", tol=2)
 
+    def test_interpolate(self):
+        random.seed(1234)
+        th.manual_seed(1234)
+        x = th.randn(2, 3, 1500)
+        for old_sr, new_sr in [(7, 5), (5, 7), (2, 1), (1, 2), (441, 160), (2001, 3001)]:
+            y_ref = resample.resample_frac(x, old_sr, new_sr)
+            y = resample.resample_frac(x, old_sr, new_sr, interpolate=True)
+            self.assertEqual(y.shape, y_ref.shape)
+            self.assertSimilar(y, y_ref, x, f"{old_sr} to {new_sr}", tol=0.01)
+
+        # Large coprime sample rates use the interpolation by default.
+        old_sr = 20001
+        new_sr = 30001
+        mod = resample.ResampleFrac(old_sr, new_sr, zeros=56)
+        self.assertTrue(mod.interpolate)
+        self.assertEqual(mod.kernel.numel(), 0)
+        x = pure_tone(1234, sr=old_sr) + pure_tone(5678, sr=old_sr)
+        y = mod(x)
+        self.assertEqual(y.shape, (4 * new_sr,))
+        y_re = th.from_numpy(resampy.resample(x.numpy(), old_sr, new_sr)).float()
+        self.assertSimilar(y, y_re, x, f"{old_sr} to {new_sr}")
+        x = th.ones(4 * old_sr)
+        self.assertLessEqual((mod(x) - 1).abs().mean(), 1e-6)
+
+    def test_fft(self):
+        x = th.randn(2, 3, 5000)
+        for old_sr, new_sr in [(2, 1), (1, 2), (5, 4), (3, 1), (4, 5)]:
+            for zeros in [8, 24, 56]:
+                for full in [False, True]:
+                    y_ref = resample.resample_frac(
+                        x, old_sr, new_sr, zeros=zeros, fft=False, full=full)
+                    y = resample.resample_frac(x, old_sr, new_sr, zeros=zeros, fft=True, full=full)
+                    self.assertEqual(y.shape, y_ref.shape)
+                    self.assertSimilar(y, y_ref, x, f"{old_sr} to {new_sr}, {zeros}", tol=1e-3)
+        self.assertTrue(resample.ResampleFrac(2, 1).fft)
+        self.assertFalse(resample.ResampleFrac(10, 11).fft)
+        self.assertTrue(resample.ResampleFrac(4, 5, zeros=56).fft)
+        mod = resample.ResampleFrac(2, 1, zeros=56)
+        x = th.randn(1000)
+        self.assertSimilar(th.jit.script(mod)(x), mod(x), x, tol=1e-3)
+
+    def test_trim(self):
+        x = th.randn(2, 3, 5000)
+        for old_sr, new_sr in [(1000, 999), (999, 1000), (441, 160), (160, 441), (5, 4)]:
+            for full in [False, True]:
+                y_ref = resample.resample_frac(x, old_sr, new_sr, trim=False, full=full)
+                y = resample.resample_frac(x, old_sr, new_sr, trim=True, full=full)
+                self.assertEqual(y.shape, y_ref.shape)
+                self.assertSimilar(y, y_ref, x, f"{old_sr} to {new_sr}", tol=1e-4)
+        mod = resample.ResampleFrac(1000, 999)
+        self.assertTrue(mod.trim)
+        self.assertFalse(mod.fft)
+        self.assertLess(mod.kernel.numel(), 999 * (2 * mod._width + 1000) / 5)
+        self.assertFalse(resample.ResampleFrac(4, 5).trim)
+        self.assertFalse(resample.ResampleFrac(1000, 999, fft=False, trim=False).trim)
+        with self.assertRaises(ValueError):
+            resample.ResampleFrac(1000, 999, fft=True, trim=True)
+        self.assertSimilar(th.jit.script(mod)(x), mod(x), x)
+
+        # With trimmed filters, the polyphase filters are small enough to be used.
+        mod = resample.ResampleFrac(20001, 30001)
+        self.assertFalse(mod.interpolate)
+        self.assertTrue(mod.trim)
+        x = pure_tone(1234, sr=20001)
+        y_ref = resample.resample_frac(x, 20001, 30001, interpolate=True)
+        self.assertSimilar(mod(x), y_ref, x, tol=0.1)
+
+    def test_window(self):
+        random.seed(1234)
+        th.manual_seed(1234)
+        for old_sr, new_sr, interpolate in [
+                (44100, 16000, None), (5, 7, None), (2, 1, None), (1000, 999, None),
+                (441, 160, True), (7, 7, None)]:
+            mod = resample.ResampleFrac(old_sr, new_sr, interpolate=interpolate, fft=False)
+            x = th.randn(2, 3, random.randrange(1, 5000))
+            y_ref = mod(x, full=True)
+            for _ in range(10):
+                start = random.randrange(0, y_ref.shape[-1] + 1)
+                length = random.randrange(0, y_ref.shape[-1] - start + 1)
+                y = mod.forward_window(x, start, length)
+                self.assertTrue(th.equal(y, y_ref[..., start:start + length]))
+            with self.assertRaises(ValueError):
+                mod.forward_window(x, 1, y_ref.shape[-1])
+
+        # Memory mapped input.
+        mod = resample.ResampleFrac(44100, 16000)
+        x = th.randn(44100 * 4)
+        path = os.path.join(tempfile.gettempdir(), str(uuid.uuid4()) + ".raw")
+        x.numpy().tofile(path)
+        try:
+            x_map = th.from_file(path, size=len(x))
+            y = mod.forward_window(x_map, 16000, 32000)
+            self.assertTrue(th.equal(y, mod(x)[16000:48000]))
+        finally:
+            os.remove(path)
+
+    def test_streaming(self):
+        random.seed(1234)
+        th.manual_seed(1234)
+        for old_sr, new_sr, interpolate in [
+                (48000, 16000, None), (5, 7, None), (5, 7, True),
+                (1, 3, None), (441, 160, True), (7, 7, None), (1000, 999, None)]:
+            mod = resample.StreamingResampleFrac(old_sr, new_sr, zeros=8, interpolate=interpolate)
+            for full in [False, True]:
+                length = random.randrange(1, 10000)
+                x = th.randn(2, 3, length)
+                outs = []
+                offset = 0
+                while offset < length:
+                    size = random.randrange(0, 700)
+                    outs.append(mod.feed(x[..., offset:offset + size]))
+                    offset += size
+                outs.append(mod.flush(full=full))
+                y = th.cat(outs, dim=-1)
+                y_ref = mod(x, full=full)
+                msg = f"{old_sr} to {new_sr}, {interpolate}, {full}"
+                self.assertEqual(y.shape, y_ref.shape, msg)
+                self.assertLessEqual((y - y_ref).abs().max(), 1e-6, msg)
+
+        # With constant chunks, outputs are only delayed by `latency` input samples.
+        mod = resample.StreamingResampleFrac(48000, 16000)
+        outs = [mod.feed(chunk) for chunk in th.randn(9600).split(960)]
+        self.assertEqual(outs[0].shape[-1], (960 - mod.latency + 2) // 3)
+        self.assertEqual([out.shape[-1] for out in outs[1:]], [320] * 9)
+        with self.assertRaises(RuntimeError):
+            mod.reset()
+            mod.flush()
+
+    def test_batch(self):
+        th.manual_seed(1234)
+        x = th.randn(5, 2, 3000)
+        old_sr = th.tensor([10, 10, 10, 7, 3])
+        new_sr = th.tensor([9, 10, 11, 10, 1])
+        y, lengths = resample.resample_batch(x, old_sr, new_sr)
+        self.assertEqual(list(y.shape), [5, 2, 4285])
+        for index in range(len(x)):
+            old, new = int(old_sr[index]), int(new_sr[index])
+            y_ref = resample.resample_frac(x[index], old, new, interpolate=True)
+            length = int(lengths[index])
+            self.assertEqual(length, y_ref.shape[-1])
+            self.assertSimilar(y[index, :, :length], y_ref, x[index], f"{old} to {new}", tol=0.01)
+            self.assertEqual(y[index, :, length:].abs().sum(), 0)
+
+        # Ratios given as floats.
+        ratios = th.tensor([0.9, 1.0, 1.1])
+        x = th.randn(3, 16000, requires_grad=True)
+        y, lengths = resample.resample_batch(x, 1, ratios)
+        self.assertEqual(lengths.tolist(), [14400, 16000, 17600])
+        self.assertTrue(th.equal(y[1, :16000], x[1]))
+        y_ref = resample.resample_frac(x[2], 10, 11, interpolate=True)
+        # 1.1 is not exactly represented in float32, so we have a small drift.
+        self.assertSimilar(y[2], y_ref, x[2], tol=0.1)
+        y.sum().backward()
+        self.assertEqual(x.grad.shape, x.shape)
+
+        with self.assertRaises(ValueError):
+            resample.resample_batch(x, 0, ratios)
+
+    def test_bank(self):
+        th.manual_seed(1234)
+        new_srs = [8000, 16000, 22050, 24000]
+        x = th.randn(2, 4801)
+        bank = resample.ResampleBank(48000, new_srs)
+        self.assertEqual(
+            bank.plan(), [(-1, 24000), (3, 22050), (3, 16000), (1, 8000)])
+        no_cascade = resample.ResampleBank(48000, new_srs, cascade=False)
+        for full in [False, True]:
+            ys = bank(x, full=full)
+            ys_indep = no_cascade(x, full=full)
+            for new_sr, y, y_indep in zip(new_srs, ys, ys_indep):
+                y_ref = resample.resample_frac(x, 48000, new_sr, full=full)
+                self.assertEqual(y.shape, y_ref.shape)
+                self.assertTrue(th.equal(y_indep, y_ref))
+                self.assertSimilar(y, y_ref, x, f"{new_sr}", tol=0.5)
+        ys = th.jit.script(bank)(x)
+        for y, y_ref in zip(ys, bank(x)):
+            self.assertSimilar(y, y_ref, x)
+
+    def test_chain(self):
+        th.manual_seed(1234)
+        self.assertEqual(resample.plan_resample(48000, 8000), [48000, 8800, 8000])
+        self.assertEqual(resample.plan_resample(48000, 8000, max_stages=1), [48000, 8000])
+        self.assertEqual(resample.plan_resample(16000, 16000), [16000])
+        # The first stage would be trimmed with 32 separate convolutions, and the chain
+        # is slower than a single stage.
+        slow = [96000, 24255, 22050]
+        self.assertGreater(resample._plan_cost(slow), resample._plan_cost([96000, 22050]))
+        self.assertNotEqual(resample.plan_resample(96000, 22050), slow)
+        for old_sr, new_sr in [(48000, 8000), (8000, 48000), (22050, 16000), (44100, 44100)]:
+            chain = resample.ResampleChain(old_sr, new_sr)
+            rates = chain.sample_rates
+            self.assertEqual([rates[0], rates[-1]], [old_sr, new_sr])
+            # Tone well below the cutoff frequency of all stages.
+            t = th.arange(old_sr // 10 + 7).float() / old_sr
+            x = th.stack([th.cos(2 * math.pi * f * t) for f in [100, 1000, 2000]])
+            for full in [False, True]:
+                y = chain(x, full=full)
+                y_ref = resample.resample_frac(x, old_sr, new_sr, full=full)
+                self.assertEqual(y.shape, y_ref.shape)
+                self.assertSimilar(y, y_ref, x, f"{old_sr} {new_sr}")
+            self.assertEqual(chain(x, 42).shape[-1], 42)
+            with self.assertRaises(ValueError):
+                chain(x, 42, full=True)
+            self.assertSimilar(th.jit.script(chain)(x), chain(x), x)
+        x = th.randn(2, 4801)
+        chain = resample.ResampleChain(48000, 8000, max_stages=1)
+        self.assertTrue(th.equal(chain(x), resample.resample_frac(x, 48000, 8000)))
+
+    def test_half(self):
+        x = th.randn(4, 4000)
+        mod = resample.ResampleFrac(4, 5)
+        y_ref = mod(x)
+        for dtype in [th.float16, th.bfloat16]:
+            y = mod(x.to(dtype))
+            self.assertEqual(y.dtype, dtype)
+            self.assertSimilar(y.float(), y_ref, x, str(dtype))
+
     def test_torchscript(self):
         mod = resample.ResampleFrac(5, 7)
         x = th.randn(5 * 26)
         jitted = th.jit.script(mod)
         self.assertEqual(list(jitted(x).shape), [7 * 26])
+        mod = resample.ResampleFrac(5, 7, interpolate=True)
+        jitted = th.jit.script(mod)
+        self.assertSimilar(jitted(x), mod(x), x)
 
     def test_constant(self):
         x = th.ones(4096)
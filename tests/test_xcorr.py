@@ -0,0 +1,92 @@
+# File under the MIT license, see https://github.com/adefossez/julius/LICENSE for details.
+# Author: adefossez, 2020
+
+import random
+import unittest
+
+import torch as th
+from torch.nn import functional as F
+
+from julius import xcorr
+
+TOLERANCE = 1e-4  # as relative delta in percentage
+
+
+def reference(x, y, min_lag, max_lag):
+    # Cross-correlation computed with `F.conv1d`, one group per signal.
+    length_y = y.shape[-1]
+    padding = max(0, length_y - 1)
+    x = F.pad(x, (padding, padding))
+    out = F.conv1d(x[None], y[:, None], groups=len(y))[0]
+    return out[:, min_lag + padding:max_lag + padding + 1]
+
+
+class _BaseTest(unittest.TestCase):
+    def setUp(self):
+        th.manual_seed(1234)
+        random.seed(1234)
+
+    def assertSimilar(self, a, b, msg=None, tol=TOLERANCE):
+        self.assertEqual(list(a.shape), list(b.shape), msg)
+        delta = 100 * th.norm(a - b) / th.norm(b)
+        self.assertLessEqual(delta, tol, msg)
+
+
+class TestXCorr(_BaseTest):
+    def test_same_as_pytorch(self):
+        for _ in range(10):
+            length = random.randrange(1, 2000)
+            length_y = random.randrange(1, 2000)
+            max_lag = random.randrange(0, 300)
+            x = th.randn(3, length)
+            y = th.randn(3, length_y)
+            msg = repr((length, length_y, max_lag))
+            self.assertSimilar(
+                xcorr.correlate(x, y), reference(x, y, 1 - length_y, length - 1), msg)
+            # The lags that are out of the full cross-correlation are zero.
+            self.assertSimilar(
+                xcorr.correlate(x, y, max_lag=max_lag),
+                F.pad(reference(x, y, 1 - length_y, length - 1), (max_lag, max_lag))[
+                    :, length_y - 1:length_y + 2 * max_lag], msg)
+            self.assertSimilar(xcorr.autocorr(x, max_lag)[:, :length],
+                               reference(x, x, 0, min(max_lag, length - 1)), msg)
+            if length_y <= length:
+                self.assertSimilar(
+                    xcorr.correlate(x, y, 'valid'), reference(x, y, 0, length - length_y), msg)
+
+    def test_batch_and_grad(self):
+        x = th.randn(2, 3, 500, requires_grad=True)
+        y = th.randn(2, 3, 400, requires_grad=True)
+        out = xcorr.correlate(x, y, max_lag=50)
+        self.assertEqual(list(out.shape), [2, 3, 101])
+        out_ref = reference(x.view(6, -1), y.view(6, -1), -50, 50).view(2, 3, 101)
+        self.assertSimilar(out, out_ref)
+        grad = th.randn_like(out)
+        grads = th.autograd.grad(out, [x, y], grad)
+        grads_ref = th.autograd.grad(out_ref, [x, y], grad)
+        for g, g_ref in zip(grads, grads_ref):
+            self.assertSimilar(g, g_ref, tol=1e-3)
+
+    def test_time_delay(self):
+        y = th.randn(4, 20000)
+        delays = [0, 17, -45, 300]
+        x = th.stack([th.roll(y[i], delay) for i, delay in enumerate(delays)])
+        x += 0.5 * th.randn_like(x)
+        self.assertEqual(xcorr.time_delay(x, y, max_lag=400).tolist(), delays)
+        phat = xcorr.gcc_phat(x, y, max_lag=400)
+        self.assertEqual(list(phat.shape), [4, 801])
+
+    def test_invalid(self):
+        x = th.randn(2, 100)
+        with self.assertRaises(ValueError):
+            xcorr.correlate(x, x, mode='same')
+        with self.assertRaises(ValueError):
+            xcorr.correlate(x, x, mode='valid', max_lag=10)
+        with self.assertRaises(ValueError):
+            xcorr.correlate(x, th.randn(3, 100))
+        with self.assertRaises(ValueError):
+            xcorr.gcc_phat(x, x, max_lag=10, block_size=20)
+
+
+if __name__ == '__main__':
+    unittest.main()